@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+
+"""
+Measures rpmqc throughput on a corpus generated by corpus.py.
+
+Every scenario runs "rpmqc inspect-repo" with a configuration that enables
+a single inspector (or all of them for the "full" scenario) in a separate
+process and reports packages per second, decompressed payload MB/s (for
+scenarios that decompress payloads) and the process peak RSS.
+
+Results are saved to a JSON file, so that different runs can be compared
+using the --compare option.
+
+Usage:
+    bench.py [--jobs N] [--save RESULTS.json] [--compare OLD.json] CORPUS_DIR
+"""
+
+import argparse
+import datetime
+import json
+import os
+import os.path
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import createrepo_c
+
+MB = 1000 * 1000
+
+RPMQC_MAIN = 'from msvsphere.rpmqc.cli import main; main()'
+
+# scenario name: (configuration, decompresses payloads)
+SCENARIOS = {
+    'pgp': ('package:\n'
+            '  signatures:\n'
+            '    pgp_key_id: {pgp_key_id}\n', False),
+    'ima-payload': ('package:\n'
+                    '  signatures:\n'
+                    '    ima_cert_path: {ima_cert_path}\n', True),
+    'ima-header': ('package:\n'
+                   '  signatures:\n'
+                   '    ima_cert_path: {ima_cert_path}\n'
+                   '    ima_mode: header\n', False),
+    'tags': ('package:\n'
+             '  tags:\n'
+             '    vendor: rpmqc\n'
+             '    packager: rpmqc benchmark\n', False),
+    'full': ('package:\n'
+             '  signatures:\n'
+             '    pgp_key_id: {pgp_key_id}\n'
+             '    ima_cert_path: {ima_cert_path}\n'
+             '  tags:\n'
+             '    vendor: rpmqc\n'
+             '    packager: rpmqc benchmark\n', True)
+}
+
+
+def get_repo_stats(repo_path: str) -> dict:
+    repomd = createrepo_c.Repomd()
+    createrepo_c.xml_parse_repomd(
+        os.path.join(repo_path, 'repodata/repomd.xml'), repomd
+    )
+    primary_path = next(os.path.join(repo_path, rec.location_href)
+                        for rec in repomd.records if rec.type == 'primary')
+    stats = {'packages': 0, 'package_bytes': 0, 'payload_bytes': 0}
+
+    def pkg_callback(pkg):
+        stats['packages'] += 1
+        stats['package_bytes'] += pkg.size_package
+        stats['payload_bytes'] += pkg.size_archive
+
+    createrepo_c.xml_parse_primary(primary_path, pkgcb=pkg_callback,
+                                   do_files=False)
+    return stats
+
+
+def get_git_revision() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], check=True,
+            capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_rpmqc(args: list) -> dict:
+    """
+    Runs rpmqc in a child process and measures its resources usage.
+
+    Args:
+        args: rpmqc command line arguments.
+
+    Returns:
+        Wall time, CPU time (seconds) and peak RSS (bytes) of the process.
+    """
+    start = time.perf_counter()
+    with open(os.devnull, 'wb') as devnull:
+        proc = subprocess.Popen([sys.executable, '-c', RPMQC_MAIN] + args,
+                                stdout=devnull)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    wall_time = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    # exit code 1 means that some tests failed which is expected
+    if proc.returncode not in (0, 1):
+        raise Exception(f'rpmqc failed with exit code {proc.returncode}')
+    return {
+        'wall_s': wall_time,
+        'cpu_s': rusage.ru_utime + rusage.ru_stime,
+        # NOTE: ru_maxrss is measured in kilobytes on Linux
+        'peak_rss_bytes': rusage.ru_maxrss * 1024
+    }
+
+
+def run_scenario(name: str, corpus: dict, repo_path: str, repo_stats: dict,
+                 jobs: int, repeat: int, tmp_dir: str) -> dict:
+    cfg_template, decompresses = SCENARIOS[name]
+    cfg_path = os.path.join(tmp_dir, f'{name}.yml')
+    with open(cfg_path, 'w') as fd:
+        fd.write('---\n' + cfg_template.format(
+            pgp_key_id=corpus['gpg_key_id'][-8:],
+            ima_cert_path=corpus['ima_cert_path']
+        ) + '...\n')
+    runs = [run_rpmqc(['inspect-repo', '--no-cache', '-c', cfg_path,
+                       '-j', str(jobs), repo_path])
+            for _ in range(repeat)]
+    # the fastest run is the least affected by noise
+    best = min(runs, key=lambda r: r['wall_s'])
+    result = dict(best)
+    result['peak_rss_bytes'] = max(r['peak_rss_bytes'] for r in runs)
+    result['packages_per_s'] = repo_stats['packages'] / best['wall_s']
+    result['package_mb_per_s'] = \
+        repo_stats['package_bytes'] / MB / best['wall_s']
+    result['payload_mb_per_s'] = (
+        repo_stats['payload_bytes'] / MB / best['wall_s'] if decompresses
+        else None
+    )
+    return result
+
+
+def print_results(results: dict, baseline: dict = None):
+    header = (f'{"scenario":<12} {"pkgs/s":>10} {"pkg MB/s":>10} '
+              f'{"payload MB/s":>13} {"CPU s":>9} {"peak RSS MB":>12}')
+    if baseline:
+        header += f' {"pkgs/s change":>14}'
+    print(header)
+    for name, r in results['scenarios'].items():
+        payload = r['payload_mb_per_s']
+        payload = f'{payload:>13.1f}' if payload is not None else \
+            f'{"-":>13}'
+        row = (f'{name:<12} {r["packages_per_s"]:>10.1f} '
+               f'{r["package_mb_per_s"]:>10.1f} {payload} '
+               f'{r["cpu_s"]:>9.2f} {r["peak_rss_bytes"] / MB:>12.1f}')
+        old = (baseline or {}).get('scenarios', {}).get(name)
+        if old:
+            change = r['packages_per_s'] / old['packages_per_s'] - 1
+            row += f' {change:>+13.1%}'
+        print(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measures rpmqc throughput on a synthetic corpus'
+    )
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of rpmqc inspection jobs (default: 1)')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of runs per scenario, the fastest one '
+                             'is reported (default: 3)')
+    parser.add_argument('-s', '--scenario', action='append',
+                        choices=sorted(SCENARIOS),
+                        help='scenario to run, can be specified multiple '
+                             'times (default: all scenarios)')
+    parser.add_argument('--save', metavar='RESULTS_PATH',
+                        help='save results to a JSON file')
+    parser.add_argument('--compare', metavar='BASELINE_PATH',
+                        help='compare results with previously saved ones')
+    parser.add_argument('corpus_dir', metavar='CORPUS_DIR',
+                        help='corpus directory generated by corpus.py')
+    args = parser.parse_args()
+    with open(os.path.join(args.corpus_dir, 'corpus.json')) as fd:
+        corpus = json.load(fd)
+    repo_path = os.path.abspath(os.path.join(args.corpus_dir, 'repo'))
+    repo_stats = get_repo_stats(repo_path)
+    results = {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_revision': get_git_revision(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'jobs': args.jobs,
+        'corpus': dict(corpus['packages'], **repo_stats),
+        'scenarios': {}
+    }
+    with tempfile.TemporaryDirectory(prefix='rpmqc-bench-') as tmp_dir:
+        for name in args.scenario or SCENARIOS:
+            results['scenarios'][name] = run_scenario(
+                name, corpus, repo_path, repo_stats, args.jobs, args.repeat,
+                tmp_dir
+            )
+    baseline = None
+    if args.compare:
+        with open(args.compare) as fd:
+            baseline = json.load(fd)
+    print_results(results, baseline)
+    if args.save:
+        with open(args.save, 'w') as fd:
+            json.dump(results, fd, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+
+"""
+Generates a reproducible synthetic RPM repository for rpmqc benchmarks.
+
+The corpus contains:
+
+* many small packages;
+* a few packages with very large (incompressible) payloads;
+* packages with thousands of files;
+* IMA and PGP signed, PGP-only signed and unsigned packages.
+
+Package contents are generated from a seeded pseudo-random generator, so the
+same seed always produces the same payloads. Signing keys are throwaway keys
+generated for every corpus.
+
+Requirements: rpmbuild, rpmsign (built with IMA support), gpg and
+createrepo_c executables.
+
+Usage:
+    corpus.py [--seed 42] OUTPUT_DIR
+"""
+
+import argparse
+import datetime
+import json
+import os
+import os.path
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+KIB = 1024
+MIB = 1024 * KIB
+
+# all packages are built with this timestamp to keep them reproducible
+SOURCE_DATE_EPOCH = 1700000000
+
+SPEC_TEMPLATE = '''\
+Name: {name}
+Version: 1.0
+Release: 1
+Summary: rpmqc benchmark package
+License: MIT
+BuildArch: noarch
+Vendor: rpmqc
+Packager: rpmqc benchmark
+
+%description
+Synthetic rpmqc benchmark package.
+
+%install
+cp -a {content_dir}/. %{{buildroot}}/
+
+%files
+/usr/share/{name}
+'''
+
+
+def random_bytes(rng: random.Random, size: int) -> bytes:
+    return rng.getrandbits(size * 8).to_bytes(size, 'little') if size else b''
+
+
+def write_content(content_dir: str, name: str, rng: random.Random,
+                  files_count: int, file_size: int):
+    data_dir = os.path.join(content_dir, 'usr/share', name)
+    os.makedirs(data_dir)
+    for i in range(files_count):
+        with open(os.path.join(data_dir, f'file-{i:05d}.bin'), 'wb') as fd:
+            left = file_size
+            while left:
+                chunk_size = min(left, 4 * MIB)
+                fd.write(random_bytes(rng, chunk_size))
+                left -= chunk_size
+
+
+def build_package(work_dir: str, rpms_dir: str, name: str,
+                  rng: random.Random, files_count: int,
+                  file_size: int) -> str:
+    content_dir = os.path.join(work_dir, 'content', name)
+    write_content(content_dir, name, rng, files_count, file_size)
+    spec_path = os.path.join(work_dir, f'{name}.spec')
+    with open(spec_path, 'w') as fd:
+        fd.write(SPEC_TEMPLATE.format(name=name, content_dir=content_dir))
+    env = dict(os.environ, SOURCE_DATE_EPOCH=str(SOURCE_DATE_EPOCH))
+    subprocess.run(
+        ['rpmbuild', '-bb', '--quiet',
+         '--define', f'_topdir {os.path.join(work_dir, "rpmbuild")}',
+         '--define', f'_rpmdir {rpms_dir}',
+         '--define', '_build_name_fmt %{NAME}-%{VERSION}-%{RELEASE}.'
+                     '%{ARCH}.rpm',
+         '--define', 'use_source_date_epoch_as_buildtime 1',
+         '--define', 'clamp_mtime_to_source_date_epoch 1',
+         '--define', '_buildhost rpmqc-benchmark',
+         '--define', '__os_install_post %{nil}',
+         spec_path],
+        check=True, env=env
+    )
+    shutil.rmtree(content_dir)
+    return os.path.join(rpms_dir, f'{name}-1.0-1.noarch.rpm')
+
+
+def generate_gpg_key(gnupg_home: str) -> str:
+    os.makedirs(gnupg_home, mode=0o700)
+    gpg = ['gpg', '--homedir', gnupg_home, '--batch']
+    subprocess.run(gpg + ['--passphrase', '', '--quick-gen-key',
+                          'rpmqc benchmark <benchmark@rpmqc.invalid>',
+                          'rsa2048', 'sign', 'never'],
+                   check=True, capture_output=True)
+    output = subprocess.run(gpg + ['--list-keys', '--with-colons'],
+                            check=True, capture_output=True, text=True).stdout
+    for line in output.splitlines():
+        fields = line.split(':')
+        if fields[0] == 'pub':
+            return fields[4].lower()
+    raise Exception('failed to generate a GPG key')
+
+
+def generate_ima_key(keys_dir: str):
+    key = ec.generate_private_key(ec.SECP256R1())
+    key_path = os.path.join(keys_dir, 'ima.key')
+    with open(key_path, 'wb') as fd:
+        fd.write(key.private_bytes(serialization.Encoding.PEM,
+                                   serialization.PrivateFormat.PKCS8,
+                                   serialization.NoEncryption()))
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME,
+                                         'rpmqc benchmark IMA key')])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = x509.CertificateBuilder() \
+        .subject_name(name) \
+        .issuer_name(name) \
+        .public_key(key.public_key()) \
+        .serial_number(x509.random_serial_number()) \
+        .not_valid_before(now) \
+        .not_valid_after(now + datetime.timedelta(days=365)) \
+        .add_extension(x509.SubjectKeyIdentifier.from_public_key(
+            key.public_key()), critical=False) \
+        .sign(key, hashes.SHA256())
+    cert_path = os.path.join(keys_dir, 'ima.der')
+    with open(cert_path, 'wb') as fd:
+        fd.write(cert.public_bytes(serialization.Encoding.DER))
+    return key_path, cert_path
+
+
+def sign_packages(rpm_paths: list, gnupg_home: str, gpg_key_id: str,
+                  ima_key_path: str = None):
+    if not rpm_paths:
+        return
+    cmd = ['rpmsign', '--addsign',
+           '--define', f'_gpg_path {gnupg_home}',
+           '--define', f'_gpg_name {gpg_key_id}']
+    if ima_key_path:
+        cmd += ['--signfiles', '--fskpath', ima_key_path]
+    subprocess.run(cmd + rpm_paths, check=True, stdin=subprocess.DEVNULL)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Generates a synthetic RPM repository for rpmqc '
+                    'benchmarks'
+    )
+    parser.add_argument('--seed', type=int, default=42,
+                        help='payload generator seed (default: 42)')
+    parser.add_argument('--small', type=int, default=200,
+                        help='number of small IMA and PGP signed packages '
+                             '(default: 200)')
+    parser.add_argument('--large', type=int, default=3,
+                        help='number of packages with a large payload '
+                             '(default: 3)')
+    parser.add_argument('--large-size', type=int, default=256, metavar='MIB',
+                        help='large package payload size in MiB '
+                             '(default: 256)')
+    parser.add_argument('--many-files', type=int, default=5,
+                        help='number of packages with thousands of files '
+                             '(default: 5)')
+    parser.add_argument('--files-per-package', type=int, default=3000,
+                        help='number of files in a package with many files '
+                             '(default: 3000)')
+    parser.add_argument('--pgp-only', type=int, default=20,
+                        help='number of PGP-only signed packages '
+                             '(default: 20)')
+    parser.add_argument('--unsigned', type=int, default=20,
+                        help='number of unsigned packages (default: 20)')
+    parser.add_argument('output_dir', metavar='OUTPUT_DIR',
+                        help='corpus output directory, it must not exist')
+    args = parser.parse_args()
+    output_dir = os.path.abspath(args.output_dir)
+    if os.path.exists(output_dir):
+        parser.error(f'{output_dir} already exists')
+    repo_dir = os.path.join(output_dir, 'repo')
+    keys_dir = os.path.join(output_dir, 'keys')
+    os.makedirs(repo_dir)
+    os.makedirs(keys_dir)
+    gnupg_home = os.path.join(keys_dir, 'gnupg')
+    gpg_key_id = generate_gpg_key(gnupg_home)
+    ima_key_path, ima_cert_path = generate_ima_key(keys_dir)
+    rng = random.Random(args.seed)
+    # kind: (count, files per package, file size, PGP signed, IMA signed)
+    kinds = {
+        'small': (args.small, 3, 4 * KIB, True, True),
+        'large': (args.large, 1, args.large_size * MIB, True, True),
+        'many-files': (args.many_files, args.files_per_package, KIB, True,
+                       True),
+        'pgp-only': (args.pgp_only, 3, 4 * KIB, True, False),
+        'unsigned': (args.unsigned, 3, 4 * KIB, False, False)
+    }
+    description = {'seed': args.seed, 'gpg_key_id': gpg_key_id,
+                   'ima_cert_path': ima_cert_path, 'packages': {}}
+    with tempfile.TemporaryDirectory(prefix='rpmqc-corpus-') as work_dir:
+        for kind, (count, files_count, file_size, pgp, ima) in kinds.items():
+            rpm_paths = []
+            for i in range(count):
+                name = f'bench-{kind}-{i:05d}'
+                rpm_paths.append(build_package(work_dir, repo_dir, name, rng,
+                                               files_count, file_size))
+            if pgp:
+                sign_packages(rpm_paths, gnupg_home, gpg_key_id,
+                              ima_key_path if ima else None)
+            description['packages'][kind] = count
+            sys.stderr.write(f'built {count} {kind} packages\n')
+    subprocess.run(['createrepo_c', '--quiet', '--database', '--revision',
+                    str(SOURCE_DATE_EPOCH), repo_dir], check=True)
+    with open(os.path.join(output_dir, 'rpmqc.yml'), 'w') as fd:
+        fd.write('---\n'
+                 'package:\n'
+                 '  signatures:\n'
+                 f'    pgp_key_id: {gpg_key_id[-8:]}\n'
+                 f'    ima_cert_path: {ima_cert_path}\n'
+                 '  tags:\n'
+                 '    vendor: rpmqc\n'
+                 '    packager: rpmqc benchmark\n'
+                 '...\n')
+    with open(os.path.join(output_dir, 'corpus.json'), 'w') as fd:
+        json.dump(description, fd, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
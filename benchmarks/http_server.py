@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+"""
+Serves a directory over HTTP/1.1 with keep-alive and Range requests support.
+
+It is a local stand-in for a remote repository mirror, e.g. to measure
+"rpmqc inspect-repo http://..." throughput on a corpus generated by
+corpus.py. Failures can be injected to exercise the rpmqc retry logic.
+
+Usage:
+    http_server.py [--port 8080] [--fail-rate 0.1] [--delay 0.01] DIRECTORY
+"""
+
+import argparse
+import functools
+import http.server
+import os
+import random
+import re
+import signal
+import sys
+import threading
+import time
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    fail_rate = 0.0
+
+    delay = 0.0
+
+    stats = {'requests': 0, 'range_requests': 0, 'bytes_sent': 0,
+             'connections': 0}
+
+    stats_lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        self._count('connections')
+
+    def do_GET(self):
+        self._count('requests')
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self.send_error(503, 'injected failure')
+            return
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        match = re.match(r'^bytes=(\d+)-(\d*)$',
+                         self.headers.get('Range', ''))
+        if match:
+            self._count('range_requests')
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(int(match.group(2)), size - 1)
+            if start > end:
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+        else:
+            self.send_response(200)
+        length = end - start + 1
+        self.send_header('Content-Type', self.guess_type(path))
+        self.send_header('Content-Length', str(length))
+        self.send_header('Accept-Ranges', 'bytes')
+        self.end_headers()
+        with open(path, 'rb') as fd:
+            fd.seek(start)
+            left = length
+            while left:
+                chunk = fd.read(min(left, 256 * 1024))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                left -= len(chunk)
+        self._count('bytes_sent', length)
+
+    def log_message(self, format, *args):
+        pass
+
+    @classmethod
+    def _count(cls, name: str, value: int = 1):
+        with cls.stats_lock:
+            cls.stats[name] += value
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serves a directory over HTTP with Range requests support'
+    )
+    parser.add_argument('-p', '--port', type=int, default=8080,
+                        help='port to listen on (default: 8080)')
+    parser.add_argument('--fail-rate', type=float, default=0.0,
+                        help='fraction of requests to fail with HTTP 503 '
+                             '(default: 0)')
+    parser.add_argument('--delay', type=float, default=0.0,
+                        help='delay before every response in seconds, '
+                             'simulates a network latency (default: 0)')
+    parser.add_argument('directory', metavar='DIRECTORY',
+                        help='directory to serve')
+    args = parser.parse_args()
+    RangeRequestHandler.fail_rate = args.fail_rate
+    RangeRequestHandler.delay = args.delay
+    handler = functools.partial(RangeRequestHandler,
+                                directory=os.path.abspath(args.directory))
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', args.port),
+                                             handler)
+    # print statistics on termination as well
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    sys.stderr.write(f'serving {args.directory} on '
+                     f'http://127.0.0.1:{args.port}/\n')
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        sys.stderr.write(f'{RangeRequestHandler.stats}\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
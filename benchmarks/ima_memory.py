@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+"""
+Measures peak memory consumption of the IMA signatures verification.
+
+The script has two modes:
+
+* RPM mode: every given RPM package is inspected by the IMA signatures
+  inspector in a separate process and the process peak RSS is reported along
+  with the largest payload file size. Peak RSS growth should not depend on
+  the largest file size.
+
+* Synthetic mode (--synthetic-size): a stream of the given size is hashed
+  the same way payload files are hashed, it doesn't require RPM packages or
+  the rpm Python bindings.
+
+Usage:
+    ima_memory.py -c rpmqc.yml PACKAGE.rpm [PACKAGE.rpm ...]
+    ima_memory.py --synthetic-size 8192
+"""
+
+import argparse
+import multiprocessing
+import os.path
+import resource
+import sys
+
+from msvsphere.rpmqc.ima_utils import calculate_ima_digest
+
+MIB = 1024 * 1024
+
+
+def get_peak_rss() -> int:
+    # NOTE: ru_maxrss is measured in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class ZeroStream:
+
+    """
+    File-like object that returns the given number of zero bytes.
+    """
+
+    def __init__(self, size: int):
+        self._left = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._left:
+            size = self._left
+        self._left -= size
+        return bytes(size)
+
+
+def measure_synthetic(size: int, queue: multiprocessing.Queue):
+    rss_before = get_peak_rss()
+    calculate_ima_digest(ZeroStream(size))
+    queue.put((f'synthetic {size // MIB} MiB stream', size, rss_before,
+               get_peak_rss()))
+
+
+def measure_rpm(cfg_path: str, rpm_path: str, queue: multiprocessing.Queue):
+    import rpm
+
+    from msvsphere.rpmqc.config import Config
+    from msvsphere.rpmqc.inspectors.pkg_ima_inspector import (
+        PkgIMASignatureInspector
+    )
+    from msvsphere.rpmqc.reporter import ReporterBuffer
+    from msvsphere.rpmqc.rpm_package import RPMPackage
+
+    inspector = PkgIMASignatureInspector(Config(cfg_path))
+    with RPMPackage(rpm_path) as pkg:
+        largest_file = max((f.size for f in rpm.files(pkg.hdr)), default=0)
+        rss_before = get_peak_rss()
+        inspector.inspect(pkg, ReporterBuffer())
+    queue.put((os.path.basename(rpm_path), largest_file, rss_before,
+               get_peak_rss()))
+
+
+def run_measurement(target, *args) -> tuple:
+    # every measurement runs in a fresh process so that peak RSS values
+    # don't affect each other
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=target, args=(*args, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measures IMA signatures verification peak memory usage'
+    )
+    parser.add_argument('-c', '--config', help='rpmqc configuration file '
+                                               'path with ima_cert_path set')
+    parser.add_argument('--synthetic-size', type=int, action='append',
+                        default=[], metavar='MIB',
+                        help='hash a synthetic stream of the given size in '
+                             'MiB, can be specified multiple times')
+    parser.add_argument('rpm_path', metavar='RPM_PATH', nargs='*',
+                        help='IMA signed RPM package path')
+    args = parser.parse_args()
+    if args.rpm_path and not args.config:
+        parser.error('the --config option is required to inspect RPMs')
+    elif not args.rpm_path and not args.synthetic_size:
+        parser.error('either RPM_PATH or --synthetic-size is required')
+    results = []
+    for size in args.synthetic_size:
+        results.append(run_measurement(measure_synthetic, size * MIB))
+    for rpm_path in args.rpm_path:
+        results.append(run_measurement(measure_rpm, args.config, rpm_path))
+    print(f'{"name":<50} {"largest file":>14} {"RSS before":>12} '
+          f'{"peak RSS":>12} {"growth":>10}')
+    for name, largest_file, rss_before, rss_peak in results:
+        print(f'{name:<50} {largest_file / MIB:>10.1f} MiB '
+              f'{rss_before / MIB:>8.1f} MiB {rss_peak / MIB:>8.1f} MiB '
+              f'{(rss_peak - rss_before) / MIB:>6.1f} MiB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+"""
+Checks rpmqc startup cost: modules imported by every scenario and the time
+a scenario adds to the bare interpreter startup.
+
+Every scenario is run in a separate process the given number of times, the
+fastest run is compared with the budget. A scenario also fails if it exits
+with an unexpected code or imports a module it must not need (e.g.
+cryptography without IMA certificates configured). The imports check is
+also done by the tests/test_startup.py test.
+
+Usage:
+    import_time.py [--repeat 10] [--budget-ms 50] [-c rpmqc.yml PACKAGE.rpm]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+RPMQC_MAIN = 'from msvsphere.rpmqc.cli import main; main()'
+
+HEAVY_MODULES = ('createrepo_c', 'cryptography', 'http.client', 'rpm',
+                 'schema', 'sqlite3', 'yaml')
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+\d+ \|\s+\d+ \|\s*(\S+)$')
+
+
+def get_scenarios(config_path: str = None, rpm_path: str = None) -> list:
+    """
+    Returns scenarios to check.
+
+    Args:
+        config_path: rpmqc configuration file path without IMA certificates.
+        rpm_path: RPM package path.
+
+    Returns:
+        List of scenario names, Python code, command line arguments, modules
+        that must not be imported, whether the time budget is applied
+        (scenarios that read package metadata or do real work are checked
+        for imports only) and expected exit codes.
+    """
+    scenarios = [
+        ('usage error', RPMQC_MAIN, ['inspect-rpm'], HEAVY_MODULES, True,
+         (4,)),
+        ('inspect-rpm --help', RPMQC_MAIN, ['inspect-rpm', '--help'],
+         HEAVY_MODULES, True, (0,)),
+        ('--version', RPMQC_MAIN, ['--version'], HEAVY_MODULES, True, (0,)),
+        ('import runner', 'import msvsphere.rpmqc.runner', [],
+         ('createrepo_c', 'cryptography', 'http.client', 'sqlite3'), False,
+         (0,))
+    ]
+    if config_path and rpm_path:
+        # the package inspection may fail, it isn't an rpmqc error
+        scenarios.append(
+            ('inspect-rpm', RPMQC_MAIN,
+             ['inspect-rpm', '-c', config_path, rpm_path],
+             ('createrepo_c', 'cryptography', 'http.client', 'sqlite3'),
+             False, (0, 1))
+        )
+    return scenarios
+
+
+def run_python(code: str, args: list) -> tuple:
+    """
+    Runs Python code in a child process with import time tracing enabled.
+
+    Args:
+        code: Python code to run.
+        args: Command line arguments.
+
+    Returns:
+        The process wall time in seconds, exit code and a set of imported
+        module names.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code] +
+                          args, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE, text=True)
+    wall_time = time.perf_counter() - start
+    modules = set()
+    for line in proc.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match:
+            modules.add(match.group(1))
+    return wall_time, proc.returncode, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Checks rpmqc startup time and imported modules'
+    )
+    parser.add_argument('-r', '--repeat', type=int, default=10,
+                        help='number of runs per scenario, the fastest one '
+                             'is reported (default: 10)')
+    parser.add_argument('-b', '--budget-ms', type=float, default=50.0,
+                        help='maximum time in milliseconds a scenario may '
+                             'add to the interpreter startup (default: 50)')
+    parser.add_argument('-c', '--config',
+                        help='rpmqc configuration file path without IMA '
+                             'certificates for the inspect-rpm scenario')
+    parser.add_argument('rpm_path', metavar='PACKAGE.rpm', nargs='?',
+                        help='RPM package for the inspect-rpm scenario')
+    args = parser.parse_args()
+    baseline = min(run_python('pass', [])[0] for _ in range(args.repeat))
+    print(f'interpreter startup: {baseline * 1000:.1f} ms')
+    print(f'{"scenario":<20} {"added ms":>9} {"exit":>5} {"status":>7}  '
+          f'unexpected imports')
+    failed = False
+    for name, code, rpmqc_args, forbidden, budgeted, exit_codes in \
+            get_scenarios(args.config, args.rpm_path):
+        runs = [run_python(code, rpmqc_args) for _ in range(args.repeat)]
+        added = min(wall_time for wall_time, _, _ in runs) - baseline
+        # NOTE: a crashed run doesn't import everything it would import
+        #       otherwise, so an unexpected exit code fails the scenario
+        bad_exit_code = next((exit_code for _, exit_code, _ in runs
+                              if exit_code not in exit_codes), None)
+        exit_code = runs[0][1] if bad_exit_code is None else bad_exit_code
+        unexpected = sorted(set(forbidden) & runs[0][2])
+        over_budget = budgeted and added * 1000 > args.budget_ms
+        status = 'FAIL' if unexpected or over_budget or \
+            bad_exit_code is not None else 'ok'
+        failed = failed or status == 'FAIL'
+        print(f'{name:<20} {added * 1000:>9.1f} {exit_code:>5} {status:>7}  '
+              f'{", ".join(unexpected) or "-"}')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
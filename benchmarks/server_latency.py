@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+"""
+Compares a single RPM package inspection latency of cold "rpmqc inspect-rpm"
+invocations with "rpmqc inspect-rpm --server" ones.
+
+An inspection server is started with the given configuration, then every
+package is inspected the given number of times in each mode. The raw socket
+mode sends requests to the server directly, it shows the latency that
+a build system hook speaking the protocol itself would get.
+
+Usage:
+    server_latency.py -c rpmqc.yml [--repeat 20] PACKAGE.rpm [PACKAGE.rpm ...]
+"""
+
+import argparse
+import json
+import os
+import os.path
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RPMQC_MAIN = 'from msvsphere.rpmqc.cli import main; main()'
+
+
+def run_rpmqc(args: list) -> float:
+    """
+    Runs rpmqc in a child process.
+
+    Args:
+        args: rpmqc command line arguments.
+
+    Returns:
+        The process wall time in seconds.
+    """
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-c', RPMQC_MAIN] + args,
+                          stdout=subprocess.DEVNULL)
+    wall_time = time.perf_counter() - start
+    # exit code 1 means that some tests failed which is expected
+    if proc.returncode not in (0, 1):
+        raise Exception(f'rpmqc failed with exit code {proc.returncode}')
+    return wall_time
+
+
+def request_server(socket_path: str, rpm_path: str) -> float:
+    """
+    Inspects an RPM package using the inspection server protocol directly.
+
+    Args:
+        socket_path: Inspection server socket path.
+        rpm_path: RPM package path.
+
+    Returns:
+        The request wall time in seconds.
+    """
+    start = time.perf_counter()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({'paths': [rpm_path]}).encode('utf-8') +
+                     b'\n')
+        with sock.makefile('rb') as response:
+            for line in response:
+                message = json.loads(line)
+                if 'error' in message:
+                    raise Exception(message['error'])
+                if 'summary' in message:
+                    break
+    return time.perf_counter() - start
+
+
+def wait_for_socket(socket_path: str, server: subprocess.Popen,
+                    timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise Exception(f'rpmqc serve failed with exit code '
+                            f'{server.returncode}')
+        if os.path.exists(socket_path):
+            return
+        time.sleep(0.05)
+    raise Exception('rpmqc serve has not started in time')
+
+
+def print_results(results: dict):
+    print(f'{"mode":<12} {"runs":>6} {"median ms":>10} {"p95 ms":>10} '
+          f'{"min ms":>10}')
+    for mode, times in results.items():
+        times = sorted(times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f'{mode:<12} {len(times):>6} '
+              f'{statistics.median(times) * 1000:>10.1f} '
+              f'{p95 * 1000:>10.1f} {times[0] * 1000:>10.1f}')
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compares cold rpmqc invocations latency with the '
+                    'inspection server'
+    )
+    parser.add_argument('-c', '--config', required=True,
+                        help='rpmqc configuration file path')
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help='number of inspections per package and mode '
+                             '(default: 20)')
+    parser.add_argument('rpm_paths', metavar='PACKAGE.rpm', nargs='+',
+                        help='RPM package to inspect')
+    args = parser.parse_args()
+    rpm_paths = [os.path.abspath(p) for p in args.rpm_paths]
+    results = {'cold': [], 'client': [], 'raw socket': []}
+    with tempfile.TemporaryDirectory(prefix='rpmqc-bench-') as tmp_dir:
+        socket_path = os.path.join(tmp_dir, 'rpmqc.sock')
+        server = subprocess.Popen([sys.executable, '-c', RPMQC_MAIN, 'serve',
+                                   '-c', args.config, socket_path],
+                                  stderr=subprocess.DEVNULL)
+        try:
+            wait_for_socket(socket_path, server)
+            for rpm_path in rpm_paths:
+                for _ in range(args.repeat):
+                    results['cold'].append(run_rpmqc(
+                        ['inspect-rpm', '-c', args.config, rpm_path]
+                    ))
+                    results['client'].append(run_rpmqc(
+                        ['inspect-rpm', '--server', socket_path, rpm_path]
+                    ))
+                    results['raw socket'].append(
+                        request_server(socket_path, rpm_path)
+                    )
+        finally:
+            server.terminate()
+            server.wait()
+    print_results(results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
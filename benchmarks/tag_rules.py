@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+"""
+Measures the RPM tag rules throughput (rules checked per second) on
+a repository.
+
+The tags inspector is run for every repository package. Its compiled rule
+table is compared with the per-package rule resolution used before: tag IDs
+looked up in the rpm module and the configuration traversed for every
+package. Tag values are taken from repository metadata where available,
+the --headers option forces reading them from package headers instead.
+Array tag rules ("all"/"any") are skipped by the legacy mode because it
+doesn't support them.
+
+Usage:
+    tag_rules.py -c rpmqc.yml [--repeat 3] [--headers] REPOSITORY
+"""
+
+import argparse
+import re
+import sys
+import time
+
+import rpm
+
+from msvsphere.rpmqc.config import Config
+from msvsphere.rpmqc.inspectors.pkg_tags_inspector import PkgTagsInspector
+from msvsphere.rpmqc.reporter import ReporterBuffer
+from msvsphere.rpmqc.repository import load_repo_packages
+from msvsphere.rpmqc.rpm_package import RPMPackage
+
+
+def legacy_inspect(cfg: Config, pkg: RPMPackage, reporter: ReporterBuffer):
+    """
+    Checks RPM tag rules the way the tags inspector did before rules were
+    compiled.
+    """
+    metadata_tags = pkg.info.tags if pkg.info else {}
+    tags_cfg = cfg.data.get('package', {}).get('tags', {})
+    for tag_name, expected in tags_cfg.items():
+        if isinstance(expected, dict):
+            continue
+        tag_id = getattr(rpm, f'RPMTAG_{tag_name.upper()}')
+        if tag_name in metadata_tags:
+            value = metadata_tags[tag_name]
+        else:
+            value = pkg.hdr[tag_id]
+        if isinstance(expected, re.Pattern):
+            rslt = value is not None and expected.match(value)
+            expected_str = f'regex:{expected.pattern}'
+        else:
+            rslt = (value == expected)
+            expected_str = expected
+        test_case = f'{tag_name} RPM tag value is {expected_str}'
+        if rslt:
+            reporter.passed(test_case)
+        else:
+            reporter.failed(test_case, {
+                'message': f'unexpected {tag_name} RPM tag value',
+                'got': value,
+                'expected': expected_str
+            })
+
+
+def run(inspect, packages: list) -> tuple:
+    """
+    Runs a tags inspection function for all packages.
+
+    Args:
+        inspect: Function that accepts an RPM package and a reporter.
+        packages: RPM packages to inspect.
+
+    Returns:
+        The number of checked rules and the wall time in seconds.
+    """
+    ts = rpm.TransactionSet('', rpm._RPMVSF_NOSIGNATURES)
+    checks = 0
+    start = time.perf_counter()
+    for pkg_info in packages:
+        reporter = ReporterBuffer()
+        with RPMPackage(pkg_info.path, pkg_info, ts) as pkg:
+            inspect(pkg, reporter)
+        checks += len(reporter.results)
+    return checks, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Measures RPM tag rules checked per second'
+    )
+    parser.add_argument('-c', '--config', required=True,
+                        help='rpmqc configuration file path')
+    parser.add_argument('-r', '--repeat', type=int, default=3,
+                        help='number of runs per mode, the fastest one is '
+                             'reported (default: 3)')
+    parser.add_argument('--headers', action='store_true',
+                        help='read tag values from package headers even if '
+                             'they are available in repository metadata')
+    parser.add_argument('repo_path', metavar='REPOSITORY',
+                        help='repository path')
+    args = parser.parse_args()
+    cfg = Config(args.config)
+    packages = load_repo_packages(args.repo_path)
+    if args.headers:
+        for pkg_info in packages:
+            pkg_info.tags = {}
+    inspector = PkgTagsInspector(cfg)
+    modes = {
+        'compiled': inspector.inspect,
+        'legacy': lambda pkg, reporter: legacy_inspect(cfg, pkg, reporter)
+    }
+    print(f'{len(packages)} packages, {len(inspector.rules)} rules')
+    print(f'{"mode":<10} {"checks":>10} {"seconds":>9} {"rules/s":>12}')
+    for mode, inspect in modes.items():
+        checks, wall_time = min((run(inspect, packages)
+                                 for _ in range(args.repeat)),
+                                key=lambda r: r[1])
+        print(f'{mode:<10} {checks:>10} {wall_time:>9.3f} '
+              f'{checks / wall_time:>12.0f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
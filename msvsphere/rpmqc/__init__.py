@@ -1,10 +1,60 @@
+import os
 import sys
-if sys.version_info >= (3, 8):
-    from importlib import metadata
-else:
-    import importlib_metadata as metadata
+from typing import Optional
 
 __all__ = ["__version__"]
 
 
-__version__ = metadata.version('rpmqc')
+# installed distribution metadata directories and the metadata file names
+METADATA_FILES = (('.dist-info', 'METADATA'), ('.egg-info', 'PKG-INFO'))
+
+
+def _find_version() -> Optional[str]:
+    """
+    Reads the rpmqc version from the installed distribution metadata.
+
+    Distributions are looked up in the sys.path order the same way as
+    importlib metadata does it, but without importing it.
+
+    Returns:
+        The rpmqc version or None if the distribution metadata isn't found.
+    """
+    for path in sys.path:
+        try:
+            names = sorted(os.listdir(path or '.'))
+        except OSError:
+            continue
+        for name in names:
+            for suffix, metadata_name in METADATA_FILES:
+                if not name.endswith(suffix) or \
+                        name[:-len(suffix)].split('-')[0] != 'rpmqc':
+                    continue
+                try:
+                    with open(os.path.join(path, name, metadata_name),
+                              'r', encoding='utf-8') as fd:
+                        for line in fd:
+                            if line.startswith('Version:'):
+                                return line[len('Version:'):].strip()
+                            elif not line.strip():
+                                # the end of the metadata headers
+                                break
+                except OSError:
+                    continue
+    return None
+
+
+def __getattr__(name: str):
+    # NOTE: the version is determined on first access because importlib
+    #       metadata is slow to import and most commands don't need it,
+    #       it is used only if the distribution metadata isn't found
+    if name == '__version__':
+        version = _find_version()
+        if version is None:
+            if sys.version_info >= (3, 8):
+                from importlib import metadata
+            else:
+                import importlib_metadata as metadata
+            version = metadata.version('rpmqc')
+        globals()['__version__'] = version
+        return version
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import os.path
+import re
+import sqlite3
+import time
+from typing import Optional, TYPE_CHECKING
+
+from . import __version__
+from .config import Config
+from .ima_utils import iter_ima_cert_files
+from .inspectors.registry import discover_inspectors
+from .reporter import ReporterBuffer
+
+if TYPE_CHECKING:
+    from .rpm_package import RPMPackageInfo
+
+__all__ = ['get_cache_dir', 'get_config_fingerprint', 'ResultCache']
+
+
+def get_cache_dir() -> str:
+    """
+    Returns the rpmqc cache directory path.
+
+    The XDG_CACHE_HOME environment variable is respected, ~/.cache is used
+    if it is not defined.
+
+    Returns:
+        Cache directory path.
+    """
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.expanduser('~/.cache')
+    return os.path.join(cache_home, 'rpmqc')
+
+
+# signature options that only affect how fast packages are inspected, they
+# are excluded from the configuration fingerprint: the number of IMA
+# verification threads (ima_threads) and the verified IMA signatures memo
+# size and location (ima_memo_size, ima_memo_path). ima_payload_digest is
+# excluded as well unless ima_mode is "header", the payload is always
+# verified in the "payload" mode
+PERFORMANCE_SIGNATURE_OPTIONS = ('ima_memo_path', 'ima_memo_size',
+                                 'ima_threads')
+
+
+def get_config_fingerprint(cfg: Config) -> str:
+    """
+    Calculates a configuration fingerprint.
+
+    The fingerprint covers the validated configuration data, the content of
+    the configured IMA certificates, the installed inspectors and the rpmqc
+    version, so that cached results are never reused if anything that
+    affects them has changed. Performance options (see
+    PERFORMANCE_SIGNATURE_OPTIONS) and package filters, which only select
+    packages to inspect, are excluded.
+
+    Args:
+        cfg: Configuration object.
+
+    Returns:
+        Configuration fingerprint (SHA256 hex digest).
+    """
+    def encode(obj):
+        if isinstance(obj, re.Pattern):
+            return f'regex:{obj.pattern}'
+        raise TypeError(f'unsupported configuration value type {type(obj)}')
+
+    hasher = hashlib.sha256()
+    hasher.update(__version__.encode('utf-8'))
+    sign_cfg = cfg.data.get('package', {}).get('signatures', {})
+    results_sign_cfg = {key: value for key, value in sign_cfg.items()
+                        if key not in PERFORMANCE_SIGNATURE_OPTIONS}
+    if results_sign_cfg.get('ima_mode', 'payload') == 'payload':
+        results_sign_cfg.pop('ima_payload_digest', None)
+    data = {key: value for key, value in cfg.data.items()
+            if key != 'filters'}
+    data['package'] = dict(data.get('package', {}),
+                           signatures=results_sign_cfg)
+    hasher.update(json.dumps(data, sort_keys=True,
+                             default=encode).encode('utf-8'))
+    for cert_path in iter_ima_cert_files(sign_cfg.get('ima_cert_path', [])):
+        with open(cert_path, 'rb') as fd:
+            hasher.update(fd.read())
+    for entry in discover_inspectors():
+        hasher.update(f'{entry}\n'.encode('utf-8'))
+    return hasher.hexdigest()
+
+
+class ResultCache:
+
+    """
+    On-disk (SQLite) cache of RPM package inspection results.
+
+    Results are keyed by a package checksum and a configuration fingerprint.
+    The least recently used entries are evicted when the cache size exceeds
+    the limit.
+    """
+
+    DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+    # number of database modifications after which a transaction is committed
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, cfg: Config, path: Optional[str] = None,
+                 max_size: int = DEFAULT_MAX_SIZE, refresh: bool = False):
+        """
+        Opens (or creates) an inspection results cache.
+
+        Args:
+            cfg: Configuration object.
+            path: Cache database file path. The default location inside
+                the rpmqc cache directory is used if not specified.
+            max_size: Maximum total size of the cached results in bytes.
+            refresh: Ignore existing cache entries and overwrite them with
+                fresh results.
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), 'results.sqlite')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._fingerprint = get_config_fingerprint(cfg)
+        self._max_size = max_size
+        self._refresh = refresh
+        self._pending = 0
+        self._db = sqlite3.connect(path, timeout=60)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                         'key TEXT PRIMARY KEY, data TEXT NOT NULL, '
+                         'size INTEGER NOT NULL, accessed REAL NOT NULL)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS results_accessed_idx '
+                         'ON results (accessed)')
+        self._size = self._db.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results'
+        ).fetchone()[0]
+
+    def get(self, pkg_info: 'RPMPackageInfo') -> Optional[ReporterBuffer]:
+        """
+        Returns cached inspection results for an RPM package.
+
+        Args:
+            pkg_info: RPM package.
+
+        Returns:
+            Cached inspection results or None if there are no results.
+        """
+        key = self._get_key(pkg_info)
+        if key is None or self._refresh:
+            return None
+        row = self._db.execute('SELECT data FROM results WHERE key = ?',
+                               (key,)).fetchone()
+        if row is None:
+            return None
+        self._db.execute('UPDATE results SET accessed = ? WHERE key = ?',
+                         (time.time(), key))
+        self._modified()
+        return ReporterBuffer.from_json(
+            row[0], description=os.path.basename(pkg_info.path)
+        )
+
+    def put(self, pkg_info: 'RPMPackageInfo', results: ReporterBuffer):
+        """
+        Saves RPM package inspection results to the cache.
+
+        Args:
+            pkg_info: RPM package.
+            results: Inspection results.
+        """
+        key = self._get_key(pkg_info)
+        if key is None:
+            return
+        data = results.to_json()
+        size = len(key) + len(data)
+        row = self._db.execute('SELECT size FROM results WHERE key = ?',
+                               (key,)).fetchone()
+        if row is not None:
+            self._size -= row[0]
+        self._db.execute('REPLACE INTO results (key, data, size, accessed) '
+                         'VALUES (?, ?, ?, ?)', (key, data, size, time.time()))
+        self._size += size
+        if self._size > self._max_size:
+            self._evict()
+        self._modified()
+
+    def close(self):
+        self._db.commit()
+        self._db.close()
+
+    def _evict(self):
+        # remove the least recently used entries until the cache takes less
+        # than 90% of the limit, so that we don't evict on every insert
+        target_size = self._max_size * 0.9
+        cursor = self._db.execute(
+            'SELECT key, size FROM results ORDER BY accessed'
+        )
+        evicted = []
+        for key, size in cursor:
+            if self._size <= target_size:
+                break
+            evicted.append((key,))
+            self._size -= size
+        self._db.executemany('DELETE FROM results WHERE key = ?', evicted)
+        self._db.commit()
+
+    def _modified(self):
+        self._pending += 1
+        if self._pending >= self.COMMIT_INTERVAL:
+            self._db.commit()
+            self._pending = 0
+
+    def _get_key(self, pkg_info: 'RPMPackageInfo') -> Optional[str]:
+        if not pkg_info.checksum:
+            return None
+        return (f'{pkg_info.checksum_type}:{pkg_info.checksum}:'
+                f'{self._fingerprint}')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
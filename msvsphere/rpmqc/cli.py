@@ -1,12 +1,20 @@
 from enum import IntEnum
 import argparse
+from contextlib import ExitStack
 import sys
 import traceback
 
-from . import __version__
-from .config import Config
-from .file_utils import normalize_path
-from .runner import run_repo_inspections, run_rpm_inspections
+from .file_utils import normalize_location, normalize_path
+from .filters import FILTER_OPTIONS, PackageFilter, parse_size, parse_time
+from .limits import InspectionLimits
+from .metrics import MetricsCollector
+from .reporter import open_report_output, REPORTERS
+from .sharding import Shard
+
+# NOTE: subcommand implementations are imported on demand, so that every
+#       subcommand loads only modules it uses (e.g. rpm, createrepo_c,
+#       cryptography are slow to import) and usage errors are reported
+#       quickly
 
 
 class ExitCodes(IntEnum):
@@ -37,6 +45,216 @@ class ArgParser(argparse.ArgumentParser):
         self.exit(ExitCodes.USAGE_ERROR, f'{self.prog}: {message}\n')
 
 
+class VersionAction(argparse.Action):
+
+    """
+    Prints the program version, the version is determined only if requested.
+    """
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS,
+                 default=argparse.SUPPRESS,
+                 help="show program's version number and exit"):
+        super().__init__(option_strings=option_strings, dest=dest,
+                         default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        from . import __version__
+        sys.stdout.write(f'{parser.prog} {__version__}\n')
+        parser.exit()
+
+
+def positive_int(value: str) -> int:
+    """
+    Converts a command line argument value to a positive integer.
+
+    Args:
+        value: Command line argument value.
+
+    Returns:
+        Positive integer.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a positive integer.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'invalid positive integer: {value}')
+    return number
+
+
+def shard_spec(value: str) -> Shard:
+    """
+    Converts a command line argument value to a shard.
+
+    Args:
+        value: Command line argument value in the "I/N" format.
+
+    Returns:
+        Shard.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid shard.
+    """
+    try:
+        return Shard.parse(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'invalid shard: {value}, I/N where 1 <= I <= N is expected'
+        )
+
+
+def time_spec(value: str) -> int:
+    """
+    Converts a command line argument value to a Unix timestamp.
+
+    Args:
+        value: Command line argument value, either a Unix timestamp or a date
+            in the "YYYY-MM-DD[ HH:MM:SS]" format (UTC).
+
+    Returns:
+        Unix timestamp.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid time.
+    """
+    try:
+        return parse_time(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'invalid time: {value}, a Unix timestamp or YYYY-MM-DD '
+            f'[HH:MM:SS] is expected'
+        )
+
+
+def size_spec(value: str) -> int:
+    """
+    Converts a command line argument value to a number of bytes.
+
+    Args:
+        value: Command line argument value, e.g. "1024", "512K" or "1.5G".
+
+    Returns:
+        Number of bytes.
+
+    Raises:
+        argparse.ArgumentTypeError: If the value is not a valid size.
+    """
+    try:
+        return parse_size(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid size: {value}')
+
+
+def add_inspection_arguments(parser: argparse.ArgumentParser,
+                             config_required: bool = True):
+    """
+    Adds arguments that are common for all inspection commands.
+
+    Args:
+        parser: Inspection command arguments parser.
+        config_required: Whether the configuration file is required.
+    """
+    parser.add_argument('-c', '--config', required=config_required,
+                        help='configuration file path')
+    # NOTE: the default is set after the arguments validation, so that
+    #       an explicitly specified value can be detected
+    parser.add_argument('-j', '--jobs', type=positive_int,
+                        help='number of parallel inspection processes '
+                             '(default: 1)')
+    parser.add_argument('-f', '--format', choices=sorted(REPORTERS),
+                        default='tap', help='report format (default: tap)')
+    parser.add_argument('-o', '--output', metavar='REPORT_PATH',
+                        help='report file path, the report is compressed if '
+                             'the file name ends with .gz or .zst '
+                             '(default: standard output)')
+    parser.add_argument('--metrics', metavar='METRICS_PATH',
+                        help='write inspection timing and throughput metrics '
+                             'to a file, Prometheus textfile format is used '
+                             'if the file name ends with .prom, JSON '
+                             'otherwise')
+    parser.add_argument('--metrics-top', metavar='N', type=positive_int,
+                        default=10,
+                        help='number of the slowest packages to report in '
+                             'metrics (default: 10)')
+    parser.add_argument('--max-failures', metavar='N', type=positive_int,
+                        help='stop after N failed packages, the remaining '
+                             'packages are reported as skipped')
+    parser.add_argument('--time-budget', metavar='SECONDS', type=positive_int,
+                        help='stop after the specified number of seconds, '
+                             'in-progress inspections are cancelled and '
+                             'the remaining packages are reported as '
+                             'skipped')
+
+
+def add_cache_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds inspection results cache arguments.
+
+    Args:
+        parser: Inspection command arguments parser.
+    """
+    cache_group = parser.add_mutually_exclusive_group()
+    cache_group.add_argument('--no-cache', action='store_true',
+                             help='do not use the inspection results cache')
+    cache_group.add_argument('--refresh-cache', action='store_true',
+                             help='ignore cached inspection results and '
+                                  'replace them with fresh ones')
+
+
+def add_filter_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds repository package filter arguments, they override the "filters"
+    configuration section options of the same name.
+
+    Args:
+        parser: Repository inspection command arguments parser.
+    """
+    filter_group = parser.add_argument_group(
+        'package filters',
+        'inspect only packages selected by repository metadata, other '
+        'packages are neither opened nor reported. Options that accept '
+        'wildcards or architectures can be repeated'
+    )
+    filter_group.add_argument('--include', metavar='GLOB', action='append',
+                              help='inspect only packages whose name '
+                                   'matches a wildcard, e.g. "python3-*"')
+    filter_group.add_argument('--exclude', metavar='GLOB', action='append',
+                              help='skip packages whose name matches '
+                                   'a wildcard, e.g. "*-debuginfo"')
+    filter_group.add_argument('--arch', action='append',
+                              help='inspect only packages of an '
+                                   'architecture, e.g. "x86_64", "noarch" '
+                                   'or "src"')
+    filter_group.add_argument('--exclude-arch', metavar='ARCH',
+                              action='append',
+                              help='skip packages of an architecture')
+    filter_group.add_argument('--sourcerpm', metavar='GLOB', action='append',
+                              help='inspect only packages whose source '
+                                   'package name matches a wildcard')
+    filter_group.add_argument('--exclude-sourcerpm', metavar='GLOB',
+                              action='append',
+                              help='skip packages whose source package name '
+                                   'matches a wildcard')
+    filter_group.add_argument('--built-after', metavar='TIME',
+                              type=time_spec,
+                              help='inspect only packages built at or after '
+                                   'a time: a Unix timestamp or YYYY-MM-DD '
+                                   '[HH:MM:SS] (UTC)')
+    filter_group.add_argument('--built-before', metavar='TIME',
+                              type=time_spec,
+                              help='inspect only packages built before '
+                                   'a time')
+    filter_group.add_argument('--min-size', metavar='SIZE', type=size_spec,
+                              help='inspect only packages of at least this '
+                                   'size, e.g. "1024" or "512K"')
+    filter_group.add_argument('--max-size', metavar='SIZE', type=size_spec,
+                              help='inspect only packages of at most this '
+                                   'size, e.g. "1.5G"')
+
+
 def init_arg_parser() -> ArgParser:
     """
     Initializes a command line argument parser.
@@ -46,8 +264,7 @@ def init_arg_parser() -> ArgParser:
     """
     parser = ArgParser(prog='rpmqc',
                        description='RPM packages quality control tool')
-    parser.add_argument('--version', action='version',
-                        version=f'%(prog)s {__version__}')
+    parser.add_argument('--version', action=VersionAction)
     commands = parser.add_subparsers(dest='command', required=True,
                                      title='inspection commands')
     # repository inspection subcommand
@@ -55,34 +272,219 @@ def init_arg_parser() -> ArgParser:
         'inspect-repo', help='inspect a YUM/DNF repository',
         description='Runs inspections for the entire YUM/DNF repository'
     )
-    inspect_repo_cmd.add_argument('-c', '--config', required=True,
-                                  help='configuration file path')
-    inspect_repo_cmd.add_argument('repo_path', metavar='REPO_PATH',
+    add_inspection_arguments(inspect_repo_cmd)
+    add_cache_arguments(inspect_repo_cmd)
+    add_filter_arguments(inspect_repo_cmd)
+    inspect_repo_cmd.add_argument('--baseline', type=normalize_location,
+                                  help='inspect only packages that were '
+                                       'added or changed since a baseline: '
+                                       'a state file, an old repository '
+                                       'directory or URL, its repomd.xml or '
+                                       'primary.xml file')
+    inspect_repo_cmd.add_argument('--save-state', metavar='STATE_PATH',
                                   type=normalize_path,
-                                  help='path to a repository under test')
+                                  help='save the repository state to a file '
+                                       'if all tests passed, it can be used '
+                                       'as a baseline later')
+    inspect_repo_cmd.add_argument('--shard', metavar='I/N', type=shard_spec,
+                                  help='inspect only the I-th of N parts of '
+                                       'the repository, packages are '
+                                       'distributed between parts by their '
+                                       'size and checksum, so that every '
+                                       'node of a multi-node run gets the '
+                                       'same amount of work (see "rpmqc '
+                                       'merge")')
+    inspect_repo_cmd.add_argument('repo_path', metavar='REPO_PATH',
+                                  type=normalize_location,
+                                  help='path or HTTP(S) URL of a repository '
+                                       'under test')
+    # compose inspection subcommand
+    inspect_compose_cmd = commands.add_parser(
+        'inspect-compose', help='inspect multiple YUM/DNF repositories',
+        description='Runs inspections for multiple YUM/DNF repositories '
+                    '(e.g. a compose), every unique package is inspected '
+                    'only once'
+    )
+    add_inspection_arguments(inspect_compose_cmd)
+    add_cache_arguments(inspect_compose_cmd)
+    add_filter_arguments(inspect_compose_cmd)
+    inspect_compose_cmd.add_argument('compose_path', metavar='PATH',
+                                     nargs='+', type=normalize_path,
+                                     help='path to a repository or a compose '
+                                          'root directory under test')
     # RPM inspection subcommand
     inspect_rpm_cmd = commands.add_parser(
         'inspect-rpm', help='inspect an RPM package',
         description='Runs inspections for a specified RPM package'
     )
-    inspect_rpm_cmd.add_argument('-c', '--config', required=True,
-                                 help='configuration file path')
+    add_inspection_arguments(inspect_rpm_cmd, config_required=False)
+    inspect_rpm_cmd.add_argument('--server', metavar='SOCKET_PATH',
+                                 type=normalize_path,
+                                 help='inspect packages using an inspection '
+                                      'server (see "rpmqc serve"), its '
+                                      'configuration is used instead of '
+                                      '--config')
     inspect_rpm_cmd.add_argument('rpm_path', metavar='RPM_PATH', nargs='+',
                                  type=normalize_path,
                                  help='path to RPM(s) under test')
+    # inspection server subcommand
+    serve_cmd = commands.add_parser(
+        'serve', help='run an inspection server',
+        description='Inspects RPM packages sent by "rpmqc inspect-rpm '
+                    '--server" clients over a Unix socket until interrupted, '
+                    'the configuration and inspectors are loaded only once'
+    )
+    serve_cmd.add_argument('-c', '--config', required=True,
+                           help='configuration file path')
+    serve_cmd.add_argument('-j', '--jobs', type=positive_int, default=1,
+                           help='number of parallel inspection processes '
+                                '(default: 1)')
+    serve_cmd.add_argument('socket_path', metavar='SOCKET_PATH',
+                           type=normalize_path,
+                           help='Unix socket path to listen on')
+    # repository watch subcommand
+    watch_cmd = commands.add_parser(
+        'watch', help='inspect packages as they land in a repository',
+        description='Watches a repository directory and inspects new or '
+                    'replaced RPM packages until interrupted, results are '
+                    'streamed to the report'
+    )
+    add_inspection_arguments(watch_cmd)
+    add_cache_arguments(watch_cmd)
+    watch_cmd.add_argument('--settle-time', metavar='SECONDS',
+                           type=positive_int, default=2,
+                           help='inspect a file only after it has not been '
+                                'changed for the specified number of '
+                                'seconds (default: 2)')
+    watch_cmd.add_argument('--new-only', action='store_true',
+                           help='do not inspect packages that exist at '
+                                'the start')
+    watch_cmd.add_argument('repo_path', metavar='REPO_PATH',
+                           type=normalize_path,
+                           help='path to a repository directory to watch')
+    # TAP reports merge subcommand
+    merge_cmd = commands.add_parser(
+        'merge', help='merge TAP reports of a multi-node run',
+        description='Merges TAP reports of "rpmqc inspect-repo --shard" runs '
+                    'into a single report, the exit code is the same as '
+                    'a single-node run would return'
+    )
+    merge_cmd.add_argument('-o', '--output', metavar='REPORT_PATH',
+                           help='merged report file path, the report is '
+                                'compressed if the file name ends with .gz '
+                                'or .zst (default: standard output)')
+    merge_cmd.add_argument('report_path', metavar='REPORT_PATH', nargs='+',
+                           help='TAP report file path, compressed reports '
+                                'are supported as well')
     return parser
 
 
 def main():
     arg_parser = init_arg_parser()
     args = arg_parser.parse_args(sys.argv[1:])
-    cfg = Config(args.config)
+    if args.command == 'merge':
+        from .merge import merge_tap_reports
+        try:
+            with open_report_output(args.output) as output:
+                success = merge_tap_reports(args.report_path, output)
+        except Exception:
+            traceback.print_exc()
+            sys.exit(ExitCodes.INTERNAL_ERROR)
+        sys.exit(ExitCodes.PASSED if success else ExitCodes.FAILED)
+    remote = getattr(args, 'server', None) is not None
+    if remote and args.metrics:
+        arg_parser.error('--metrics is not supported with --server')
+    elif remote and args.config is not None:
+        arg_parser.error('-c/--config is not supported with --server, the '
+                         'server uses its own configuration')
+    elif remote and args.jobs is not None:
+        arg_parser.error('-j/--jobs is not supported with --server, the '
+                         'server uses its own number of jobs')
+    elif not remote and args.config is None:
+        arg_parser.error('the following arguments are required: -c/--config')
+    elif getattr(args, 'shard', None) and args.save_state:
+        arg_parser.error('--save-state is not supported with --shard')
+    if args.jobs is None:
+        args.jobs = 1
+    cfg = None
+    if not remote:
+        # the inspection server has its own configuration
+        from .config import Config, ConfigError
+        try:
+            cfg = Config(args.config)
+        except ConfigError as e:
+            sys.stderr.write(f'rpmqc: configuration error: {e}\n')
+            sys.exit(ExitCodes.USAGE_ERROR)
     success = False
     try:
-        if args.command == 'inspect-repo':
-            success = run_repo_inspections(cfg, args.repo_path)
-        elif args.command == 'inspect-rpm':
-            success = run_rpm_inspections(cfg, args.rpm_path)
+        if args.command == 'serve':
+            from .server import run_server
+            run_server(cfg, args.socket_path, jobs=args.jobs)
+            sys.exit(ExitCodes.PASSED)
+        with ExitStack() as stack:
+            output = stack.enter_context(open_report_output(args.output))
+            reporter = REPORTERS[args.format](output=output)
+            metrics = MetricsCollector(args.metrics_top) if args.metrics \
+                else None
+            cache = None
+            if args.command in ('inspect-repo', 'inspect-compose',
+                                'watch') and not args.no_cache:
+                from .cache import ResultCache
+                cache = stack.enter_context(
+                    ResultCache(cfg, refresh=args.refresh_cache)
+                )
+            limits = InspectionLimits(args.max_failures, args.time_budget)
+            pkg_filter = None
+            if args.command in ('inspect-repo', 'inspect-compose'):
+                pkg_filter = PackageFilter.from_config(
+                    cfg.data.get('filters', {}),
+                    **{option: getattr(args, option)
+                       for option in FILTER_OPTIONS}
+                )
+            if args.command == 'inspect-repo':
+                from .repository import load_repo_baseline
+                from .runner import run_repo_inspections
+                baseline = None
+                if args.baseline:
+                    baseline = load_repo_baseline(args.baseline)
+                success = run_repo_inspections(cfg, args.repo_path,
+                                               jobs=args.jobs, cache=cache,
+                                               reporter=reporter,
+                                               metrics=metrics,
+                                               baseline=baseline,
+                                               state_path=args.save_state,
+                                               limits=limits,
+                                               shard=args.shard,
+                                               pkg_filter=pkg_filter)
+            elif args.command == 'inspect-compose':
+                from .runner import run_compose_inspections
+                success = run_compose_inspections(
+                    cfg, args.compose_path, jobs=args.jobs, cache=cache,
+                    reporter=reporter, metrics=metrics, limits=limits,
+                    pkg_filter=pkg_filter
+                )
+            elif args.command == 'inspect-rpm' and remote:
+                from .client import run_remote_rpm_inspections
+                success = run_remote_rpm_inspections(args.server,
+                                                     args.rpm_path,
+                                                     reporter=reporter,
+                                                     limits=limits)
+            elif args.command == 'inspect-rpm':
+                from .runner import run_rpm_inspections
+                success = run_rpm_inspections(cfg, args.rpm_path,
+                                              jobs=args.jobs,
+                                              reporter=reporter,
+                                              metrics=metrics,
+                                              limits=limits)
+            elif args.command == 'watch':
+                from .watcher import run_watch_inspections
+                success = run_watch_inspections(
+                    cfg, args.repo_path, jobs=args.jobs, cache=cache,
+                    reporter=reporter, metrics=metrics, limits=limits,
+                    settle_time=args.settle_time, new_only=args.new_only
+                )
+            if metrics is not None:
+                metrics.write(args.metrics)
     except KeyboardInterrupt:
         sys.stderr.write('rpmqc: interrupted by user\n')
         sys.exit(ExitCodes.INTERRUPTED)
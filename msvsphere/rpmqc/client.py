@@ -0,0 +1,134 @@
+import json
+import os.path
+import socket
+import time
+from typing import Iterable, List, Optional
+
+from .limits import InspectionLimits
+from .reporter import Reporter, ReporterBuffer, ReporterTap
+
+__all__ = ['decode_results', 'encode_results', 'run_remote_rpm_inspections']
+
+
+def encode_results(results: ReporterBuffer) -> List[dict]:
+    """
+    Converts RPM package inspection results to the inspection server
+    protocol representation.
+
+    Args:
+        results: RPM package inspection results.
+
+    Returns:
+        List of checks, every check has "name" and "status" keys and optional
+        "details" and "reason" keys.
+    """
+    checks = []
+    for status, description, payload, reason in results.results:
+        check = {'name': description, 'status': status}
+        if payload:
+            check['details'] = payload
+        if reason:
+            check['reason'] = reason
+        checks.append(check)
+    return checks
+
+
+def decode_results(checks: List[dict],
+                   description: Optional[str] = None) -> ReporterBuffer:
+    """
+    Restores RPM package inspection results received from an inspection
+    server.
+
+    Args:
+        checks: List of checks produced by encode_results.
+        description: Test description.
+
+    Returns:
+        RPM package inspection results.
+    """
+    results = ReporterBuffer(description)
+    for check in checks:
+        if check['status'] == 'skipped':
+            results.skipped(check['name'], check.get('details'),
+                            reason=check.get('reason'))
+        else:
+            getattr(results, check['status'])(check['name'],
+                                              check.get('details'))
+    return results
+
+
+def run_remote_rpm_inspections(socket_path: str, rpm_paths: Iterable[str],
+                               reporter: Optional[Reporter] = None,
+                               limits: Optional[InspectionLimits] = None
+                               ) -> bool:
+    """
+    Inspects RPM packages using an inspection server (see rpmqc serve).
+
+    The report is the same as the run_rpm_inspections function produces.
+
+    Args:
+        socket_path: Inspection server Unix socket path.
+        rpm_paths: Absolute RPM package paths.
+        reporter: Reporter to use.
+        limits: Limits that stop the run early, the remaining packages are
+            reported as skipped.
+
+    Returns:
+        True if all tests passed, False otherwise.
+
+    Raises:
+        Exception: If the server failed to inspect a package.
+    """
+    rpm_paths = list(rpm_paths)
+    if reporter is None:
+        reporter = ReporterTap()
+    if limits is None:
+        limits = InspectionLimits()
+    reporter.print_header()
+    processed_count = 0
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(json.dumps({'paths': rpm_paths}).encode('utf-8') +
+                     b'\n')
+        # NOTE: the connection is closed if the run is stopped early, so
+        #       that the server stops sending results
+        with sock.makefile('rb') as response:
+            while processed_count < len(rpm_paths):
+                if limits.deadline is not None:
+                    if limits.time_exceeded:
+                        limits.stop()
+                        break
+                    sock.settimeout(max(limits.deadline - time.monotonic(),
+                                        0.001))
+                try:
+                    line = response.readline()
+                except socket.timeout:
+                    limits.stop()
+                    break
+                if not line:
+                    raise Exception(f'{socket_path}: connection closed '
+                                    f'by the inspection server')
+                message = json.loads(line)
+                if 'disabled' in message:
+                    for inspector in message['disabled']:
+                        reporter.skipped(f'{inspector["title"]} inspection',
+                                         reason=inspector['reason'])
+                    continue
+                elif 'error' in message:
+                    raise Exception(f'{message.get("path", socket_path)}: '
+                                    f'{message["error"]}')
+                name = os.path.basename(rpm_paths[processed_count])
+                processed_count += 1
+                results = decode_results(message['checks'], name)
+                results.replay(reporter)
+                limits.add(results)
+                if limits.failures_exceeded and \
+                        processed_count < len(rpm_paths):
+                    limits.stop()
+                    break
+    for rpm_path in rpm_paths[processed_count:]:
+        reporter.skipped(os.path.basename(rpm_path), reason=limits.reason)
+    reporter.print_plan()
+    reporter.print_summary()
+    reporter.print_footer()
+    return reporter.failed_count == 0
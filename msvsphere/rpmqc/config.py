@@ -1,10 +1,20 @@
 import re
 
+from schema import SchemaError
 import yaml
 
 from .config_schema import ConfigSchema
 
-__all__ = ['Config']
+__all__ = ['Config', 'ConfigError']
+
+
+class ConfigError(Exception):
+
+    """
+    The configuration file can't be read or is invalid.
+    """
+
+    pass
 
 
 def regex_constructor(loader: yaml.Loader,
@@ -24,10 +34,22 @@ class YamlConfigLoader(yaml.SafeLoader):
 class Config:
 
     def __init__(self, cfg_path: str):
+        """
+        Args:
+            cfg_path: Configuration file path.
+
+        Raises:
+            ConfigError: If the configuration file can't be read or is
+                invalid.
+        """
         self.data = self._parse_config_file(cfg_path)
 
     @staticmethod
     def _parse_config_file(cfg_path: str) -> dict:
-        with open(cfg_path, 'r') as fd:
-            raw_cfg = yaml.load(fd.read(), YamlConfigLoader.make_loader())
-        return ConfigSchema.validate(raw_cfg)
+        try:
+            with open(cfg_path, 'r') as fd:
+                raw_cfg = yaml.load(fd.read(),
+                                    YamlConfigLoader.make_loader())
+            return ConfigSchema.validate(raw_cfg)
+        except (OSError, yaml.YAMLError, SchemaError) as e:
+            raise ConfigError(f'{cfg_path}: {e}') from e
@@ -1,19 +1,84 @@
+import datetime
 import os.path
 import re
+from typing import List, Union
 
-from schema import Schema, And, Or, Optional, Use
+from schema import Schema, SchemaError, And, Or, Optional, Use
 
 from .file_utils import normalize_path
+from .filters import parse_size, parse_time
 
 __all__ = ['ConfigSchema']
 
 
+NonEmptyStr = And(str, len)
+
+
+def normalize_paths(paths: Union[str, List[str]]) -> List[str]:
+    """
+    Normalizes a single path or a list of paths.
+
+    Args:
+        paths: Path or list of paths to normalize.
+
+    Returns:
+        List of normalized paths.
+    """
+    if isinstance(paths, str):
+        paths = [paths]
+    return [normalize_path(p) for p in paths]
+
+
 StrOrRegex = Or(
     And(str, len), re.Pattern,
     error='either a non-empty string or regular expression is required'
 )
 
 
+TagName = And(str, lambda s: re.match(r'^[a-zA-Z][a-zA-Z0-9_]*$', s),
+              error='RPM tag name should be an identifier, e.g. "vendor"')
+
+
+def validate_tag_names(tags_cfg: dict) -> bool:
+    """
+    Checks that RPM tag rules refer to tags known to RPM.
+
+    Args:
+        tags_cfg: The "package.tags" configuration section.
+
+    Returns:
+        True if all RPM tags are known.
+
+    Raises:
+        SchemaError: If an RPM tag is unknown.
+    """
+    if not tags_cfg:
+        return True
+    # NOTE: rpm is slow to import, so it is imported only if tag rules are
+    #       configured
+    from .tag_rules import get_tag_id
+    for tag_name in tags_cfg:
+        if get_tag_id(tag_name) is None:
+            raise SchemaError(f'unknown RPM tag "{tag_name}"')
+    return True
+
+
+# a single value or a list of values, a list is always returned
+StrList = And(Or(NonEmptyStr, [NonEmptyStr]),
+              Use(lambda v: [v] if isinstance(v, str) else v),
+              error='either a non-empty string or a list of them is required')
+
+
+Time = And(Or(int, datetime.date, NonEmptyStr), Use(parse_time),
+           error='either a Unix timestamp or a date in the YYYY-MM-DD '
+                 '[HH:MM:SS] format is required')
+
+
+Size = And(Or(int, NonEmptyStr), Use(parse_size),
+           error='either a number of bytes or a size with a K, M, G or T '
+                 'suffix is required')
+
+
 ConfigSchema = Schema({
     'package': {
         Optional('signatures', default={}): {
@@ -25,14 +90,52 @@ ConfigSchema = Schema({
                 str, Use(str.upper)
             ),
             Optional('ima_cert_path'): And(
-                str, Use(normalize_path), lambda p: os.path.exists(p),
-                error='IMA certificate file does not exist'
-            )
+                Or(NonEmptyStr, And([NonEmptyStr], len)),
+                Use(normalize_paths),
+                lambda paths: all(os.path.exists(p) for p in paths),
+                error='IMA certificate file or directory does not exist'
+            ),
+            Optional('ima_mode', default='payload'): Or(
+                'payload', 'header',
+                error='IMA mode should be either "payload" or "header"'
+            ),
+            Optional('ima_payload_digest', default=False): bool,
+            Optional('ima_threads', default=1): And(
+                int, lambda n: n > 0,
+                error='IMA threads number should be a positive integer'
+            ),
+            Optional('ima_memo_size'): And(
+                int, lambda n: n >= 0,
+                error='IMA memo size should be a non-negative integer'
+            ),
+            Optional('ima_memo_path'): And(NonEmptyStr, Use(normalize_path))
         },
-        Optional('tags', default={}): {
-            Optional('buildhost'): StrOrRegex,
-            Optional('packager'): StrOrRegex,
-            Optional('vendor'): StrOrRegex
-        }
+        Optional('tags', default={}): And({
+            Optional(TagName): Or(
+                StrOrRegex, {'all': StrOrRegex}, {'any': StrOrRegex},
+                error='either a non-empty string, regular expression or '
+                      'a dictionary with a single "all" or "any" key is '
+                      'required'
+            )
+        }, validate_tag_names)
+    },
+    # inspectors settings keyed by their names: any inspector can be
+    # disabled (e.g. "tags: false"), other values are third-party inspectors
+    # settings which are validated by the inspectors themselves
+    Optional('inspectors'): {
+        Optional(NonEmptyStr): object
+    },
+    # repository packages to inspect, see PackageFilter
+    Optional('filters'): {
+        Optional('include'): StrList,
+        Optional('exclude'): StrList,
+        Optional('arch'): StrList,
+        Optional('exclude_arch'): StrList,
+        Optional('sourcerpm'): StrList,
+        Optional('exclude_sourcerpm'): StrList,
+        Optional('built_after'): Time,
+        Optional('built_before'): Time,
+        Optional('min_size'): Size,
+        Optional('max_size'): Size
     }
 })
@@ -1,6 +1,26 @@
 import os.path
 
-__all__ = ['normalize_path']
+__all__ = ['is_url', 'normalize_location', 'normalize_path',
+           'READ_CHUNK_SIZE']
+
+
+# files (e.g. package payload entries or downloaded packages) are read in
+# chunks of this size, so that memory consumption doesn't depend on a file
+# size
+READ_CHUNK_SIZE = 256 * 1024
+
+
+def is_url(path: str) -> bool:
+    """
+    Checks if a repository or package location is an HTTP(S) URL.
+
+    Args:
+        path: Location to check.
+
+    Returns:
+        True if the location is an HTTP(S) URL, False otherwise.
+    """
+    return path.startswith(('http://', 'https://'))
 
 
 def normalize_path(path: str) -> str:
@@ -14,3 +34,18 @@ def normalize_path(path: str) -> str:
         Normalized path.
     """
     return os.path.abspath(os.path.expanduser(os.path.expandvars(path)))
+
+
+def normalize_location(location: str) -> str:
+    """
+    Normalizes a local path, HTTP(S) URLs are returned as is.
+
+    Args:
+        location: Path or URL to be normalized.
+
+    Returns:
+        Normalized location.
+    """
+    if is_url(location):
+        return location
+    return normalize_path(location)
@@ -0,0 +1,234 @@
+import calendar
+import datetime
+import fnmatch
+import re
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING, Union
+
+if TYPE_CHECKING:
+    from .rpm_package import RPMPackageInfo
+
+__all__ = ['FILTER_OPTIONS', 'PackageFilter', 'parse_size', 'parse_time']
+
+
+# package filter options, the same names are used in the "filters"
+# configuration section and (with dashes) on the command line
+FILTER_OPTIONS = ('include', 'exclude', 'arch', 'exclude_arch', 'sourcerpm',
+                  'exclude_sourcerpm', 'built_after', 'built_before',
+                  'min_size', 'max_size')
+
+TIME_FORMATS = ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+SIZE_RE = re.compile(r'^(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?$', re.IGNORECASE)
+
+SIZE_UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30, 'T': 1 << 40}
+
+
+def parse_time(value: Union[int, str, datetime.date]) -> int:
+    """
+    Converts a time to a Unix timestamp.
+
+    Args:
+        value: Unix timestamp, date or date and time, either a string in
+            the "YYYY-MM-DD[ HH:MM:SS]" format or a datetime object.
+            The UTC time zone is used if the time zone isn't specified.
+
+    Returns:
+        Unix timestamp.
+
+    Raises:
+        ValueError: If the value is not a valid time.
+    """
+    if isinstance(value, bool):
+        raise ValueError(f'invalid time: {value}')
+    elif isinstance(value, int):
+        return value
+    elif isinstance(value, str):
+        text = value.strip()
+        if text.isdigit():
+            return int(text)
+        for time_format in TIME_FORMATS:
+            try:
+                value = datetime.datetime.strptime(text, time_format)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f'invalid time: {text}')
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return int(value.timestamp())
+    elif isinstance(value, datetime.date):
+        return calendar.timegm(value.timetuple())
+    raise ValueError(f'invalid time: {value!r}')
+
+
+def parse_size(value: Union[int, str]) -> int:
+    """
+    Converts a size to a number of bytes.
+
+    Args:
+        value: Number of bytes or a size with a binary unit suffix,
+            e.g. "512K", "1.5M" or "2GiB".
+
+    Returns:
+        Number of bytes.
+
+    Raises:
+        ValueError: If the value is not a valid size.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        if value < 0:
+            raise ValueError(f'invalid size: {value}')
+        return value
+    match = SIZE_RE.match(value.strip()) if isinstance(value, str) else None
+    if not match:
+        raise ValueError(f'invalid size: {value}')
+    number, unit = match.groups()
+    return int(float(number) * SIZE_UNITS[unit.upper()])
+
+
+def _compile_globs(patterns: Iterable[str]) -> Optional[re.Pattern]:
+    """
+    Compiles shell-style wildcards into a single regular expression.
+
+    Args:
+        patterns: Shell-style wildcards.
+
+    Returns:
+        Regular expression that matches any of the wildcards or None if
+        there are no wildcards.
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    return re.compile('|'.join(f'(?:{fnmatch.translate(p)})'
+                               for p in patterns))
+
+
+def _get_source_name(pkg_info: 'RPMPackageInfo') -> Optional[str]:
+    """
+    Returns an RPM package source package name.
+
+    Args:
+        pkg_info: RPM package description.
+
+    Returns:
+        Source package name, the package name for source packages.
+    """
+    sourcerpm = pkg_info.tags.get('sourcerpm')
+    if not sourcerpm:
+        return pkg_info.tags.get('name')
+    # NAME-VERSION-RELEASE.src.rpm
+    return sourcerpm.rsplit('-', 2)[0]
+
+
+class PackageFilter:
+
+    """
+    Selects repository packages to inspect.
+
+    Packages are matched against repository metadata only, so filtered out
+    packages are never opened. Name and source package name wildcards are
+    compiled into a single regular expression each. A package is selected
+    if it matches every configured criterion: any of the include wildcards
+    (or architectures), none of the exclude ones, the build time and the
+    size ranges.
+    """
+
+    def __init__(self, include: Iterable[str] = (),
+                 exclude: Iterable[str] = (), arch: Iterable[str] = (),
+                 exclude_arch: Iterable[str] = (),
+                 sourcerpm: Iterable[str] = (),
+                 exclude_sourcerpm: Iterable[str] = (),
+                 built_after: Optional[int] = None,
+                 built_before: Optional[int] = None,
+                 min_size: Optional[int] = None,
+                 max_size: Optional[int] = None):
+        """
+        Args:
+            include: Package name wildcards, e.g. "python3-*".
+            exclude: Excluded package name wildcards, e.g. "*-debuginfo".
+            arch: Package architectures, e.g. "x86_64", "noarch" or "src".
+            exclude_arch: Excluded package architectures.
+            sourcerpm: Source package name wildcards, e.g. "kernel".
+            exclude_sourcerpm: Excluded source package name wildcards.
+            built_after: Select packages built at or after this time
+                (Unix timestamp).
+            built_before: Select packages built before this time
+                (Unix timestamp).
+            min_size: Minimum package file size in bytes.
+            max_size: Maximum package file size in bytes.
+        """
+        self._include = _compile_globs(include)
+        self._exclude = _compile_globs(exclude)
+        self._arch = frozenset(arch)
+        self._exclude_arch = frozenset(exclude_arch)
+        self._sourcerpm = _compile_globs(sourcerpm)
+        self._exclude_sourcerpm = _compile_globs(exclude_sourcerpm)
+        self.built_after = built_after
+        self.built_before = built_before
+        self.min_size = min_size
+        self.max_size = max_size
+
+    @classmethod
+    def from_config(cls, filters_cfg: Dict[str, Any],
+                    **overrides: Any) -> Optional['PackageFilter']:
+        """
+        Creates a package filter from the configuration.
+
+        Args:
+            filters_cfg: The "filters" configuration section.
+            **overrides: Filter options that replace the configured ones
+                (e.g. command line arguments), None values are ignored.
+
+        Returns:
+            Package filter or None if no filter is configured.
+        """
+        options = dict(filters_cfg)
+        options.update((name, value) for name, value in overrides.items()
+                       if value is not None)
+        if not options:
+            return None
+        return cls(**options)
+
+    def matches(self, pkg_info: 'RPMPackageInfo') -> bool:
+        """
+        Checks if a package should be inspected.
+
+        Args:
+            pkg_info: RPM package description from repository metadata.
+
+        Returns:
+            True if the package is selected, False otherwise.
+        """
+        if self._include or self._exclude:
+            name = pkg_info.tags.get('name') or ''
+            if self._include and not self._include.match(name):
+                return False
+            elif self._exclude and self._exclude.match(name):
+                return False
+        if self._arch and pkg_info.arch not in self._arch:
+            return False
+        elif pkg_info.arch in self._exclude_arch:
+            return False
+        if self._sourcerpm or self._exclude_sourcerpm:
+            source_name = _get_source_name(pkg_info) or ''
+            if self._sourcerpm and not self._sourcerpm.match(source_name):
+                return False
+            elif self._exclude_sourcerpm and \
+                    self._exclude_sourcerpm.match(source_name):
+                return False
+        if self.built_after is not None or self.built_before is not None:
+            build_time = pkg_info.tags.get('buildtime') or 0
+            if self.built_after is not None and \
+                    build_time < self.built_after:
+                return False
+            elif self.built_before is not None and \
+                    build_time >= self.built_before:
+                return False
+        if self.min_size is not None and pkg_info.size < self.min_size:
+            return False
+        elif self.max_size is not None and pkg_info.size > self.max_size:
+            return False
+        return True
@@ -0,0 +1,157 @@
+import collections
+import hashlib
+import http.client
+import threading
+import time
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+import urllib.parse
+
+from .file_utils import READ_CHUNK_SIZE
+
+__all__ = ['HTTPClient', 'HTTPError']
+
+
+class HTTPError(Exception):
+
+    def __init__(self, url: str, status: int, reason: str):
+        super().__init__(f'{url}: HTTP {status} {reason}')
+        self.url = url
+        self.status = status
+
+
+class HTTPClient:
+
+    """
+    Minimal HTTP/1.1 client that keeps connections alive between requests.
+
+    Idle connections are pooled per host, the number of simultaneously used
+    connections is bounded. Connection errors and server errors (5xx, 429)
+    are retried with an exponential backoff.
+    """
+
+    # response body is read in chunks of this size
+    CHUNK_SIZE = READ_CHUNK_SIZE
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, max_connections: int = 4, retries: int = 3,
+                 timeout: float = 60.0, backoff: float = 0.5):
+        """
+        Args:
+            max_connections: Maximum number of simultaneously used
+                connections.
+            retries: Number of retries of a failed request.
+            timeout: Socket operations timeout in seconds.
+            backoff: First retry delay in seconds, it is doubled for every
+                next retry.
+        """
+        self.retries = retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self._idle: Dict[Tuple[str, str], list] = \
+            collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max_connections)
+
+    def download(self, url: str, fd: BinaryIO,
+                 byte_range: Optional[Tuple[int, int]] = None,
+                 checksum_type: Optional[str] = None
+                 ) -> Tuple[int, Optional[str]]:
+        """
+        Downloads a resource into a file.
+
+        Note that a server may ignore the requested range and send the whole
+        resource.
+
+        Args:
+            url: Resource URL.
+            fd: Output file object opened in binary mode.
+            byte_range: First and last (inclusive) byte offsets to download.
+            checksum_type: hashlib algorithm name to calculate the downloaded
+                data checksum with.
+
+        Returns:
+            Number of downloaded bytes and the downloaded data checksum
+            (None if checksum_type isn't specified).
+        """
+        start = fd.tell()
+        result = (0, None)
+
+        def consume(response: http.client.HTTPResponse):
+            nonlocal result
+            # restart from scratch after a failed attempt
+            fd.seek(start)
+            fd.truncate()
+            hasher = hashlib.new(checksum_type) if checksum_type else None
+            size = 0
+            while True:
+                chunk = response.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                fd.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+                size += len(chunk)
+            result = (size, hasher.hexdigest() if hasher else None)
+
+        self._request(url, byte_range, consume)
+        fd.flush()
+        return result
+
+    def close(self):
+        with self._lock:
+            for connections in self._idle.values():
+                for conn in connections:
+                    conn.close()
+            self._idle.clear()
+
+    def _request(self, url: str, byte_range: Optional[Tuple[int, int]],
+                 consume: Callable[[http.client.HTTPResponse], None]):
+        parts = urllib.parse.urlsplit(url)
+        key = (parts.scheme, parts.netloc)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        headers = {}
+        if byte_range is not None:
+            headers['Range'] = f'bytes={byte_range[0]}-{byte_range[1]}'
+        attempt = 0
+        while True:
+            with self._semaphore:
+                conn = self._get_connection(key)
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    if response.status in (200, 206):
+                        consume(response)
+                        self._release(key, conn, response)
+                        return
+                    response.read()
+                    self._release(key, conn, response)
+                    error = HTTPError(url, response.status, response.reason)
+                    if response.status not in self.RETRY_STATUSES:
+                        raise error
+                except (OSError, http.client.HTTPException) as e:
+                    conn.close()
+                    error = e
+            if attempt >= self.retries:
+                raise error
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    def _get_connection(self, key: Tuple[str, str]):
+        with self._lock:
+            if self._idle[key]:
+                return self._idle[key].pop()
+        scheme, netloc = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout)
+        return http.client.HTTPConnection(netloc, timeout=self.timeout)
+
+    def _release(self, key: Tuple[str, str], conn,
+                 response: http.client.HTTPResponse):
+        if response.will_close:
+            conn.close()
+            return
+        with self._lock:
+            self._idle[key].append(conn)
@@ -1,14 +1,26 @@
+import collections
+import hashlib
 import logging
+import os
+import os.path
 import struct
-from typing import Optional, Tuple
+import threading
+from typing import (BinaryIO, Iterable, Iterator, List, Optional, Tuple,
+                    TYPE_CHECKING, Union)
 
-import cryptography.hazmat.primitives.asymmetric.ec as crypto_ec
-import cryptography.hazmat.primitives.hashes as crypto_hashes
-import cryptography.hazmat.primitives.serialization as crypto_serialization
-import cryptography.x509
+from .file_utils import READ_CHUNK_SIZE
+from .limits import check_deadline
 
-__all__ = ['get_ima_pub_key_id', 'load_ima_pub_key', 'parse_ima_signature',
-           'IMAError']
+# NOTE: cryptography modules are slow to import, so they are imported only
+#       when IMA certificates are actually loaded
+if TYPE_CHECKING:
+    import cryptography.hazmat.primitives.asymmetric.ec as crypto_ec
+    import cryptography.hazmat.primitives.asymmetric.rsa as crypto_rsa
+    import cryptography.hazmat.primitives.asymmetric.utils as crypto_utils
+
+__all__ = ['calculate_ima_digest', 'get_ima_pub_key_id', 'iter_ima_cert_files',
+           'load_ima_pub_key', 'parse_ima_signature', 'verify_ima_signature',
+           'IMAError', 'IMAKeyring', 'IMASignatureMemo']
 
 
 class IMAError(Exception):
@@ -16,7 +28,14 @@ class IMAError(Exception):
     pass
 
 
-def get_ima_pub_key_id(pub_key: crypto_ec.EllipticCurvePublicKey) -> str:
+IMAPublicKey = Union['crypto_ec.EllipticCurvePublicKey',
+                     'crypto_rsa.RSAPublicKey']
+
+IMASignatureAlgorithm = Union['crypto_ec.EllipticCurveSignatureAlgorithm',
+                              'crypto_utils.Prehashed']
+
+
+def get_ima_pub_key_id(pub_key: IMAPublicKey) -> str:
     """
     Extracts an IMA signature public key ID.
 
@@ -26,18 +45,23 @@ def get_ima_pub_key_id(pub_key: crypto_ec.EllipticCurvePublicKey) -> str:
     Returns:
         Public key ID.
     """
+    import cryptography.x509
     key_id = cryptography.x509.SubjectKeyIdentifier.from_public_key(pub_key)
     return key_id.digest[-4:].hex()
 
 
 def load_ima_pub_key(
         cert_path: str, log: Optional[logging.Logger] = None
-) -> Tuple[crypto_ec.EllipticCurvePublicKey,
-           crypto_ec.EllipticCurveSignatureAlgorithm]:
+) -> Tuple[IMAPublicKey, IMASignatureAlgorithm]:
     """
     Loads an IMA signature public key from a certificate file.
 
-    This function supports public/private der/pem certificates.
+    This function supports public/private der/pem certificates with either
+    EC or RSA keys.
+
+    The returned signature algorithm expects a precomputed SHA256 digest
+    (see calculate_ima_digest) instead of a file content, use
+    verify_ima_signature to verify a signature with it.
 
     Args:
         cert_path: Certificate file path.
@@ -49,10 +73,18 @@ def load_ima_pub_key(
     Raises:
         IMAError: If public key load failed.
     """
+    import cryptography.hazmat.primitives.asymmetric.ec as crypto_ec
+    import cryptography.hazmat.primitives.asymmetric.rsa as crypto_rsa
+    import cryptography.hazmat.primitives.asymmetric.utils as crypto_utils
+    import cryptography.hazmat.primitives.hashes as crypto_hashes
+    import cryptography.hazmat.primitives.serialization as \
+        crypto_serialization
+    import cryptography.x509
     if not log:
         log = logging.getLogger(__name__)
     loaders = (
         (cryptography.x509.load_der_x509_certificate, {}),
+        (cryptography.x509.load_pem_x509_certificate, {}),
         (crypto_serialization.load_pem_private_key, {'password': None}),
         (crypto_serialization.load_der_private_key, {'password': None})
     )
@@ -72,9 +104,10 @@ def load_ima_pub_key(
             #       a signature algorithm, but EL8/9 and Fedora<39 have an
             #       older version, so we have to guess here
             if isinstance(pub_key, crypto_ec.EllipticCurvePublicKey):
-                sign_algo = crypto_ec.ECDSA(hash_algo)
+                sign_algo = crypto_ec.ECDSA(crypto_utils.Prehashed(hash_algo))
+            elif isinstance(pub_key, crypto_rsa.RSAPublicKey):
+                sign_algo = crypto_utils.Prehashed(hash_algo)
             else:
-                # TODO: add RSA keys support
                 raise IMAError(f'unsupported IMA public key type '
                                f'{type(pub_key)}')
             return pub_key, sign_algo
@@ -84,6 +117,336 @@ def load_ima_pub_key(
     raise IMAError(f'failed to load IMA public key from {cert_path}')
 
 
+def iter_ima_cert_files(cert_paths: Iterable[str]) -> Iterator[str]:
+    """
+    Iterates over IMA certificate files.
+
+    Args:
+        cert_paths: Certificate file and/or directory paths. Every regular
+            file inside a directory is considered a certificate.
+
+    Returns:
+        Iterator over certificate file paths.
+    """
+    for cert_path in cert_paths:
+        if not os.path.isdir(cert_path):
+            yield cert_path
+            continue
+        for file_name in sorted(os.listdir(cert_path)):
+            file_path = os.path.join(cert_path, file_name)
+            if os.path.isfile(file_path):
+                yield file_path
+
+
+def verify_ima_signature(
+        pub_key: IMAPublicKey, sign_algo: IMASignatureAlgorithm,
+        signature: bytes, digest: bytes
+):
+    """
+    Verifies an IMA signature of a file.
+
+    Args:
+        pub_key: IMA signature public key.
+        sign_algo: Signature algorithm returned by load_ima_pub_key.
+        signature: File signature.
+        digest: File content SHA256 digest.
+
+    Raises:
+        cryptography.exceptions.InvalidSignature: If the signature is invalid.
+    """
+    import cryptography.hazmat.primitives.asymmetric.padding as \
+        crypto_padding
+    import cryptography.hazmat.primitives.asymmetric.rsa as crypto_rsa
+    if isinstance(pub_key, crypto_rsa.RSAPublicKey):
+        pub_key.verify(signature, digest, crypto_padding.PKCS1v15(),
+                       sign_algo)
+    else:
+        pub_key.verify(signature, digest, sign_algo)
+
+
+class IMASignatureMemo:
+
+    """
+    Bounded memo of already verified IMA signatures.
+
+    The same file (e.g. a license text) signed by the same key is usually
+    shipped in many packages: multilib packages, the same package in several
+    repositories, rebuilds that don't change the file. A memo entry is
+    a SHA256 digest of a public key fingerprint, a file digest and its
+    signature, so a repeated verification is a dictionary lookup instead of
+    an ECDSA/RSA verification. Only valid signatures are memoized.
+
+    The least recently used entries are evicted from memory if the memo
+    exceeds its size. Entries can optionally be persisted to an SQLite
+    database, so that they are reused across runs and by other processes.
+    The methods can be called from multiple threads.
+    """
+
+    DEFAULT_MAX_SIZE = 65536
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE,
+                 path: Optional[str] = None):
+        """
+        Args:
+            max_size: Maximum number of entries kept in memory, the same
+                number of the most recently added entries is kept in the
+                database.
+            path: Database file path, the memo isn't persisted if not
+                specified.
+        """
+        self.max_size = max_size
+        self.path = path
+        # memo lookup statistics
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        # entries that are not saved to the database yet
+        self._unsaved = []
+        # NOTE: the database is opened on first use, so that a connection is
+        #       never inherited by forked worker processes
+        self._db = None
+
+    @staticmethod
+    def get_key(pub_key_fingerprint: bytes, signature: bytes,
+                digest: bytes) -> bytes:
+        """
+        Calculates a memo entry key.
+
+        Args:
+            pub_key_fingerprint: Signature public key fingerprint (see
+                IMAKeyring).
+            signature: File signature.
+            digest: File content SHA256 digest.
+
+        Returns:
+            Memo entry key.
+        """
+        hasher = hashlib.sha256(pub_key_fingerprint)
+        hasher.update(digest)
+        hasher.update(signature)
+        return hasher.digest()
+
+    def check(self, key: bytes) -> bool:
+        """
+        Checks whether a signature was already verified and updates the
+        lookup statistics.
+
+        Args:
+            key: Memo entry key (see get_key).
+
+        Returns:
+            True if the signature was verified before, False otherwise.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True
+            if self.path is not None and self._load(key):
+                self._remember(key)
+                # re-save the entry, so that the most recently used entries
+                # are kept in the database
+                self._unsaved.append(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, key: bytes):
+        """
+        Memoizes a verified signature.
+
+        Args:
+            key: Memo entry key (see get_key).
+        """
+        with self._lock:
+            self._remember(key)
+            if self.path is not None:
+                self._unsaved.append(key)
+
+    def flush(self):
+        """
+        Saves new entries to the database.
+        """
+        with self._lock:
+            if not self._unsaved:
+                return
+            db = self._connect()
+            db.executemany('REPLACE INTO signatures (key) VALUES (?)',
+                           [(key,) for key in self._unsaved])
+            # NOTE: rowids grow monotonically, so the oldest entries have
+            #       the smallest ones
+            db.execute('DELETE FROM signatures WHERE rowid <= '
+                       '(SELECT MAX(rowid) FROM signatures) - ?',
+                       (self.max_size,))
+            db.commit()
+            self._unsaved.clear()
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key: bytes):
+        self._entries[key] = None
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _load(self, key: bytes) -> bool:
+        row = self._connect().execute(
+            'SELECT 1 FROM signatures WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None
+
+    def _connect(self):
+        if self._db is None:
+            # NOTE: sqlite3 is imported only if the memo is persisted
+            import sqlite3
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._db = sqlite3.connect(self.path, timeout=60,
+                                       check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute('CREATE TABLE IF NOT EXISTS signatures ('
+                             'key BLOB PRIMARY KEY)')
+        return self._db
+
+
+class IMAKeyring:
+
+    """
+    IMA signature public keys indexed by a key ID.
+    """
+
+    def __init__(self, memo: Optional[IMASignatureMemo] = None):
+        """
+        Args:
+            memo: Memo of verified signatures, every signature is verified
+                if not specified.
+        """
+        self.memo = memo
+        self._keys = {}
+
+    @classmethod
+    def load(cls, cert_paths: Iterable[str],
+             log: Optional[logging.Logger] = None,
+             memo: Optional[IMASignatureMemo] = None) -> 'IMAKeyring':
+        """
+        Loads IMA signature public keys from certificate files.
+
+        Args:
+            cert_paths: Certificate file and/or directory paths.
+            log: Logger to use for debug messages.
+            memo: Memo of verified signatures.
+
+        Returns:
+            IMA keyring.
+
+        Raises:
+            IMAError: If a public key load failed.
+        """
+        keyring = cls(memo)
+        for cert_path in iter_ima_cert_files(cert_paths):
+            keyring.add(*load_ima_pub_key(cert_path, log))
+        if not keyring.key_ids:
+            raise IMAError('no IMA certificates found')
+        return keyring
+
+    def add(self, pub_key: IMAPublicKey, sign_algo: IMASignatureAlgorithm):
+        """
+        Adds an IMA signature public key to the keyring.
+
+        Args:
+            pub_key: IMA signature public key.
+            sign_algo: Signature algorithm returned by load_ima_pub_key.
+        """
+        import cryptography.hazmat.primitives.serialization as \
+            crypto_serialization
+        # NOTE: a key ID is just 4 bytes, the whole public key is used to
+        #       identify memoized signatures
+        fingerprint = hashlib.sha256(pub_key.public_bytes(
+            crypto_serialization.Encoding.DER,
+            crypto_serialization.PublicFormat.SubjectPublicKeyInfo
+        )).digest()
+        self._keys[get_ima_pub_key_id(pub_key)] = (pub_key, sign_algo,
+                                                   fingerprint)
+
+    @property
+    def key_ids(self) -> List[str]:
+        """
+        Key IDs of the keyring public keys in the order they were added.
+        """
+        return list(self._keys)
+
+    def verify(self, key_id: str, signature: bytes, digest: bytes) -> bool:
+        """
+        Verifies an IMA signature of a file.
+
+        Args:
+            key_id: Signature public key ID.
+            signature: File signature.
+            digest: File content SHA256 digest.
+
+        Returns:
+            True if the signature is valid, False otherwise.
+
+        Raises:
+            KeyError: If there is no public key with the given ID.
+        """
+        import cryptography.exceptions
+        pub_key, sign_algo, fingerprint = self._keys[key_id]
+        memo_key = None
+        if self.memo is not None:
+            memo_key = self.memo.get_key(fingerprint, signature, digest)
+            if self.memo.check(memo_key):
+                return True
+        try:
+            verify_ima_signature(pub_key, sign_algo, signature, digest)
+        except cryptography.exceptions.InvalidSignature:
+            return False
+        if memo_key is not None:
+            self.memo.add(memo_key)
+        return True
+
+    def __contains__(self, key_id: str) -> bool:
+        return key_id in self._keys
+
+
+def calculate_ima_digest(fd: BinaryIO,
+                         chunk_size: int = READ_CHUNK_SIZE,
+                         deadline: Optional[float] = None) -> bytes:
+    """
+    Calculates a file content digest that is signed by an IMA signature.
+
+    The file is read in fixed-size chunks, so that memory consumption is
+    bounded regardless of the file size.
+
+    Args:
+        fd: File-like object (e.g. an RPM payload archive) to read from.
+        chunk_size: Read chunk size in bytes.
+        deadline: time.monotonic() value the calculation should be finished
+            by, None if there is no deadline.
+
+    Returns:
+        SHA256 digest of the file content.
+
+    Raises:
+        InspectionCancelled: If the deadline passed.
+    """
+    hasher = hashlib.sha256()
+    while True:
+        check_deadline(deadline)
+        chunk = fd.read(chunk_size)
+        if not chunk:
+            break
+        hasher.update(chunk)
+    return hasher.digest()
+
+
 def parse_ima_signature(sig_hdr: bytes) -> Tuple[str, bytes]:
     """
     Extracts an IMA public key and signature from a file signature header.
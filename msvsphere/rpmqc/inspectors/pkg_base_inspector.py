@@ -1,14 +1,41 @@
 import abc
+from typing import Optional
 
 from msvsphere.rpmqc.config import Config
+from msvsphere.rpmqc.limits import check_deadline, InspectionCancelled
+from msvsphere.rpmqc.payload import PayloadVisitor, scan_payload
 from msvsphere.rpmqc.reporter import ReporterTap
-from msvsphere.rpmqc.rpm_package import RPMPackage
+from msvsphere.rpmqc.rpm_package import (PackageParts, RPMPackage,
+                                         RPMPackageInfo)
 
-__all__ = ['Config', 'PkgBaseInspector', 'ReporterTap', 'RPMPackage']
+__all__ = ['check_deadline', 'Config', 'InspectionCancelled', 'PackageParts',
+           'PayloadVisitor', 'PkgBaseInspector', 'ReporterTap', 'RPMPackage',
+           'RPMPackageInfo', 'scan_payload']
 
 
 class PkgBaseInspector(abc.ABC):
 
+    # inspection title used to report the inspector if it is disabled,
+    # the inspector entry point name is used if not set
+    title: Optional[str] = None
+
+    @classmethod
+    def get_disabled_reason(cls, cfg: Config) -> Optional[str]:
+        """
+        Checks if the configuration enables the inspector.
+
+        Disabled inspectors aren't instantiated, they are reported as skipped
+        once per run instead of once per package.
+
+        Args:
+            cfg: Configuration object.
+
+        Returns:
+            None if the inspector is enabled, the reason it is disabled
+            otherwise (e.g. "no PGP key configured").
+        """
+        return None
+
     @abc.abstractmethod
     def __init__(self, cfg: Config):
         pass
@@ -16,3 +43,38 @@ class PkgBaseInspector(abc.ABC):
     @abc.abstractmethod
     def inspect(self, pkg: RPMPackage, reporter: ReporterTap):
         pass
+
+    def get_required_parts(self, pkg_info: RPMPackageInfo) -> PackageParts:
+        """
+        Returns RPM package file parts the inspector needs.
+
+        The runner uses this to select the cheapest way of reading a package:
+        the package file isn't opened at all if no inspector needs it (e.g.
+        all checks can be done using repository metadata), only the signature
+        header is read if nothing else is needed.
+
+        Args:
+            pkg_info: RPM package description.
+
+        Returns:
+            Required RPM package file parts.
+        """
+        return PackageParts.HEADER | PackageParts.PAYLOAD
+
+    def get_payload_visitor(self,
+                            pkg: RPMPackage) -> Optional[PayloadVisitor]:
+        """
+        Subscribes the inspector to the shared RPM package payload pass.
+
+        If a visitor is returned, the runner decompresses the payload once
+        for all subscribed inspectors and reports the visitor results instead
+        of calling the inspect method.
+
+        Args:
+            pkg: RPM package to inspect.
+
+        Returns:
+            Payload visitor or None if the inspector doesn't need the payload
+            content.
+        """
+        return None
@@ -1,65 +1,274 @@
-from contextlib import closing
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
 import stat
+from typing import Any, Iterator, Optional, Tuple
 
 from .pkg_base_inspector import *
 from ..ima_utils import *
 
-import cryptography.exceptions
 import rpm
 
-__all__ = ['PkgIMASignatureInspector']
+__all__ = ['IMASignatureVerifier', 'PkgIMASignatureInspector']
 
 
 class PkgIMASignatureInspector(PkgBaseInspector):
 
     """
     Verifies an RPM package IMA signatures.
+
+    File digests are either calculated from the package payload ("payload"
+    mode) or taken from the package header ("header" mode). The latter doesn't
+    decompress the payload at all, optionally the payload digest is verified
+    to make sure that the header matches the package content.
+
+    If more than one IMA thread is configured, signatures are verified by
+    a thread pool while the main thread decompresses and hashes the payload.
+    A reported failure is always the first failed file in the archive order.
+
+    Verified signatures are memoized (see IMASignatureMemo), so the same
+    file signed by the same key is verified only once per process, or once
+    per memo database if it is configured.
     """
 
+    title = 'IMA signature'
+
+    @classmethod
+    def get_disabled_reason(cls, cfg: Config) -> Optional[str]:
+        sign_cfg = cfg.data.get('package', {}).get('signatures', {})
+        if not sign_cfg.get('ima_cert_path'):
+            return 'no IMA certificate configured'
+        return None
+
     def __init__(self, cfg: Config):
         self.cfg = cfg
         sign_cfg = cfg.data.get('package', {}).get('signatures', {})
-        ima_cert_path = sign_cfg.get('ima_cert_path')
-        if ima_cert_path:
-            self.ima_pub_key, self.ima_sign_algo = (
-                load_ima_pub_key(ima_cert_path)
-            )
-        else:
-            self.ima_pub_key = self.ima_sign_algo = None
+        ima_cert_paths = sign_cfg.get('ima_cert_path')
+        self.ima_mode = sign_cfg.get('ima_mode', 'payload')
+        self.ima_payload_digest = sign_cfg.get('ima_payload_digest', False)
+        self.ima_threads = sign_cfg.get('ima_threads', 1)
+        # NOTE: the thread pool is created on first use, so that it is never
+        #       inherited by forked worker processes
+        self._executor = None
+        memo_size = sign_cfg.get('ima_memo_size',
+                                 IMASignatureMemo.DEFAULT_MAX_SIZE)
+        self.ima_memo = None
+        if memo_size:
+            self.ima_memo = IMASignatureMemo(memo_size,
+                                             sign_cfg.get('ima_memo_path'))
+        self.ima_keyring = IMAKeyring.load(ima_cert_paths, memo=self.ima_memo)
+        self.expected_key_ids = ', '.join(self.ima_keyring.key_ids)
+
+    def get_required_parts(self, pkg_info: RPMPackageInfo) -> PackageParts:
+        if self.ima_mode == 'header' and not self.ima_payload_digest:
+            return PackageParts.HEADER
+        return PackageParts.HEADER | PackageParts.PAYLOAD
+
+    def get_payload_visitor(
+            self, pkg: RPMPackage
+    ) -> Optional['IMASignatureVerifier']:
+        if self.ima_mode == 'header':
+            return None
+        return IMASignatureVerifier(self)
 
     def inspect(self, pkg: RPMPackage, reporter: ReporterTap):
-        if not self.ima_pub_key:
-            reporter.skipped('IMA signature',
-                             reason='no IMA certificate configured')
-            return
-        expected_key_id = get_ima_pub_key_id(self.ima_pub_key)
-        test_case = f'IMA signature is {expected_key_id}'
-        files = rpm.files(pkg.hdr)
-        with closing(rpm.fd(pkg.fd, 'r',
-                            pkg.hdr['payloadcompressor'])) as payload, \
-                closing(files.archive(payload)) as archive:
-            for f in archive:
-                if stat.S_ISDIR(f.mode) or stat.S_ISLNK(f.mode) or \
-                        not archive.hascontent():
-                    # skip directories and symlinks because IMA operates only
-                    # on files, also skip hardlink records
-                    continue
-                elif f.imasig is None:
-                    reporter.failed(test_case, {
-                        'message': 'IMA signature is not found',
-                        'path': f.name
-                    })
-                    return
-                key_id, sig = parse_ima_signature(f.imasig)
-                try:
-                    self.ima_pub_key.verify(sig, archive.read(),
-                                            self.ima_sign_algo)
-                except cryptography.exceptions.InvalidSignature:
-                    reporter.failed(test_case, {
-                        'message': 'unexpected IMA signature',
-                        'got': key_id,
-                        'expected': expected_key_id,
-                        'path': f.name
-                    })
-                    return
-            reporter.passed(test_case)
+        verifier = IMASignatureVerifier(self)
+        if self.ima_mode == 'header':
+            if not self._check_header_digests(pkg, reporter,
+                                              verifier.test_case):
+                return
+            for f, digest in self._iter_header_digests(pkg):
+                check_deadline(pkg.deadline)
+                verifier.verify(f.name, f.imasig, digest)
+                if verifier.done:
+                    break
+        else:
+            pkg.counters['bytes_decompressed'] += scan_payload(pkg,
+                                                               [verifier])
+        verifier.report(reporter)
+        pkg.counters.update(verifier.counters)
+
+    def verify_file(self, path: str, imasig: Optional[bytes],
+                    digest: bytes) -> Optional[dict]:
+        """
+        Verifies a file IMA signature.
+
+        Args:
+            path: File path.
+            imasig: File IMA signature header.
+            digest: File content SHA256 digest.
+
+        Returns:
+            Failure description or None if the signature is valid.
+        """
+        if imasig is None:
+            return {'message': 'IMA signature is not found', 'path': path}
+        key_id, sig = parse_ima_signature(imasig)
+        if key_id not in self.ima_keyring:
+            return {
+                'message': 'unexpected IMA signature',
+                'got': key_id,
+                'expected': self.expected_key_ids,
+                'path': path
+            }
+        elif not self.ima_keyring.verify(key_id, sig, digest):
+            return {
+                'message': 'invalid IMA signature',
+                'key_id': key_id,
+                'path': path
+            }
+        return None
+
+    def get_executor(self) -> ThreadPoolExecutor:
+        """
+        Returns the signatures verification thread pool.
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.ima_threads)
+        return self._executor
+
+    def _check_header_digests(self, pkg: RPMPackage, reporter: ReporterTap,
+                              test_case: str) -> bool:
+        digest_algo = pkg.hdr[rpm.RPMTAG_FILEDIGESTALGO]
+        # NOTE: packages without regular files (e.g. meta packages) may have
+        #       no file digest algorithm tag at all, there is nothing to
+        #       verify in them
+        if digest_algo != rpm.PGPHASHALGO_SHA256 and \
+                next(self._iter_header_digests(pkg), None) is not None:
+            reporter.failed(test_case, {
+                'message': 'unsupported file digest algorithm',
+                'got': digest_algo,
+                'expected': rpm.PGPHASHALGO_SHA256
+            })
+            return False
+        if self.ima_payload_digest:
+            return self._verify_payload_digest(pkg, reporter, test_case)
+        return True
+
+    @staticmethod
+    def _iter_header_digests(pkg: RPMPackage) -> Iterator[Tuple[Any, bytes]]:
+        for f in rpm.files(pkg.hdr):
+            if stat.S_ISDIR(f.mode) or stat.S_ISLNK(f.mode) or \
+                    f.fflags & rpm.RPMFILE_GHOST or not f.digest:
+                # skip directories and symlinks because IMA operates only
+                # on files, ghost files have no content in a package
+                continue
+            yield f, bytes.fromhex(f.digest)
+
+    @staticmethod
+    def _verify_payload_digest(pkg: RPMPackage, reporter: ReporterTap,
+                               test_case: str) -> bool:
+        expected = pkg.hdr[rpm.RPMTAG_PAYLOADDIGEST]
+        if not expected:
+            reporter.failed(test_case, {
+                'message': 'RPM payload digest is not found'
+            })
+            return False
+        expected = expected[0]
+        digest_algo = pkg.hdr[rpm.RPMTAG_PAYLOADDIGESTALGO]
+        if digest_algo != rpm.PGPHASHALGO_SHA256:
+            reporter.failed(test_case, {
+                'message': 'unsupported payload digest algorithm',
+                'got': digest_algo,
+                'expected': rpm.PGPHASHALGO_SHA256
+            })
+            return False
+        # NOTE: the payload digest is calculated over the compressed payload,
+        #       so there is no need to decompress it
+        got = calculate_ima_digest(pkg.fd, deadline=pkg.deadline).hex()
+        if got != expected:
+            reporter.failed(test_case, {
+                'message': 'RPM payload digest mismatch',
+                'got': got,
+                'expected': expected
+            })
+            return False
+        return True
+
+
+class IMASignatureVerifier(PayloadVisitor):
+
+    """
+    Verifies IMA signatures of RPM package files one by one, either during
+    the shared payload pass or using file digests from the package header.
+    """
+
+    def __init__(self, inspector: PkgIMASignatureInspector):
+        """
+        Args:
+            inspector: IMA signature inspector.
+        """
+        super().__init__()
+        self.inspector = inspector
+        self.test_case = f'IMA signature is {inspector.expected_key_ids}'
+        self.failure = None
+        # verification results (or futures) in the archive order
+        self._pending = collections.deque()
+        self._max_pending = inspector.ima_threads * 4
+        self._file = None
+        self._hasher = None
+        memo = inspector.ima_memo
+        # memo statistics before the package verification
+        self._memo_stats = (memo.hits, memo.misses) if memo else None
+
+    def start_file(self, f: Any, has_content: bool) -> bool:
+        if stat.S_ISDIR(f.mode) or stat.S_ISLNK(f.mode) or not has_content:
+            # skip directories and symlinks because IMA operates only
+            # on files, also skip hardlink records
+            return False
+        self._file = (f.name, f.imasig)
+        self._hasher = hashlib.sha256()
+        return True
+
+    def update(self, data: bytes):
+        self._hasher.update(data)
+
+    def end_file(self):
+        self.verify(*self._file, self._hasher.digest())
+        self._file = self._hasher = None
+
+    def verify(self, path: str, imasig: Optional[bytes], digest: bytes):
+        """
+        Verifies a file IMA signature, the verifier is done after the first
+        failure.
+
+        Args:
+            path: File path.
+            imasig: File IMA signature header.
+            digest: File content SHA256 digest.
+        """
+        self.counters['files_verified'] += 1
+        if self.inspector.ima_threads > 1:
+            self._pending.append(self.inspector.get_executor().submit(
+                self.inspector.verify_file, path, imasig, digest
+            ))
+            if len(self._pending) < self._max_pending:
+                return
+            failure = self._pending.popleft().result()
+        else:
+            failure = self.inspector.verify_file(path, imasig, digest)
+        if failure:
+            self._fail(failure)
+
+    def report(self, reporter: ReporterTap):
+        while self._pending and not self.failure:
+            failure = self._pending.popleft().result()
+            if failure:
+                self._fail(failure)
+        memo = self.inspector.ima_memo
+        if memo is not None:
+            hits, misses = self._memo_stats
+            self.counters['ima_memo_hits'] += memo.hits - hits
+            self.counters['ima_memo_misses'] += memo.misses - misses
+            memo.flush()
+        if self.failure:
+            reporter.failed(self.test_case, self.failure)
+        else:
+            reporter.passed(self.test_case)
+
+    def _fail(self, failure: dict):
+        self.failure = failure
+        self.done = True
+        for future in self._pending:
+            future.cancel()
+        self._pending.clear()
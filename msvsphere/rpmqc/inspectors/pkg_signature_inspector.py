@@ -1,3 +1,7 @@
+from typing import Optional
+
+from msvsphere.rpmqc.rpm_package import UnsupportedSignatureError
+
 from .pkg_base_inspector import *
 
 __all__ = ['PkgSignatureInspector']
@@ -9,19 +13,32 @@ class PkgSignatureInspector(PkgBaseInspector):
     Verifies an RPM package PGP signature and a digest algorithm.
     """
 
+    title = 'PGP signature'
+
+    @classmethod
+    def get_disabled_reason(cls, cfg: Config) -> Optional[str]:
+        sign_cfg = cfg.data.get('package', {}).get('signatures', {})
+        if not sign_cfg.get('pgp_key_id'):
+            return 'no PGP key configured'
+        return None
+
     def __init__(self, cfg: Config):
         self.cfg = cfg
         sign_cfg = cfg.data.get('package', {}).get('signatures', {})
         self.pgp_key_id = sign_cfg.get('pgp_key_id')
         self.pgp_digest_algo = sign_cfg.get('pgp_digest_algo')
 
+    def get_required_parts(self, pkg_info: RPMPackageInfo) -> PackageParts:
+        return PackageParts.SIGNATURE
+
     def inspect(self, pkg: RPMPackage, reporter: ReporterTap):
-        if not self.pgp_key_id:
-            reporter.skipped('PGP signature', reason='no PGP key configured')
-            return
-        digest_algo, key_id = pkg.signature
         test_case = (f'PGP signature is {self.pgp_key_id} '
                      f'({self.pgp_digest_algo})')
+        try:
+            digest_algo, key_id = pkg.signature
+        except UnsupportedSignatureError as e:
+            reporter.failed(test_case, {'message': str(e)})
+            return
         if not key_id:
             reporter.failed(test_case, {'message': 'package is not signed'})
         elif key_id[-len(self.pgp_key_id):] != self.pgp_key_id:
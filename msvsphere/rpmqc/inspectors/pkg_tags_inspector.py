@@ -1,6 +1,6 @@
-import re
+from typing import Optional
 
-import rpm
+from msvsphere.rpmqc.tag_rules import compile_tag_rules
 
 from .pkg_base_inspector import *
 
@@ -9,30 +9,44 @@ __all__ = ['PkgTagsInspector']
 
 class PkgTagsInspector(PkgBaseInspector):
 
+    """
+    Verifies RPM package tag values.
+
+    Tag values are taken from repository metadata if they are available
+    there, so the package file isn't read at all.
+    """
+
+    title = 'RPM tags'
+
+    @classmethod
+    def get_disabled_reason(cls, cfg: Config) -> Optional[str]:
+        if not cfg.data.get('package', {}).get('tags'):
+            return 'no RPM tags configured'
+        return None
+
     def __init__(self, cfg: Config):
         self.cfg = cfg
+        # NOTE: rules are compiled once, so that tag IDs and regular
+        #       expressions aren't resolved for every package
+        self.rules = compile_tag_rules(
+            cfg.data.get('package', {}).get('tags', {})
+        )
+        self._tag_names = frozenset(rule.tag_name for rule in self.rules)
+
+    def get_required_parts(self, pkg_info: RPMPackageInfo) -> PackageParts:
+        if self._tag_names.issubset(pkg_info.tags):
+            return PackageParts.NONE
+        return PackageParts.HEADER
 
     def inspect(self, pkg: RPMPackage, reporter: ReporterTap):
-        for tag_name, tag_id, expected in self._iter_tags():
-            value = pkg.hdr[tag_id]
-            if isinstance(expected, re.Pattern):
-                rslt = expected.match(value)
-                expected_str = f'regex:{expected.pattern}'
+        metadata_tags = pkg.info.tags if pkg.info else {}
+        for rule in self.rules:
+            if rule.tag_name in metadata_tags:
+                value = metadata_tags[rule.tag_name]
             else:
-                rslt = (value == expected)
-                expected_str = expected
-            test_case = f'{tag_name} RPM tag value is {expected_str}'
-            if rslt:
-                reporter.passed(test_case)
+                value = pkg.hdr[rule.tag_id]
+            details = rule.check(value)
+            if details is None:
+                reporter.passed(rule.description)
             else:
-                reporter.failed(test_case, {
-                    'message': f'unexpected {tag_name} RPM tag value',
-                    'got': value,
-                    'expected': expected_str
-                })
-
-    def _iter_tags(self):
-        tags_cfg = self.cfg.data.get('package', {}).get('tags', {})
-        for tag_name, expected in tags_cfg.items():
-            tag_id = getattr(rpm, f'RPMTAG_{tag_name.upper()}')
-            yield tag_name, tag_id, expected
+                reporter.failed(rule.description, details)
@@ -0,0 +1,151 @@
+import collections
+import functools
+import importlib
+import sys
+from typing import Any, Iterable, List, Optional, Tuple, Type, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from msvsphere.rpmqc.config import Config
+    from .pkg_base_inspector import PkgBaseInspector
+
+__all__ = ['BUILTIN_INSPECTORS', 'discover_inspectors', 'InspectorEntry',
+           'INSPECTORS_GROUP', 'select_inspectors']
+
+
+# entry points group third-party inspectors are registered in, e.g.
+#   entry_points={'rpmqc.inspectors': ['foo = foo.inspector:FooInspector']}
+INSPECTORS_GROUP = 'rpmqc.inspectors'
+
+# built-in inspectors in the order they are run, they are also registered as
+# entry points, but they are available even if rpmqc isn't installed (e.g.
+# it is run from a source tree)
+BUILTIN_INSPECTORS = collections.OrderedDict([
+    ('pgp_signature', 'msvsphere.rpmqc.inspectors.pkg_signature_inspector:'
+                      'PkgSignatureInspector'),
+    ('ima_signature', 'msvsphere.rpmqc.inspectors.pkg_ima_inspector:'
+                      'PkgIMASignatureInspector'),
+    ('tags', 'msvsphere.rpmqc.inspectors.pkg_tags_inspector:'
+             'PkgTagsInspector')
+])
+
+
+class InspectorEntry:
+
+    """
+    An installed RPM package inspector.
+
+    The inspector class is imported only when it is loaded, so discovering
+    inspectors doesn't import their dependencies.
+    """
+
+    def __init__(self, name: str, target: str,
+                 version: Optional[str] = None):
+        """
+        Args:
+            name: Inspector name (the entry point name).
+            target: Inspector class reference in the "module:Class" format.
+            version: Version of the distribution that provides the inspector,
+                None for built-in inspectors.
+        """
+        self.name = name
+        self.target = target
+        self.version = version
+
+    def load(self) -> Type['PkgBaseInspector']:
+        """
+        Imports the inspector class.
+
+        Returns:
+            Inspector class.
+        """
+        module_name, _, attrs = self.target.partition(':')
+        obj = importlib.import_module(module_name.strip())
+        for attr in attrs.strip().split('.'):
+            obj = getattr(obj, attr)
+        return obj
+
+    def __str__(self):
+        if self.version:
+            return f'{self.name} = {self.target} ({self.version})'
+        return f'{self.name} = {self.target}'
+
+
+def _iter_entry_points() -> Iterable[Any]:
+    # NOTE: importlib metadata is slow to import, so it is imported only
+    #       when inspectors are discovered
+    if sys.version_info >= (3, 8):
+        from importlib import metadata
+    else:
+        import importlib_metadata as metadata
+    entry_points = metadata.entry_points()
+    if hasattr(entry_points, 'select'):
+        return entry_points.select(group=INSPECTORS_GROUP)
+    return entry_points.get(INSPECTORS_GROUP, ())
+
+
+@functools.lru_cache(maxsize=None)
+def discover_inspectors() -> Tuple[InspectorEntry, ...]:
+    """
+    Finds installed RPM package inspectors.
+
+    The discovery result is cached per process, worker processes forked
+    after the first call reuse it.
+
+    Returns:
+        Built-in inspectors in their order followed by third-party ones
+        sorted by name. A third-party inspector that has the same name as
+        a built-in one replaces it.
+    """
+    entries = collections.OrderedDict(
+        (name, InspectorEntry(name, target))
+        for name, target in BUILTIN_INSPECTORS.items()
+    )
+    plugins = {}
+    for entry_point in _iter_entry_points():
+        name = entry_point.name
+        if BUILTIN_INSPECTORS.get(name) == entry_point.value or \
+                name in plugins:
+            continue
+        dist = getattr(entry_point, 'dist', None)
+        plugins[name] = InspectorEntry(name, entry_point.value,
+                                       dist.version if dist else None)
+    for name in sorted(plugins):
+        # NOTE: a replaced built-in inspector keeps its position
+        entries[name] = plugins[name]
+    return tuple(entries.values())
+
+
+def select_inspectors(
+        cfg: 'Config'
+) -> Tuple[List[Type['PkgBaseInspector']], List[Tuple[str, str]]]:
+    """
+    Selects RPM package inspectors enabled by the configuration.
+
+    An inspector is disabled if it is set to false in the "inspectors"
+    configuration section or if it reports that it has nothing to check
+    (see PkgBaseInspector.get_disabled_reason).
+
+    Args:
+        cfg: Configuration object.
+
+    Returns:
+        Enabled inspector classes in the run order and titles of disabled
+        inspectors (names of ones disabled in the configuration) along with
+        the reasons they are disabled.
+    """
+    inspectors_cfg = cfg.data.get('inspectors', {})
+    enabled, disabled = [], []
+    for entry in discover_inspectors():
+        if inspectors_cfg.get(entry.name) is False:
+            # NOTE: the inspector isn't imported, so that a broken or slow to
+            #       import inspector can be disabled
+            disabled.append((entry.name, 'disabled in the configuration'))
+            continue
+        inspector_cls = entry.load()
+        title = inspector_cls.title or entry.name
+        reason = inspector_cls.get_disabled_reason(cfg)
+        if reason:
+            disabled.append((title, reason))
+        else:
+            enabled.append(inspector_cls)
+    return enabled, disabled
@@ -0,0 +1,95 @@
+import time
+from typing import Optional
+
+from .reporter import ReporterBuffer
+
+__all__ = ['check_deadline', 'InspectionCancelled', 'InspectionLimits']
+
+
+class InspectionCancelled(Exception):
+
+    """
+    An in-progress RPM package inspection is cancelled because the run time
+    budget is exceeded.
+    """
+
+    pass
+
+
+def check_deadline(deadline: Optional[float]):
+    """
+    Cancels an in-progress RPM package inspection if its deadline passed.
+
+    Long running inspection loops (e.g. the payload pass) call it for every
+    file or chunk, so that an in-process inspection can be cancelled.
+
+    Args:
+        deadline: time.monotonic() value the inspection should be finished
+            by, None if there is no deadline.
+
+    Raises:
+        InspectionCancelled: If the deadline passed.
+    """
+    if deadline is not None and time.monotonic() >= deadline:
+        raise InspectionCancelled('time budget exceeded')
+
+
+class InspectionLimits:
+
+    """
+    Limits that stop an inspection run early: the number of failed packages
+    and the run time budget.
+    """
+
+    def __init__(self, max_failures: Optional[int] = None,
+                 time_budget: Optional[float] = None):
+        """
+        Args:
+            max_failures: Stop after this number of failed packages.
+            time_budget: Stop after this number of seconds since the object
+                creation.
+        """
+        self.max_failures = max_failures
+        self.time_budget = time_budget
+        self.deadline = time.monotonic() + time_budget if time_budget \
+            else None
+        self.failed_count = 0
+        # why the run was stopped early, None if it wasn't
+        self.reason = None
+
+    def add(self, results: ReporterBuffer):
+        """
+        Accounts an RPM package inspection results.
+
+        Args:
+            results: RPM package inspection results.
+        """
+        if results.failed_count:
+            self.failed_count += 1
+
+    @property
+    def failures_exceeded(self) -> bool:
+        return bool(self.max_failures) and \
+            self.failed_count >= self.max_failures
+
+    @property
+    def time_exceeded(self) -> bool:
+        return self.deadline is not None and \
+            time.monotonic() >= self.deadline
+
+    @property
+    def stopped(self) -> bool:
+        """
+        Whether no more packages should be inspected: the run was stopped or
+        the time budget is exceeded.
+        """
+        return self.reason is not None or self.time_exceeded
+
+    def stop(self):
+        """
+        Records why the run is stopped early.
+        """
+        if self.failures_exceeded:
+            self.reason = f'failure limit of {self.max_failures} reached'
+        elif self.time_exceeded:
+            self.reason = f'time budget of {self.time_budget}s exceeded'
@@ -0,0 +1,100 @@
+import re
+from typing import Iterable, TextIO
+
+from .reporter import open_report_input
+
+__all__ = ['merge_tap_reports']
+
+
+TAP_HEADER_RE = re.compile(r'^TAP version \d+$')
+
+TAP_TEST_RE = re.compile(r'^(ok|not ok)\b\s*\d*(.*)$')
+
+TAP_PLAN_RE = re.compile(r'^1\.\.(\d+)\b')
+
+TAP_SKIP_RE = re.compile(r'\s#\s*SKIP\b', re.IGNORECASE)
+
+# summary lines written by ReporterTap.print_summary
+TAP_SUMMARY_RE = re.compile(r'^# (Passed|Skipped|Failed) \d+ of \d+ tests$')
+
+
+def merge_tap_reports(paths: Iterable[str], output: TextIO) -> bool:
+    """
+    Merges TAP reports of multiple shards of a run (see the --shard option)
+    into a single TAP report.
+
+    Top-level tests are renumbered, subtests and diagnostics are copied as
+    is, the test plan and the summary are recalculated, so the merged report
+    is the same as a single-node run would produce up to the tests order.
+    Skipped tests that precede the inspected packages (disabled inspectors)
+    are reported by every shard, they are merged only once.
+
+    Args:
+        paths: TAP report file paths, the reports are merged in this order.
+        output: Merged report output stream.
+
+    Returns:
+        True if all tests passed, False otherwise.
+
+    Raises:
+        Exception: If a report is incomplete (e.g. a shard run was
+            interrupted) or aborted.
+    """
+    counters = {'Passed': 0, 'Skipped': 0, 'Failed': 0}
+    total = 0
+    # run-level skipped tests which are already merged
+    seen_preamble = set()
+    output.write('TAP version 14\n')
+    for path in paths:
+        tests_count = 0
+        planned = None
+        preamble = True
+        with open_report_input(path) as fd:
+            for line in fd:
+                line = line.rstrip('\n')
+                if line.startswith((' ', '# Subtest')) or not line:
+                    # subtests and diagnostics belong to the next or the
+                    # previous top-level test, they are copied as is
+                    preamble = preamble and not line.startswith('# Subtest')
+                    output.write(f'{line}\n')
+                    continue
+                match = TAP_TEST_RE.match(line)
+                if match:
+                    tests_count += 1
+                    status, rest = match.groups()
+                    if preamble and status == 'ok' and \
+                            TAP_SKIP_RE.search(rest):
+                        if rest in seen_preamble:
+                            continue
+                        seen_preamble.add(rest)
+                    else:
+                        preamble = False
+                    total += 1
+                    if status == 'not ok':
+                        counters['Failed'] += 1
+                    elif TAP_SKIP_RE.search(rest):
+                        counters['Skipped'] += 1
+                    else:
+                        counters['Passed'] += 1
+                    output.write(f'{status} {total}{rest}\n')
+                    continue
+                match = TAP_PLAN_RE.match(line)
+                if match:
+                    planned = int(match.group(1))
+                elif line.startswith('Bail out!'):
+                    raise Exception(f'{path}: the run was aborted: {line}')
+                elif not TAP_HEADER_RE.match(line) and \
+                        not TAP_SUMMARY_RE.match(line):
+                    output.write(f'{line}\n')
+        if planned is None:
+            raise Exception(f'{path}: incomplete report, the test plan is '
+                            f'not found')
+        elif planned != tests_count:
+            raise Exception(f'{path}: incomplete report, {planned} tests '
+                            f'planned but {tests_count} found')
+    output.write(f'1..{total}\n')
+    for label, counter in counters.items():
+        if counter:
+            output.write(f'# {label} {counter} of {total} tests\n')
+    output.flush()
+    return counters['Failed'] == 0
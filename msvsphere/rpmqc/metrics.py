@@ -0,0 +1,276 @@
+import collections
+from contextlib import contextmanager
+import heapq
+import json
+import os.path
+import sys
+import time
+from typing import Dict, List, Optional, TextIO
+
+__all__ = ['measure_time', 'IMAMemoStats', 'InspectionMetrics',
+           'MetricsCollector', 'PackageMetrics']
+
+
+class InspectionMetrics:
+
+    """
+    Resources used by a single inspector.
+
+    Inspectors may report additional counters (e.g. the number of verified
+    files) using the RPMPackage.counters attribute.
+    """
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.counters = collections.Counter()
+
+    def to_dict(self) -> dict:
+        data = {'wall_seconds': self.wall_time, 'cpu_seconds': self.cpu_time}
+        data.update(self.counters)
+        return data
+
+
+@contextmanager
+def measure_time(inspection: InspectionMetrics):
+    """
+    Adds wall and CPU time spent in the context to inspection metrics.
+
+    Args:
+        inspection: Inspection metrics to update.
+    """
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        yield
+    finally:
+        inspection.wall_time += time.perf_counter() - start_time
+        inspection.cpu_time += time.process_time() - start_cpu_time
+
+
+class PackageMetrics:
+
+    """
+    Resources used to inspect an RPM package.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        # the process the package was inspected in, its CPU time is already
+        # included into the run CPU time if it is the main process
+        self.pid = os.getpid()
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.header_time = 0.0
+        self.bytes_read = 0
+        self.bytes_downloaded = 0
+        self.inspections: Dict[str, InspectionMetrics] = {}
+
+    def to_dict(self) -> dict:
+        return {
+            'package': os.path.basename(self.path),
+            'wall_seconds': self.wall_time,
+            'cpu_seconds': self.cpu_time,
+            'header_seconds': self.header_time,
+            'bytes_read': self.bytes_read,
+            'bytes_downloaded': self.bytes_downloaded,
+            'inspectors': {name: m.to_dict()
+                           for name, m in self.inspections.items()}
+        }
+
+
+class IMAMemoStats:
+
+    """
+    Verified IMA signatures memo hits and misses of a run.
+
+    They are collected from every inspected package metrics and reported
+    at the end of the run regardless of whether metrics are exported.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        # whether any inspected package used the memo
+        self.used = False
+
+    def add(self, metrics: Optional[PackageMetrics]):
+        """
+        Accounts an RPM package inspection memo statistics.
+
+        Args:
+            metrics: RPM package inspection metrics, None for cached
+                results.
+        """
+        if metrics is None:
+            return
+        for inspection in metrics.inspections.values():
+            counters = inspection.counters
+            if 'ima_memo_hits' in counters or 'ima_memo_misses' in counters:
+                self.used = True
+                self.hits += counters['ima_memo_hits']
+                self.misses += counters['ima_memo_misses']
+
+    def report(self, output: TextIO = sys.stderr):
+        """
+        Prints the memo statistics summary line if the memo was used.
+
+        Args:
+            output: Output stream, the report itself may be printed to
+                the standard output.
+        """
+        if not self.used:
+            return
+        total = self.hits + self.misses
+        hit_rate = self.hits / total if total else 0.0
+        output.write(f'rpmqc: IMA signatures memo: {self.hits} hits, '
+                     f'{self.misses} misses ({hit_rate:.1%} hit rate)\n')
+
+
+class MetricsCollector:
+
+    """
+    Aggregates inspection metrics and exports them either as a Prometheus
+    textfile (node_exporter textfile collector format) or as a JSON summary.
+    """
+
+    def __init__(self, slowest_count: int = 10):
+        """
+        Args:
+            slowest_count: Number of the slowest packages to report.
+        """
+        self._slowest_count = slowest_count
+        self._slowest = []
+        self._start_time = time.perf_counter()
+        self._start_cpu_time = time.process_time()
+        self.wall_time = 0.0
+        self.main_cpu_time = 0.0
+        self.packages_count = 0
+        self.cached_count = 0
+        self.report_time = 0.0
+        self.header_time = 0.0
+        self.bytes_read = 0
+        self.bytes_downloaded = 0
+        # CPU time of packages inspected in worker processes
+        self.workers_cpu_time = 0.0
+        self.inspections: Dict[str, InspectionMetrics] = \
+            collections.OrderedDict()
+
+    def add(self, pkg_metrics: Optional[PackageMetrics],
+            report_time: float = 0.0):
+        """
+        Adds RPM package inspection metrics.
+
+        Args:
+            pkg_metrics: RPM package metrics, None if inspection results
+                were taken from the cache.
+            report_time: Time spent on the package results reporting.
+        """
+        self.packages_count += 1
+        self.report_time += report_time
+        if pkg_metrics is None:
+            self.cached_count += 1
+            return
+        self.header_time += pkg_metrics.header_time
+        self.bytes_read += pkg_metrics.bytes_read
+        self.bytes_downloaded += pkg_metrics.bytes_downloaded
+        if pkg_metrics.pid != os.getpid():
+            self.workers_cpu_time += pkg_metrics.cpu_time
+        for name, metrics in pkg_metrics.inspections.items():
+            total = self.inspections.setdefault(name, InspectionMetrics())
+            total.wall_time += metrics.wall_time
+            total.cpu_time += metrics.cpu_time
+            total.counters.update(metrics.counters)
+        # keep only N slowest packages
+        item = (pkg_metrics.wall_time, self.packages_count, pkg_metrics)
+        if len(self._slowest) < self._slowest_count:
+            heapq.heappush(self._slowest, item)
+        elif self._slowest_count:
+            heapq.heappushpop(self._slowest, item)
+
+    def finish(self):
+        """
+        Stops the run time measurement.
+        """
+        self.wall_time = time.perf_counter() - self._start_time
+        self.main_cpu_time = time.process_time() - self._start_cpu_time
+
+    @property
+    def slowest_packages(self) -> List[PackageMetrics]:
+        return [item[2] for item in sorted(self._slowest, reverse=True)]
+
+    def to_dict(self) -> dict:
+        return {
+            'run': {
+                'wall_seconds': self.wall_time,
+                # NOTE: worker processes CPU time is accounted per package
+                'cpu_seconds': self.main_cpu_time + self.workers_cpu_time,
+                'packages': self.packages_count,
+                'cached_packages': self.cached_count,
+                'header_seconds': self.header_time,
+                'report_seconds': self.report_time,
+                'bytes_read': self.bytes_read,
+                'bytes_downloaded': self.bytes_downloaded
+            },
+            'inspectors': {name: m.to_dict()
+                           for name, m in self.inspections.items()},
+            'slowest_packages': [m.to_dict() for m in self.slowest_packages]
+        }
+
+    def write(self, path: str):
+        """
+        Writes metrics to a file.
+
+        Prometheus textfile format is used if the file name ends with
+        ".prom", JSON otherwise.
+
+        Args:
+            path: Output file path.
+        """
+        if path.endswith('.prom'):
+            content = self._render_prometheus()
+        else:
+            content = json.dumps(self.to_dict(), indent=2) + '\n'
+        # write atomically, so that a collector never reads a partial file
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as fd:
+            fd.write(content)
+        os.replace(tmp_path, path)
+
+    def _render_prometheus(self) -> str:
+        data = self.to_dict()
+        lines = []
+
+        def metric(name, help_text, metric_type, samples):
+            lines.append(f'# HELP rpmqc_{name} {help_text}')
+            lines.append(f'# TYPE rpmqc_{name} {metric_type}')
+            for labels, value in samples:
+                labels_str = ','.join(
+                    f'{k}="{self._escape_label(v)}"'
+                    for k, v in labels.items()
+                )
+                if labels_str:
+                    labels_str = f'{{{labels_str}}}'
+                lines.append(f'rpmqc_{name}{labels_str} {value}')
+
+        for key, value in data['run'].items():
+            metric(f'run_{key}', f'Inspection run {key.replace("_", " ")}.',
+                   'gauge', [({}, value)])
+        counter_names = sorted({c for m in data['inspectors'].values()
+                                for c in m})
+        for counter in counter_names:
+            metric(f'inspector_{counter}',
+                   f'Inspector {counter.replace("_", " ")} total.', 'gauge',
+                   [({'inspector': name}, m[counter])
+                    for name, m in data['inspectors'].items()
+                    if counter in m])
+        metric('slowest_package_wall_seconds',
+               'Wall time of the slowest inspected packages.', 'gauge',
+               [({'package': m['package']}, m['wall_seconds'])
+                for m in data['slowest_packages']])
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _escape_label(value: str) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"') \
+            .replace('\n', '\\n')
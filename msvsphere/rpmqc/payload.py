@@ -0,0 +1,137 @@
+import abc
+import collections
+from contextlib import closing
+import time
+from typing import Any, Iterable
+
+import rpm
+
+from .file_utils import READ_CHUNK_SIZE
+from .limits import check_deadline
+from .rpm_package import RPMPackage
+
+__all__ = ['scan_payload', 'PayloadVisitor']
+
+
+class PayloadVisitor(abc.ABC):
+
+    """
+    Receives RPM package payload entries during a single payload pass that
+    is shared by all inspectors.
+
+    A visitor is created by an inspector for every package (see
+    PkgBaseInspector.get_payload_visitor), its results are reported after
+    the whole payload is processed or all visitors are done.
+    """
+
+    def __init__(self):
+        # set to True when no more payload entries are needed (e.g. after
+        # the first failure), the payload pass stops when all visitors
+        # are done
+        self.done = False
+        # time spent in the visitor methods during the payload pass
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        # visitor metrics (e.g. the number of verified files)
+        self.counters = collections.Counter()
+
+    @abc.abstractmethod
+    def start_file(self, f: Any, has_content: bool) -> bool:
+        """
+        Starts a payload entry processing.
+
+        Args:
+            f: Payload entry (rpm.file object). Its attributes must be read
+                here because the object is reused for the next entry.
+            has_content: True if the entry has content in the payload,
+                False for directories, symlinks and hardlink records without
+                content.
+
+        Returns:
+            True if the entry content is needed, False otherwise.
+        """
+        pass
+
+    def update(self, data: bytes):
+        """
+        Processes a payload entry content chunk.
+
+        Args:
+            data: Entry content chunk.
+        """
+        pass
+
+    def end_file(self):
+        """
+        Finishes a payload entry processing, it is called only for entries
+        whose content was requested.
+        """
+        pass
+
+    @abc.abstractmethod
+    def report(self, reporter):
+        """
+        Reports the visitor results.
+
+        Args:
+            reporter: Reporter to use.
+        """
+        pass
+
+
+def _call(visitor: PayloadVisitor, method, *args):
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    try:
+        return method(*args)
+    finally:
+        visitor.wall_time += time.perf_counter() - start_time
+        visitor.cpu_time += time.process_time() - start_cpu_time
+
+
+def scan_payload(pkg: RPMPackage, visitors: Iterable[PayloadVisitor],
+                 chunk_size: int = READ_CHUNK_SIZE) -> int:
+    """
+    Decompresses an RPM package payload once and passes its entries to all
+    visitors.
+
+    Args:
+        pkg: RPM package.
+        visitors: Payload visitors.
+        chunk_size: Entry content chunk size.
+
+    Returns:
+        Number of decompressed payload content bytes.
+
+    Raises:
+        InspectionCancelled: If the package inspection deadline passed.
+    """
+    active = [v for v in visitors if not v.done]
+    if not active:
+        return 0
+    bytes_decompressed = 0
+    files = rpm.files(pkg.hdr)
+    with closing(rpm.fd(pkg.fd, 'r', pkg.hdr['payloadcompressor'])) \
+            as payload, closing(files.archive(payload)) as archive:
+        for f in archive:
+            check_deadline(pkg.deadline)
+            has_content = archive.hascontent()
+            readers = [v for v in active
+                       if _call(v, v.start_file, f, has_content)]
+            if has_content:
+                # NOTE: the archive decompresses skipped content as well
+                bytes_decompressed += f.size
+                if readers:
+                    while True:
+                        chunk = archive.read(chunk_size)
+                        if not chunk:
+                            break
+                        check_deadline(pkg.deadline)
+                        for visitor in readers:
+                            _call(visitor, visitor.update, chunk)
+            for visitor in readers:
+                _call(visitor, visitor.end_file)
+            active = [v for v in active if not v.done]
+            if not active:
+                break
+    return bytes_decompressed
@@ -0,0 +1,150 @@
+from typing import Optional, Tuple
+
+__all__ = ['parse_pgp_signature']
+
+
+# OpenPGP public key algorithm names as they are printed by RPM
+PGP_PUBKEY_ALGOS = {
+    1: 'RSA',
+    17: 'DSA',
+    19: 'ECDSA',
+    22: 'EdDSA'
+}
+
+# OpenPGP hash algorithm names as they are printed by RPM
+PGP_HASH_ALGOS = {
+    1: 'MD5',
+    2: 'SHA1',
+    3: 'RIPEMD160',
+    8: 'SHA256',
+    9: 'SHA384',
+    10: 'SHA512',
+    11: 'SHA224'
+}
+
+PGP_SIGNATURE_PACKET_TAG = 2
+
+PGP_SUBPACKET_ISSUER = 16
+
+PGP_SUBPACKET_ISSUER_FINGERPRINT = 33
+
+
+def _get_packet_body(data: bytes) -> Optional[Tuple[int, bytes]]:
+    """
+    Extracts the first OpenPGP packet tag and body.
+
+    Args:
+        data: OpenPGP packet data.
+
+    Returns:
+        Packet tag and body or None if the packet format isn't supported.
+    """
+    octet = data[0]
+    if not octet & 0x80:
+        return None
+    if octet & 0x40:
+        # new packet format
+        tag = octet & 0x3f
+        length = data[1]
+        if length < 192:
+            pos = 2
+        elif length < 224:
+            length = ((length - 192) << 8) + data[2] + 192
+            pos = 3
+        elif length == 255:
+            length = int.from_bytes(data[2:6], 'big')
+            pos = 6
+        else:
+            # partial body lengths are never used for signatures
+            return None
+    else:
+        # old packet format
+        tag = (octet >> 2) & 0x0f
+        length_type = octet & 0x03
+        if length_type == 3:
+            length = len(data) - 1
+            pos = 1
+        else:
+            size = 1 << length_type
+            length = int.from_bytes(data[1:1 + size], 'big')
+            pos = 1 + size
+    return tag, data[pos:pos + length]
+
+
+def _find_issuer(subpackets: bytes) -> Optional[bytes]:
+    """
+    Finds a signature issuer key ID in OpenPGP signature subpackets.
+
+    Args:
+        subpackets: Signature subpackets data.
+
+    Returns:
+        Issuer key ID or None if it isn't found.
+    """
+    key_id = None
+    pos = 0
+    while pos < len(subpackets):
+        length = subpackets[pos]
+        if length < 192:
+            pos += 1
+        elif length < 255:
+            length = ((length - 192) << 8) + subpackets[pos + 1] + 192
+            pos += 2
+        else:
+            length = int.from_bytes(subpackets[pos + 1:pos + 5], 'big')
+            pos += 5
+        subpacket_type = subpackets[pos] & 0x7f
+        value = subpackets[pos + 1:pos + length]
+        if subpacket_type == PGP_SUBPACKET_ISSUER:
+            return value
+        elif subpacket_type == PGP_SUBPACKET_ISSUER_FINGERPRINT and \
+                value[:1] == b'\x04':
+            # the key ID is the low 64 bits of a version 4 fingerprint
+            key_id = value[-8:]
+        pos += length
+    return key_id
+
+
+def parse_pgp_signature(data: bytes) -> Optional[Tuple[str, str]]:
+    """
+    Extracts a digest algorithm and a key ID from an OpenPGP signature.
+
+    Only version 3 and 4 signatures are supported, the caller is expected to
+    fall back to RPM for other ones.
+
+    Args:
+        data: OpenPGP signature packet.
+
+    Returns:
+        A signature digest algorithm (e.g. "RSA/SHA256") and a PGP key ID
+        in the RPM format or None if the signature format isn't supported.
+    """
+    try:
+        packet = _get_packet_body(data)
+        if packet is None or packet[0] != PGP_SIGNATURE_PACKET_TAG:
+            return None
+        body = packet[1]
+        version = body[0]
+        if version == 3:
+            key_id = body[7:15]
+            pubkey_algo, hash_algo = body[15], body[16]
+        elif version == 4:
+            pubkey_algo, hash_algo = body[2], body[3]
+            key_id = None
+            pos = 4
+            # hashed and unhashed subpackets
+            for _ in range(2):
+                length = int.from_bytes(body[pos:pos + 2], 'big')
+                pos += 2
+                key_id = key_id or _find_issuer(body[pos:pos + length])
+                pos += length
+        else:
+            return None
+    except IndexError:
+        return None
+    if not key_id or len(key_id) != 8 or \
+            pubkey_algo not in PGP_PUBKEY_ALGOS or \
+            hash_algo not in PGP_HASH_ALGOS:
+        return None
+    return (f'{PGP_PUBKEY_ALGOS[pubkey_algo]}/{PGP_HASH_ALGOS[hash_algo]}',
+            key_id.hex())
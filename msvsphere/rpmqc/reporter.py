@@ -1,23 +1,101 @@
+import abc
 import functools
+import gzip
+import io
+import json
 import sys
 import textwrap
-from typing import Optional, Union
+from typing import List, Optional, TextIO, Tuple, Union
 
-import yaml
+__all__ = ['open_report_input', 'open_report_output', 'Reporter',
+           'ReporterBuffer', 'ReporterJsonLines', 'ReporterJUnit',
+           'ReporterTap', 'REPORTERS']
 
-__all__ = ['ReporterTap']
 
+# report files buffer size, large buffers reduce the number of write calls
+OUTPUT_BUFFER_SIZE = 1024 * 1024
 
-class ReporterTap:
 
-    def __init__(self, tests_count: Optional[int] = None, offset: int = 0,
-                 description: Optional[str] = None, tap_version: int = 14):
+def open_report_output(path: Optional[str] = None) -> TextIO:
+    """
+    Opens a report output stream.
+
+    The output is compressed if the file name ends with ".gz" (gzip) or
+    ".zst" (zstd, requires the zstandard module).
+
+    Args:
+        path: Report file path. Standard output is used if the path is
+            not specified or equals to "-".
+
+    Returns:
+        Buffered text output stream.
+    """
+    if path is None or path == '-':
+        return io.TextIOWrapper(open(sys.stdout.fileno(), 'wb',
+                                     buffering=OUTPUT_BUFFER_SIZE,
+                                     closefd=False),
+                                encoding='utf-8')
+    elif path.endswith('.gz'):
+        raw = gzip.open(path, 'wb', compresslevel=6)
+    elif path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('zstandard Python module is required for zstd '
+                            'compressed reports')
+        raw = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    else:
+        return open(path, 'w', buffering=OUTPUT_BUFFER_SIZE, encoding='utf-8')
+    return io.TextIOWrapper(io.BufferedWriter(raw, OUTPUT_BUFFER_SIZE),
+                            encoding='utf-8')
+
+
+def open_report_input(path: str) -> TextIO:
+    """
+    Opens a report written by rpmqc (see open_report_output) for reading.
+
+    The report is decompressed if the file name ends with ".gz" (gzip) or
+    ".zst" (zstd, requires the zstandard module).
+
+    Args:
+        path: Report file path. Standard input is used if the path equals
+            to "-".
+
+    Returns:
+        Text input stream.
+    """
+    if path == '-':
+        return io.TextIOWrapper(open(sys.stdin.fileno(), 'rb',
+                                     closefd=False), encoding='utf-8')
+    elif path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    elif path.endswith('.zst'):
+        try:
+            import zstandard
+        except ImportError:
+            raise Exception('zstandard Python module is required for zstd '
+                            'compressed reports')
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'))
+        return io.TextIOWrapper(io.BufferedReader(raw), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+class Reporter(abc.ABC):
+
+    """
+    Base class for test results reporters.
+
+    Top-level tests (RPM packages) have subtests (individual inspections),
+    a subtest reporter is passed as a payload to the top-level test result.
+    """
+
+    def __init__(self, tests_count: Optional[int] = None,
+                 description: Optional[str] = None,
+                 output: Optional[TextIO] = None):
         self._i = 0
         self._tests_count = tests_count
-        self._offset = offset
         self._description = description
-        self._tap_version = tap_version
-        self._output = sys.stdout
+        self._output = output or sys.stdout
         self.failed_count = 0
         self.passed_count = 0
         self.skipped_count = 0
@@ -33,38 +111,82 @@ class ReporterTap:
 
     @counter
     def failed(self, description: str,
-               payload: Union[dict, 'ReporterTap', None] = None):
+               payload: Union[dict, 'Reporter', None] = None):
         self.failed_count += 1
         self._render(False, description, payload)
 
     @counter
     def passed(self, description: str,
-               payload: Union[dict, 'ReporterTap', None] = None):
+               payload: Union[dict, 'Reporter', None] = None):
         self.passed_count += 1
         self._render(True, description, payload)
 
     @counter
     def skipped(self, description: str,
-                payload: Union[dict, 'ReporterTap', None] = None,
+                payload: Union[dict, 'Reporter', None] = None,
                 reason: Optional[str] = None):
         self.skipped_count += 1
         self._render(True, description, payload, skip=True, reason=reason)
 
+    @abc.abstractmethod
+    def init_subtest(self, description: Optional[str] = None) -> 'Reporter':
+        pass
+
+    def end_subtest(self, subtest: 'Reporter'):
+        if subtest.failed_count:
+            self.failed(subtest._description, subtest)
+        else:
+            self.passed(subtest._description, subtest)
+
+    @abc.abstractmethod
+    def _render(self, success: bool, description: str,
+                payload: Union[dict, 'Reporter', None] = None,
+                skip: bool = False, reason: Optional[str] = None):
+        pass
+
+    def print_plan(self, tests_count: Optional[int] = None):
+        pass
+
+    def print_header(self):
+        pass
+
+    def print_summary(self):
+        pass
+
+    def print_footer(self):
+        self.flush()
+
+    def flush(self):
+        """
+        Flushes already reported results to the output, e.g. when results
+        are streamed.
+        """
+        self._output.flush()
+
+
+class ReporterTap(Reporter):
+
+    """
+    Test Anything Protocol (TAP) reporter.
+    """
+
+    def __init__(self, tests_count: Optional[int] = None, offset: int = 0,
+                 description: Optional[str] = None, tap_version: int = 14,
+                 output: Optional[TextIO] = None):
+        super().__init__(tests_count, description, output)
+        self._offset = offset
+        self._tap_version = tap_version
+
     def init_subtest(self, description: Optional[str] = None) -> 'ReporterTap':
         self._output.write(f'{self._indent}# Subtest')
         if description:
             self._output.write(f': {description}')
         self._output.write('\n')
-        return ReporterTap(offset=self._offset + 4, description=description)
-
-    def end_subtest(self, subtest: 'ReporterTap'):
-        if subtest.failed_count:
-            self.failed(subtest._description)
-        else:
-            self.passed(subtest._description)
+        return ReporterTap(offset=self._offset + 4, description=description,
+                           output=self._output)
 
     def _render(self, success: bool, description: str,
-                payload: Union[dict, 'ReporterTap', None] = None,
+                payload: Union[dict, Reporter, None] = None,
                 skip: bool = False, reason: Optional[str] = None):
         # print the test plan row if we know the final tests count
         if self._i == 1 and self._tests_count is not None:
@@ -76,7 +198,11 @@ class ReporterTap:
             if reason:
                 self._output.write(f' {reason}')
         self._output.write('\n')
-        if payload:
+        # NOTE: subtest results are already printed
+        if payload and isinstance(payload, dict):
+            # NOTE: yaml is imported only if there are diagnostics to print,
+            #       it is slow to import
+            import yaml
             yaml_str = yaml.dump(payload, explicit_start=True,
                                  explicit_end=True, indent=2)
             yaml_str = textwrap.indent(yaml_str, '  ' + self._indent)
@@ -103,3 +229,229 @@ class ReporterTap:
     @property
     def _indent(self) -> str:
         return ' ' * self._offset
+
+
+class ReporterJsonLines(Reporter):
+
+    """
+    JSON Lines reporter.
+
+    Every top-level test is written as a single JSON object line with its
+    subtests nested in the "checks" list, the last line contains a summary.
+    """
+
+    def __init__(self, tests_count: Optional[int] = None,
+                 description: Optional[str] = None,
+                 output: Optional[TextIO] = None, nested: bool = False):
+        super().__init__(tests_count, description, output)
+        self._nested = nested
+        self.results: List[dict] = []
+
+    def init_subtest(
+            self, description: Optional[str] = None
+    ) -> 'ReporterJsonLines':
+        return ReporterJsonLines(description=description, output=self._output,
+                                 nested=True)
+
+    def _render(self, success: bool, description: str,
+                payload: Union[dict, Reporter, None] = None,
+                skip: bool = False, reason: Optional[str] = None):
+        if skip:
+            status = 'skipped'
+        else:
+            status = 'passed' if success else 'failed'
+        result = {'name': description, 'status': status}
+        if reason:
+            result['reason'] = reason
+        if isinstance(payload, ReporterJsonLines):
+            result['checks'] = payload.results
+        elif payload:
+            result['details'] = payload
+        if self._nested:
+            self.results.append(result)
+        else:
+            self._output.write(json.dumps(result) + '\n')
+
+    def print_summary(self):
+        self._output.write(json.dumps({'summary': {
+            'total': self._i,
+            'passed': self.passed_count,
+            'skipped': self.skipped_count,
+            'failed': self.failed_count
+        }}) + '\n')
+
+
+class ReporterJUnit(Reporter):
+
+    """
+    JUnit XML reporter.
+
+    Every top-level test is written as a test suite with its subtests as
+    test cases. The report is written incrementally, so the test suites
+    element has no counter attributes. Suite counters are calculated from
+    the test cases the suite contains.
+    """
+
+    def __init__(self, tests_count: Optional[int] = None,
+                 description: Optional[str] = None,
+                 output: Optional[TextIO] = None, nested: bool = False):
+        super().__init__(tests_count, description, output)
+        self._nested = nested
+        # test case names, rendered elements and their failed and skipped
+        # flags
+        self._cases: List[Tuple[str, str, bool, bool]] = []
+        # whether subtests of this test were written as test suites
+        self._has_suites = False
+
+    def init_subtest(
+            self, description: Optional[str] = None
+    ) -> 'ReporterJUnit':
+        return ReporterJUnit(description=description, output=self._output,
+                             nested=True)
+
+    def _render(self, success: bool, description: str,
+                payload: Union[dict, Reporter, None] = None,
+                skip: bool = False, reason: Optional[str] = None):
+        # NOTE: xml.sax imports urllib which is slow to import
+        from xml.sax.saxutils import escape, quoteattr
+        if isinstance(payload, ReporterJUnit):
+            if self._nested and self._description:
+                # JUnit doesn't support nested test suites, so a parent
+                # test name is used as a prefix
+                description = f'{self._description}/{description}'
+            self._has_suites = True
+            if payload._has_suites:
+                # direct test cases of a test that has nested suites (e.g.
+                # skipped packages of a repository) are reported the same
+                # way as their siblings
+                for name, case, failed, skipped in payload._cases:
+                    self._output.write(self._format_suite(
+                        f'{description}/{name}', 1, int(failed),
+                        int(skipped), [case]
+                    ))
+            elif payload._cases or not payload._i:
+                self._output.write(self._format_suite(
+                    description, len(payload._cases),
+                    sum(c[2] for c in payload._cases),
+                    sum(c[3] for c in payload._cases),
+                    [c[1] for c in payload._cases]
+                ))
+            return
+        case = f'<testcase name={quoteattr(description)}'
+        if skip:
+            case += f'><skipped message={quoteattr(reason or "")}/></testcase>'
+        elif not success:
+            message = (payload or {}).get('message', 'test failed')
+            details = json.dumps(payload, indent=2) if payload else ''
+            case += (f'><failure message={quoteattr(message)}>'
+                     f'{escape(details)}</failure></testcase>')
+        else:
+            case += '/>'
+        if self._nested:
+            self._cases.append((description, case, not success and not skip,
+                                skip))
+        else:
+            # a test without subtests is reported as a single-case suite
+            self._output.write(self._format_suite(
+                description, 1, int(not success and not skip), int(skip),
+                [case]
+            ))
+
+    @staticmethod
+    def _format_suite(name: str, tests: int, failures: int, skipped: int,
+                      cases: List[str]) -> str:
+        from xml.sax.saxutils import quoteattr
+        return (f'<testsuite name={quoteattr(name)} tests="{tests}" '
+                f'failures="{failures}" errors="0" skipped="{skipped}">\n'
+                + ''.join(f'  {case}\n' for case in cases) +
+                '</testsuite>\n')
+
+    def print_header(self):
+        self._output.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                           '<testsuites name="rpmqc">\n')
+
+    def print_footer(self):
+        self._output.write('</testsuites>\n')
+        super().print_footer()
+
+
+# supported report formats
+REPORTERS = {
+    'tap': ReporterTap,
+    'jsonl': ReporterJsonLines,
+    'junit': ReporterJUnit
+}
+
+
+class ReporterBuffer:
+
+    """
+    Records test results in memory so that they can be replayed into a real
+    reporter later, e.g. after being transferred from a worker process.
+    """
+
+    def __init__(self, description: Optional[str] = None):
+        self.description = description
+        self.results = []
+        self.failed_count = 0
+        self.passed_count = 0
+        self.skipped_count = 0
+
+    def failed(self, description: str, payload: Optional[dict] = None):
+        self.failed_count += 1
+        self.results.append(('failed', description, payload, None))
+
+    def passed(self, description: str, payload: Optional[dict] = None):
+        self.passed_count += 1
+        self.results.append(('passed', description, payload, None))
+
+    def skipped(self, description: str, payload: Optional[dict] = None,
+                reason: Optional[str] = None):
+        self.skipped_count += 1
+        self.results.append(('skipped', description, payload, reason))
+
+    def to_json(self) -> str:
+        """
+        Serializes the recorded results to a JSON string.
+
+        Returns:
+            JSON string.
+        """
+        return json.dumps(self.results)
+
+    @classmethod
+    def from_json(cls, data: str,
+                  description: Optional[str] = None) -> 'ReporterBuffer':
+        """
+        Restores recorded results from a JSON string.
+
+        Args:
+            data: JSON string produced by the to_json method.
+            description: Test description.
+
+        Returns:
+            Restored results.
+        """
+        buffer = cls(description)
+        for status, test_description, payload, reason in json.loads(data):
+            if status == 'skipped':
+                buffer.skipped(test_description, payload, reason=reason)
+            else:
+                getattr(buffer, status)(test_description, payload)
+        return buffer
+
+    def replay(self, reporter: 'Reporter'):
+        """
+        Reports the recorded results as a subtest of the given reporter.
+
+        Args:
+            reporter: Reporter to replay the results into.
+        """
+        subtest = reporter.init_subtest(self.description)
+        for status, description, payload, reason in self.results:
+            if status == 'skipped':
+                subtest.skipped(description, payload, reason=reason)
+            else:
+                getattr(subtest, status)(description, payload)
+        subtest.print_plan()
+        reporter.end_subtest(subtest)
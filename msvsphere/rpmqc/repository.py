@@ -0,0 +1,234 @@
+import json
+import os
+import os.path
+import queue
+import tempfile
+import threading
+from typing import Dict, Iterator, List, TYPE_CHECKING
+
+import createrepo_c
+
+from .file_utils import is_url
+from .rpm_package import RPMPackageInfo
+
+if TYPE_CHECKING:
+    from .http_client import HTTPClient
+
+__all__ = ['find_repositories', 'get_primary_path', 'iter_repo_packages',
+           'load_repo_baseline', 'load_repo_packages', 'save_repo_state']
+
+# maximum number of parsed packages waiting to be consumed, it keeps memory
+# usage flat if packages are consumed slower than primary.xml is parsed
+PACKAGES_QUEUE_SIZE = 256
+
+
+def get_primary_path(repo_path: str) -> str:
+    """
+    Returns a repository primary.xml file path.
+
+    Args:
+        repo_path: Repository path.
+
+    Returns:
+        primary.xml file path.
+
+    Raises:
+        Exception: If there is no primary metadata in the repository.
+    """
+    repomd_xml_path = os.path.join(repo_path, 'repodata/repomd.xml')
+    repomd = createrepo_c.Repomd()
+    createrepo_c.xml_parse_repomd(repomd_xml_path, repomd)
+    for rec in repomd.records:
+        if rec.type == 'primary':
+            return os.path.join(repo_path, rec.location_href)
+    raise Exception(f'primary metadata is not found in {repomd_xml_path}')
+
+
+def iter_repo_packages(repo_path: str, primary_path: str = None,
+                       queue_size: int = PACKAGES_QUEUE_SIZE
+                       ) -> Iterator[RPMPackageInfo]:
+    """
+    Iterates over a repository packages while the repository metadata is
+    being parsed.
+
+    primary.xml is parsed in a background thread, parsed packages are passed
+    through a bounded queue, so that the parser is paused if packages are
+    consumed slower than they are parsed. Closing the iterator stops the
+    parser.
+
+    Args:
+        repo_path: Repository path or HTTP(S) URL.
+        primary_path: primary.xml file path. It is found using repomd.xml
+            if not specified.
+        queue_size: Maximum number of parsed packages waiting to be consumed.
+
+    Returns:
+        Iterator over repository packages in the primary.xml order.
+    """
+    if is_url(repo_path) and primary_path is None:
+        yield from _iter_remote_repo_packages(repo_path)
+        return
+    if primary_path is None:
+        primary_path = get_primary_path(repo_path)
+    packages = queue.Queue(queue_size)
+    cancelled = threading.Event()
+
+    def pkg_callback(pkg):
+        if cancelled.is_set():
+            raise Exception('cancelled by the consumer')
+        packages.put(RPMPackageInfo.from_metadata(repo_path, pkg))
+
+    def parse():
+        error = None
+        try:
+            createrepo_c.xml_parse_primary(primary_path, pkgcb=pkg_callback,
+                                           do_files=False)
+        except Exception as e:
+            error = e
+        # NOTE: None marks the end of the packages list
+        packages.put(None if cancelled.is_set() else error)
+
+    parser = threading.Thread(target=parse, name='rpmqc-primary-parser',
+                              daemon=True)
+    parser.start()
+    try:
+        while True:
+            pkg_info = packages.get()
+            if pkg_info is None:
+                break
+            elif isinstance(pkg_info, Exception):
+                raise pkg_info
+            yield pkg_info
+    finally:
+        cancelled.set()
+        # unblock the parser if it is waiting for free space in the queue
+        while parser.is_alive():
+            try:
+                packages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def load_repo_packages(repo_path: str,
+                       primary_path: str = None) -> List[RPMPackageInfo]:
+    """
+    Loads a repository packages list from the repository metadata.
+
+    Args:
+        repo_path: Repository path or HTTP(S) URL.
+        primary_path: primary.xml file path. It is found using repomd.xml
+            if not specified.
+
+    Returns:
+        Repository packages in the primary.xml order.
+    """
+    return list(iter_repo_packages(repo_path, primary_path))
+
+
+def _iter_remote_repo_packages(repo_url: str) -> Iterator[RPMPackageInfo]:
+    """
+    Iterates over a remote repository packages.
+
+    The repository metadata is downloaded to a temporary directory, package
+    paths are URLs.
+
+    Args:
+        repo_url: Repository base URL.
+
+    Returns:
+        Iterator over the repository packages in the primary.xml order.
+    """
+    # NOTE: http.client is imported only for remote repositories, it is
+    #       relatively slow to import
+    from .http_client import HTTPClient
+    repo_url = repo_url.rstrip('/')
+    client = HTTPClient(max_connections=1)
+    try:
+        # the metadata is removed once the packages iteration is finished
+        with tempfile.TemporaryDirectory(prefix='rpmqc-') as tmp_dir:
+            repomd_href = 'repodata/repomd.xml'
+            _download_file(client, f'{repo_url}/{repomd_href}',
+                           os.path.join(tmp_dir, repomd_href))
+            primary_path = get_primary_path(tmp_dir)
+            primary_href = os.path.relpath(primary_path, tmp_dir)
+            _download_file(client, f'{repo_url}/{primary_href}',
+                           primary_path)
+            # package metadata parsing may take a while, don't keep the
+            # connection open
+            client.close()
+            yield from iter_repo_packages(repo_url, primary_path)
+    finally:
+        client.close()
+
+
+def _download_file(client: 'HTTPClient', url: str, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as fd:
+        client.download(url, fd)
+
+
+def save_repo_state(state_path: str, packages: Dict[str, str]):
+    """
+    Saves a repository state (packages locations and checksums) to a file.
+
+    Args:
+        state_path: State file path.
+        packages: Dictionary of repository packages locations and their keys
+            (see RPMPackageInfo.key), the same as load_repo_baseline returns.
+    """
+    state = {'packages': packages}
+    tmp_path = f'{state_path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w') as fd:
+        json.dump(state, fd, indent=1, sort_keys=True)
+    os.replace(tmp_path, state_path)
+
+
+def load_repo_baseline(path: str) -> Dict[str, str]:
+    """
+    Loads a repository baseline to compare the current repository state with.
+
+    Args:
+        path: Either a state file saved by save_repo_state (.json),
+            an old repository directory, its repomd.xml file or
+            primary.xml file.
+
+    Returns:
+        Dictionary of baseline packages locations and their keys
+        (see RPMPackageInfo.key).
+    """
+    if is_url(path):
+        packages = load_repo_packages(path)
+        return {p.location_href: p.key for p in packages}
+    if path.endswith('.json'):
+        with open(path, 'r') as fd:
+            return json.load(fd)['packages']
+    if os.path.isdir(path):
+        packages = load_repo_packages(path)
+    elif os.path.basename(path) == 'repomd.xml':
+        packages = load_repo_packages(os.path.dirname(os.path.dirname(path)))
+    else:
+        # a primary.xml file, its location is irrelevant here
+        packages = load_repo_packages(os.path.dirname(path), path)
+    return {p.location_href: p.key for p in packages}
+
+
+def find_repositories(path: str) -> List[str]:
+    """
+    Finds YUM/DNF repositories inside a directory (e.g. a compose root).
+
+    Args:
+        path: Repository or compose root directory path.
+
+    Returns:
+        Sorted list of repository paths. The path itself is returned if it is
+        a repository.
+    """
+    repos = []
+    for root, dirs, _ in os.walk(path):
+        if os.path.exists(os.path.join(root, 'repodata/repomd.xml')):
+            repos.append(root)
+            # repositories are never nested
+            dirs.clear()
+        else:
+            dirs.sort()
+    return sorted(repos)
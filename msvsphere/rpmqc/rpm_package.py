@@ -1,28 +1,203 @@
+import collections
+import enum
+import os
+import os.path
 import re
-from typing import Tuple, Union
+import struct
+import time
+from typing import Any, Dict, Optional, Tuple, Union
 
 import rpm
 
-__all__ = ['RPMPackage']
+from .pgp_utils import parse_pgp_signature
+
+__all__ = ['read_signature_tags', 'PackageParts', 'RPMPackage',
+           'RPMPackageInfo', 'UnsupportedSignatureError']
+
+
+RPM_LEAD_MAGIC = b'\xed\xab\xee\xdb'
+
+RPM_LEAD_SIZE = 96
+
+RPM_HEADER_MAGIC = b'\x8e\xad\xe8\x01'
+
+RPM_BIN_TYPE = 7
+
+# signature header tags containing a PGP signature in the order RPM checks
+# them (RSA and DSA header-only signatures, legacy GPG and PGP signatures)
+RPM_SIG_TAGS = (
+    ('RSAHEADER', 268),
+    ('DSAHEADER', 267),
+    ('SIGGPG', 1005),
+    ('SIGPGP', 1002)
+)
+
+
+class UnsupportedSignatureError(Exception):
+
+    """
+    The RPM package PGP signature format isn't supported.
+    """
+
+
+class PackageParts(enum.IntFlag):
+
+    """
+    RPM package file parts an inspector needs.
+    """
+
+    NONE = 0
+    # lead and signature header
+    SIGNATURE = 1
+    # main header, it includes signature header tags as well
+    HEADER = 2
+    # compressed payload, it implies the main header
+    PAYLOAD = 4
+
+
+def read_signature_tags(fd) -> Dict[int, bytes]:
+    """
+    Reads binary tags from an RPM package signature header.
+
+    Only the lead and the signature header are read, the file offset points
+    to the main header afterwards.
+
+    Args:
+        fd: RPM package file object positioned at the file start.
+
+    Returns:
+        Dictionary of binary signature header tags and their values.
+
+    Raises:
+        Exception: If the file isn't an RPM package.
+    """
+    lead = fd.read(RPM_LEAD_SIZE)
+    if len(lead) != RPM_LEAD_SIZE or not lead.startswith(RPM_LEAD_MAGIC):
+        raise Exception('RPM lead is not found')
+    intro = fd.read(16)
+    if len(intro) != 16 or not intro.startswith(RPM_HEADER_MAGIC):
+        raise Exception('RPM signature header is not found')
+    index_len, data_len = struct.unpack('>II', intro[8:])
+    index = fd.read(index_len * 16)
+    # the signature header is padded to 8 bytes
+    data = fd.read(data_len + (8 - data_len % 8) % 8)
+    if len(index) != index_len * 16 or len(data) < data_len:
+        raise Exception('RPM signature header is truncated')
+    tags = {}
+    for tag, tag_type, offset, count in struct.iter_unpack('>IIII', index):
+        if tag_type == RPM_BIN_TYPE:
+            tags[tag] = data[offset:offset + count]
+    return tags
 
 
 class RPMPackage:
 
-    def __init__(self, fd: rpm.fd, hdr: rpm.hdr, path: str):
-        self.fd = fd
-        self.hdr = hdr
+    """
+    RPM package opened for inspection.
+
+    The package file is read lazily: it is opened on first access, the lead
+    and the signature header are enough to check a PGP signature while the
+    main header is parsed only when an inspector accesses it.
+    """
+
+    def __init__(self, path: str, info: Optional['RPMPackageInfo'] = None,
+                 ts: Optional[rpm.TransactionSet] = None,
+                 has_header: bool = True, deadline: Optional[float] = None):
+        """
+        Args:
+            path: RPM package file path.
+            info: RPM package description, it may contain repository metadata.
+            ts: RPM transaction set to read the package header with.
+            has_header: Whether the file contains the main header, it
+                doesn't if only the signature header of a remote package was
+                downloaded.
+            deadline: time.monotonic() value the inspection should be
+                finished by (see check_deadline), None if there is no
+                deadline.
+        """
         self.path = path
+        self.info = info
+        # inspectors report their metrics (e.g. the number of verified files)
+        # using these counters
+        self.counters = collections.Counter()
+        # time spent on the package headers reading
+        self.header_time = 0.0
+        # long running inspection loops check it to stop once the run time
+        # budget is exceeded
+        self.deadline = deadline
+        self._ts = ts
+        self._has_header = has_header
+        self._fd = None
+        self._hdr = None
+        self._sig_tags = None
+
+    @property
+    def fd(self) -> rpm.fd:
+        """
+        RPM package file descriptor positioned at the payload start.
+        """
+        # the main header must be read before the payload
+        _ = self.hdr
+        return self._fd
+
+    @property
+    def hdr(self) -> rpm.hdr:
+        """
+        RPM package header (including signature header tags).
+        """
+        if self._hdr is None:
+            start_time = time.perf_counter()
+            fd = self._open()
+            fd.seek(0)
+            if self._ts is None:
+                self._ts = rpm.TransactionSet('', rpm._RPMVSF_NOSIGNATURES)
+            self._hdr = self._ts.hdrFromFdno(fd)
+            self.header_time += time.perf_counter() - start_time
+        return self._hdr
+
+    @property
+    def bytes_read(self) -> int:
+        """
+        Number of bytes read from the package file.
+        """
+        if self._fd is None:
+            return 0
+        # NOTE: payload streams opened by inspectors share the file offset
+        #       with the package file descriptor
+        return os.lseek(self._fd.fileno(), 0, os.SEEK_CUR)
 
     @property
     def signature(self) -> Union[Tuple[str, str], Tuple[None, None]]:
         """
         PGP signature information from an RPM package header.
 
+        The signature header is parsed directly unless the main header is
+        already loaded or the signature format isn't supported.
+
         Returns:
             A signature digest algorithm (e.g. "RSA/SHA256") and a PGP key ID.
+
+        Raises:
+            UnsupportedSignatureError: If the signature format isn't
+                supported.
         """
+        if self._hdr is None:
+            sig_tags = self._get_signature_tags()
+            for _, tag_id in RPM_SIG_TAGS:
+                if tag_id in sig_tags:
+                    parsed = parse_pgp_signature(sig_tags[tag_id])
+                    if parsed:
+                        return parsed
+                    elif not self._has_header:
+                        raise UnsupportedSignatureError(
+                            'unsupported signature format'
+                        )
+                    # let RPM handle an unsupported signature format
+                    break
+            else:
+                return None, None
         empty = '(none)'
-        for tag in ('RSAHEADER', 'DSAHEADER', 'SIGGPG', 'SIGPGP'):
+        for tag, _ in RPM_SIG_TAGS:
             signature = self.hdr.sprintf(f'%{{{tag}:pgpsig}}')
             if signature != empty:
                 break
@@ -31,9 +206,135 @@ class RPMPackage:
         re_rslt = re.search(r'^([\w/]+),.*?Key\s+ID\s+([a-zA-Z\d]+)$',
                             signature)
         if not re_rslt:
-            raise Exception(f'unsupported signature format "{signature}"')
+            raise UnsupportedSignatureError(
+                f'unsupported signature format "{signature}"'
+            )
         digest_algo, sig_key_id = re_rslt.groups()
         return digest_algo, sig_key_id
 
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+
+    def _open(self) -> rpm.fd:
+        if self._fd is None:
+            self._fd = rpm.fd(self.path, 'r')
+        return self._fd
+
+    def _get_signature_tags(self) -> Dict[int, bytes]:
+        if self._sig_tags is None:
+            start_time = time.perf_counter()
+            fd = self._open()
+            fd.seek(0)
+            self._sig_tags = read_signature_tags(fd)
+            self.header_time += time.perf_counter() - start_time
+        return self._sig_tags
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __str__(self):
+        return self.path
+
+
+class RPMPackageInfo:
+
+    """
+    Lightweight, picklable description of an RPM package to be inspected.
+    """
+
+    # RPM tags available in repository metadata and corresponding
+    # createrepo_c.Package attribute names
+    METADATA_TAGS = {
+        'buildhost': 'rpm_buildhost',
+        'buildtime': 'time_build',
+        'group': 'rpm_group',
+        'license': 'rpm_license',
+        'name': 'name',
+        'packager': 'rpm_packager',
+        'release': 'release',
+        'sourcerpm': 'rpm_sourcerpm',
+        'summary': 'summary',
+        'url': 'url',
+        'vendor': 'rpm_vendor',
+        'version': 'version'
+    }
+
+    def __init__(self, path: str, size: Optional[int] = None,
+                 checksum: Optional[str] = None,
+                 checksum_type: Optional[str] = None,
+                 tags: Optional[Dict[str, Any]] = None,
+                 location_href: Optional[str] = None,
+                 header_range: Optional[Tuple[int, int]] = None,
+                 arch: Optional[str] = None):
+        """
+        Args:
+            path: RPM package file path.
+            size: RPM package file size.
+            checksum: RPM package file checksum from repository metadata.
+            checksum_type: RPM package file checksum type.
+            tags: RPM tag values from repository metadata.
+            location_href: RPM package location relative to a repository
+                root.
+            header_range: RPM package main header start and end offsets
+                from repository metadata.
+            arch: RPM package architecture from repository metadata
+                ("src" for source packages).
+        """
+        self.path = path
+        self.checksum = checksum
+        self.checksum_type = checksum_type
+        self.tags = tags or {}
+        self.location_href = location_href
+        self.header_range = header_range
+        self.arch = arch
+        self._size = size
+
+    @classmethod
+    def from_metadata(cls, repo_path: str, pkg) -> 'RPMPackageInfo':
+        """
+        Creates an RPM package description from repository metadata.
+
+        Args:
+            repo_path: Repository path.
+            pkg: createrepo_c.Package object.
+
+        Returns:
+            RPM package description.
+        """
+        tags = {tag_name: getattr(pkg, attr)
+                for tag_name, attr in cls.METADATA_TAGS.items()}
+        header_range = None
+        if pkg.rpm_header_end:
+            header_range = (pkg.rpm_header_start, pkg.rpm_header_end)
+        return cls(os.path.join(repo_path, pkg.location_href),
+                   pkg.size_package, pkg.pkgId, pkg.checksum_type, tags,
+                   pkg.location_href, header_range, pkg.arch)
+
+    @property
+    def key(self) -> str:
+        """
+        RPM package unique key: a checksum if it is known, a path otherwise.
+        """
+        if self.checksum:
+            return f'{self.checksum_type}:{self.checksum}'
+        return self.path
+
+    @property
+    def size(self) -> int:
+        """
+        RPM package file size in bytes.
+
+        The value from repository metadata is used if available, otherwise
+        the file size is read from the file system.
+        """
+        if self._size is None:
+            self._size = os.path.getsize(self.path)
+        return self._size
+
     def __str__(self):
         return self.path
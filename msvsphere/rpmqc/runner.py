@@ -1,21 +1,52 @@
-from contextlib import closing
+import collections
+from contextlib import closing, contextmanager
+import hashlib
+import heapq
+import itertools
+import multiprocessing
+import multiprocessing.pool
 import os.path
-from typing import Iterable, List
+import signal
+import tempfile
+import threading
+import time
+from typing import (Dict, Iterable, Iterator, List, Optional, Sequence,
+                    Tuple, TYPE_CHECKING, Union)
 
-import createrepo_c
 import rpm
 
 from .config import Config
+from .file_utils import is_url
 from .inspectors.pkg_base_inspector import PkgBaseInspector
-from .reporter import ReporterTap
-from .rpm_package import RPMPackage
+from .inspectors.registry import select_inspectors
+from .limits import InspectionCancelled, InspectionLimits
+from .metrics import (IMAMemoStats, InspectionMetrics, measure_time,
+                      MetricsCollector, PackageMetrics)
+from .payload import scan_payload
+from .reporter import Reporter, ReporterBuffer, ReporterTap
+from .rpm_package import PackageParts, RPMPackage, RPMPackageInfo
 
-__all__ = ['run_repo_inspections', 'run_rpm_inspections']
+if TYPE_CHECKING:
+    from .cache import ResultCache
+    from .filters import PackageFilter
+    from .sharding import Shard
+
+__all__ = ['InspectionLimits', 'report_disabled_inspections',
+           'run_compose_inspections', 'run_repo_inspections',
+           'run_rpm_inspections']
+
+# maximum number of packages per worker process that are read ahead and
+# scheduled for inspection while earlier results are being reported
+INSPECTION_WINDOW_PER_JOB = 16
+
+# number of the largest packages per worker process that are scheduled
+# before the others regardless of their position in the packages list
+LARGEST_FIRST_PER_JOB = 16
 
 
 def load_inspections(cfg: Config) -> List[PkgBaseInspector]:
     """
-    Initializes RPM package inspectors.
+    Initializes RPM package inspectors enabled by the configuration.
 
     Args:
         cfg: Configuration object.
@@ -23,50 +54,719 @@ def load_inspections(cfg: Config) -> List[PkgBaseInspector]:
     Returns:
         List of RPM package inspectors.
     """
-    # TODO: use dynamical loading via pkgutil
-    inspections = []
-    from .inspectors.pkg_signature_inspector import PkgSignatureInspector
-    from .inspectors.pkg_ima_inspector import PkgIMASignatureInspector
-    from .inspectors.pkg_tags_inspector import PkgTagsInspector
-    inspections.append(PkgSignatureInspector(cfg))
-    inspections.append(PkgIMASignatureInspector(cfg))
-    inspections.append(PkgTagsInspector(cfg))
-    return inspections
-
-
-def run_rpm_inspections(cfg: Config, rpm_paths: Iterable) -> bool:
-    ts = rpm.TransactionSet('', rpm._RPMVSF_NOSIGNATURES)
-    inspectors = load_inspections(cfg)
-    reporter = ReporterTap()
+    enabled, _ = select_inspectors(cfg)
+    return [inspector_cls(cfg) for inspector_cls in enabled]
+
+
+def report_disabled_inspections(cfg: Config, reporter: Reporter):
+    """
+    Reports RPM package inspectors disabled by the configuration as skipped
+    top-level tests, so that they are reported once per run.
+
+    Args:
+        cfg: Configuration object.
+        reporter: Run reporter.
+    """
+    _, disabled = select_inspectors(cfg)
+    for title, reason in disabled:
+        reporter.skipped(f'{title} inspection', reason=reason)
+
+
+class PackageInspector:
+
+    """
+    Runs all configured inspections for RPM packages.
+
+    Every worker process has its own instance, so that an RPM transaction set
+    and inspectors state (e.g. a loaded IMA key) are never shared.
+    """
+
+    def __init__(self, cfg: Config):
+        self.ts = rpm.TransactionSet('', rpm._RPMVSF_NOSIGNATURES)
+        self.inspectors = load_inspections(cfg)
+        # remote packages are fetched one at a time by every worker process,
+        # so a single keep-alive connection is enough
+        self._http_client = None
+
+    def inspect(
+            self, pkg_info: RPMPackageInfo, deadline: Optional[float] = None
+    ) -> Tuple[Optional[ReporterBuffer], PackageMetrics]:
+        """
+        Inspects an RPM package.
+
+        Args:
+            pkg_info: RPM package to inspect.
+            deadline: time.monotonic() value the inspection should be
+                finished by, it is cancelled at the next payload chunk or
+                file once the deadline passes.
+
+        Returns:
+            Recorded inspection results (None if the inspection was
+            cancelled) and used resources metrics.
+        """
+        start_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        pkg_reporter = ReporterBuffer(os.path.basename(pkg_info.path))
+        metrics = PackageMetrics(pkg_info.path)
+        parts = PackageParts.NONE
+        for inspector in self.inspectors:
+            parts |= inspector.get_required_parts(pkg_info)
+        # NOTE: the package file is opened lazily, so it isn't read at all
+        #       if everything we need is available in the repository metadata
+        with self._fetch(pkg_info, parts, metrics) as (path, has_header), \
+                RPMPackage(path, pkg_info, self.ts, has_header,
+                           deadline) as pkg:
+            if parts & (PackageParts.HEADER | PackageParts.PAYLOAD):
+                # the main header contains signature header tags as well,
+                # read it at once instead of reading the signature header
+                # separately
+                _ = pkg.hdr
+            try:
+                self._run_inspectors(pkg, pkg_reporter, metrics)
+            except InspectionCancelled:
+                pkg_reporter = None
+            metrics.header_time = pkg.header_time
+            metrics.bytes_read = pkg.bytes_read
+        metrics.wall_time = time.perf_counter() - start_time
+        metrics.cpu_time = time.process_time() - start_cpu_time
+        return pkg_reporter, metrics
+
+    @contextmanager
+    def _fetch(self, pkg_info: RPMPackageInfo, parts: PackageParts,
+               metrics: PackageMetrics) -> Iterator[Tuple[str, bool]]:
+        """
+        Provides a local RPM package file.
+
+        Remote packages are downloaded to a temporary file. Only the lead
+        and the headers are requested using the header range from repository
+        metadata unless the payload is needed.
+
+        Args:
+            pkg_info: RPM package to fetch.
+            parts: RPM package parts required by inspectors.
+            metrics: RPM package metrics to update.
+
+        Returns:
+            Local RPM package file path and whether it contains the main
+            header.
+        """
+        if not is_url(pkg_info.path) or not parts:
+            yield pkg_info.path, True
+            return
+        if self._http_client is None:
+            from .http_client import HTTPClient
+            self._http_client = HTTPClient(max_connections=1)
+        byte_range = checksum_type = None
+        has_header = True
+        if PackageParts.PAYLOAD not in parts and pkg_info.header_range:
+            # the signature header ends where the main header starts
+            hdr_start, hdr_end = pkg_info.header_range
+            has_header = PackageParts.HEADER in parts
+            end = hdr_end if has_header else hdr_start
+            byte_range = (0, end - 1)
+        elif pkg_info.checksum_type in hashlib.algorithms_guaranteed:
+            checksum_type = pkg_info.checksum_type
+        with tempfile.NamedTemporaryFile(prefix='rpmqc-',
+                                         suffix='.rpm') as fd:
+            metrics.bytes_downloaded, checksum = self._http_client.download(
+                pkg_info.path, fd, byte_range, checksum_type
+            )
+            if checksum is not None and checksum != pkg_info.checksum:
+                raise Exception(f'{pkg_info.path} checksum mismatch: '
+                                f'got {checksum}, expected '
+                                f'{pkg_info.checksum}')
+            yield fd.name, has_header
+
+    def _run_inspectors(self, pkg: RPMPackage, reporter: ReporterBuffer,
+                        metrics: PackageMetrics):
+        inspections = [InspectionMetrics() for _ in self.inspectors]
+        visitors = []
+        for inspector, inspection in zip(self.inspectors, inspections):
+            with measure_time(inspection):
+                visitors.append(inspector.get_payload_visitor(pkg))
+        subscribed = [v for v in visitors if v is not None]
+        if subscribed:
+            # the payload is decompressed once for all inspectors
+            scan = InspectionMetrics()
+            with measure_time(scan):
+                scan.counters['bytes_decompressed'] = \
+                    scan_payload(pkg, subscribed)
+            # visitors time is accounted to their inspectors
+            scan.wall_time -= sum(v.wall_time for v in subscribed)
+            scan.cpu_time -= sum(v.cpu_time for v in subscribed)
+            metrics.inspections['payload'] = scan
+        for inspector, visitor, inspection in zip(self.inspectors, visitors,
+                                                  inspections):
+            with measure_time(inspection):
+                if visitor is None:
+                    inspector.inspect(pkg, reporter)
+                else:
+                    visitor.report(reporter)
+            if visitor is not None:
+                inspection.wall_time += visitor.wall_time
+                inspection.cpu_time += visitor.cpu_time
+                inspection.counters.update(visitor.counters)
+            inspection.counters.update(pkg.counters)
+            pkg.counters.clear()
+            metrics.inspections[type(inspector).__name__] = inspection
+
+
+_worker_inspector = None
+_worker_init_error = None
+
+
+def _init_worker(cfg: Config):
+    global _worker_inspector, _worker_init_error
+    # interruption is handled by the parent process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # the parent process could have its own handlers (e.g. a repository
+    # watcher), but the pool terminates workers using SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    try:
+        _worker_inspector = PackageInspector(cfg)
+    except Exception as e:
+        # NOTE: an exception raised from a pool initializer makes the pool
+        #       respawn workers forever, so we report it on the first task
+        _worker_init_error = e
+
+
+def _inspect_in_worker(
+        pkg_info: RPMPackageInfo
+) -> Tuple[ReporterBuffer, PackageMetrics]:
+    if _worker_init_error is not None:
+        raise _worker_init_error
+    return _worker_inspector.inspect(pkg_info)
+
+
+class InspectionWorkers:
+
+    """
+    Long-living RPM package inspectors that are reused between inspection
+    batches, e.g. by a repository watcher.
+
+    Packages are inspected in the current process if a single job is
+    requested, a pool of worker processes is used otherwise. The inspect
+    method can be called from multiple threads, in-process inspections are
+    serialized.
+    """
+
+    def __init__(self, cfg: Config, jobs: int = 1):
+        """
+        Args:
+            cfg: Configuration object.
+            jobs: Number of worker processes to use.
+        """
+        self._inspector = None
+        self._pool = None
+        self._lock = threading.Lock()
+        if jobs > 1:
+            self._pool = multiprocessing.Pool(jobs, _init_worker, (cfg,))
+        else:
+            self._inspector = PackageInspector(cfg)
+
+    def inspect(
+            self, packages: List[RPMPackageInfo]
+    ) -> Iterator[Tuple[RPMPackageInfo,
+                        Union[Tuple[ReporterBuffer, PackageMetrics],
+                              Exception]]]:
+        """
+        Inspects RPM packages.
+
+        Args:
+            packages: RPM packages to inspect.
+
+        Returns:
+            Iterator over RPM packages and their inspection results and
+            metrics or exceptions raised during their inspection, the
+            results are returned in the packages order.
+        """
+        if self._pool is not None:
+            results = self._pool.imap(_inspect_in_worker, packages)
+        else:
+            results = map(self._inspect_locked, packages)
+        for pkg_info in packages:
+            try:
+                yield pkg_info, next(results)
+            except Exception as e:
+                yield pkg_info, e
+
+    def _inspect_locked(
+            self, pkg_info: RPMPackageInfo
+    ) -> Tuple[ReporterBuffer, PackageMetrics]:
+        with self._lock:
+            return self._inspector.inspect(pkg_info)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def iter_inspections(
+        cfg: Config, packages: Iterable[RPMPackageInfo], jobs: int = 1,
+        cache: Optional['ResultCache'] = None,
+        limits: Optional[InspectionLimits] = None,
+        first: Sequence[RPMPackageInfo] = ()
+) -> Iterator[Tuple[RPMPackageInfo, ReporterBuffer,
+                    Optional[PackageMetrics]]]:
+    """
+    Inspects RPM packages, optionally using a pool of worker processes.
+
+    Packages are read from the iterable lazily: no more than
+    INSPECTION_WINDOW_PER_JOB packages per worker process are read ahead,
+    so that packages can be produced while previous ones are inspected
+    (e.g. by a repository metadata parser) and memory usage doesn't depend
+    on the number of packages.
+
+    Args:
+        cfg: Configuration object.
+        packages: RPM packages to inspect.
+        jobs: Number of worker processes to use.
+        cache: Inspection results cache. Packages that have cached results
+            are not opened at all.
+        limits: Run limits. Packages are not inspected anymore once the run
+            is stopped or the time budget is exceeded, inspections that are
+            in progress at that moment are cancelled: worker processes are
+            terminated, an in-process inspection stops at the next payload
+            chunk or file.
+        first: Packages to submit to worker processes before the others,
+            in this order, e.g. the largest packages, so that a huge package
+            at the end of the list isn't inspected alone when the rest is
+            done. Each of them should be in the packages iterable as well,
+            their results are held until it reaches them, so there should
+            be no more than a few of them per job (see
+            LARGEST_FIRST_PER_JOB), the rest is read through the window.
+
+    Returns:
+        Iterator over RPM packages, their inspection results (None if
+        a package wasn't inspected because of the limits) and metrics (None
+        for cached results), the results are always returned in the packages
+        order. Closing the iterator cancels pending inspections.
+    """
+    if limits is None:
+        limits = InspectionLimits()
+    if jobs <= 1:
+        inspector = None
+        for pkg_info in packages:
+            results = metrics = None
+            if not limits.stopped:
+                if cache is not None:
+                    results = cache.get(pkg_info)
+                if results is None:
+                    if inspector is None:
+                        inspector = PackageInspector(cfg)
+                    results, metrics = inspector.inspect(pkg_info,
+                                                         limits.deadline)
+                    if results is None:
+                        metrics = None
+                    elif cache is not None:
+                        cache.put(pkg_info, results)
+            yield pkg_info, results, metrics
+        return
+    packages = iter(packages)
+    window = jobs * INSPECTION_WINDOW_PER_JOB
+    # read ahead packages and their cached results or pending inspections
+    pending = collections.deque()
+    exhausted = False
+    pool = None
+    # entries of the packages submitted first by their keys and paths
+    early = {}
+    try:
+        if first and not limits.stopped:
+            entries = collections.deque()
+            pool = _schedule_chunk(cfg, list(first), jobs, cache, entries,
+                                   pool, True)
+            early = {(e[0].key, e[0].path): e for e in entries}
+        while True:
+            if not exhausted and len(pending) <= window // 2:
+                chunk = list(itertools.islice(packages, window - len(pending)))
+                exhausted = len(chunk) < window - len(pending)
+                if limits.stopped:
+                    pending.extend([p, None] for p in chunk)
+                else:
+                    pool = _schedule_chunk(cfg, chunk, jobs, cache, pending,
+                                           pool, exhausted, early)
+            if not pending:
+                break
+            pkg_info, result = pending.popleft()
+            metrics = None
+            if isinstance(result, multiprocessing.pool.AsyncResult):
+                if limits.stopped:
+                    result = None
+                else:
+                    timeout = None
+                    if limits.deadline is not None:
+                        timeout = max(limits.deadline - time.monotonic(), 0)
+                    try:
+                        result, metrics = result.get(timeout)
+                    except multiprocessing.TimeoutError:
+                        result = None
+                    else:
+                        if cache is not None:
+                            cache.put(pkg_info, result)
+                if result is None:
+                    # cancel in-progress inspections
+                    pool.terminate()
+            elif limits.stopped:
+                result = None
+            yield pkg_info, result, metrics
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+
+def _schedule_chunk(cfg: Config, chunk: List[RPMPackageInfo], jobs: int,
+                    cache: Optional['ResultCache'], pending: collections.deque,
+                    pool: Optional[multiprocessing.pool.Pool],
+                    exhausted: bool, early: Optional[Dict[tuple, list]] = None
+                    ) -> Optional[multiprocessing.pool.Pool]:
+    """
+    Submits read ahead RPM packages to a pool of worker processes.
+
+    Args:
+        cfg: Configuration object.
+        chunk: Read ahead RPM packages.
+        jobs: Number of worker processes to use.
+        cache: Inspection results cache.
+        pending: Queue of RPM packages and their cached results or pending
+            inspections to append the chunk to.
+        pool: Pool of worker processes, None if it isn't created yet.
+        exhausted: Whether there are no more packages after the chunk.
+        early: Entries of packages that were submitted before the chunk
+            (see the iter_inspections first argument) by their keys and
+            paths, they are reused instead of submitting the packages again.
+
+    Returns:
+        Pool of worker processes, it is created on the first package that
+        has no cached results.
+    """
+    entries, schedule = [], []
+    for pkg_info in chunk:
+        entry = early.pop((pkg_info.key, pkg_info.path), None) \
+            if early else None
+        if entry is None:
+            entry = [pkg_info,
+                     cache.get(pkg_info) if cache is not None else None]
+            if entry[1] is None:
+                schedule.append(entry)
+        entries.append(entry)
+    # schedule the largest packages of the chunk first so that a huge
+    # package doesn't end up being inspected alone at the end of the chunk
+    schedule.sort(key=lambda e: e[0].size, reverse=True)
+    if schedule and pool is None:
+        # don't spawn more worker processes than there are packages
+        processes = min(jobs, len(schedule)) if exhausted else jobs
+        pool = multiprocessing.Pool(processes, _init_worker, (cfg,))
+    for entry in schedule:
+        entry[1] = pool.apply_async(_inspect_in_worker, (entry[0],))
+    pending.extend(entries)
+    return pool
+
+
+def run_rpm_inspections(cfg: Config, rpm_paths: Iterable, jobs: int = 1,
+                        cache: Optional['ResultCache'] = None,
+                        reporter: Optional[Reporter] = None,
+                        metrics: Optional[MetricsCollector] = None,
+                        removed_paths: Iterable[str] = (),
+                        limits: Optional[InspectionLimits] = None,
+                        first: Sequence[RPMPackageInfo] = ()) -> bool:
+    packages = (p if isinstance(p, RPMPackageInfo) else RPMPackageInfo(p)
+                for p in rpm_paths)
+    if isinstance(rpm_paths, Sequence) and jobs > 1:
+        # all packages are known, so the largest ones are scheduled first
+        packages = list(packages)
+        first = heapq.nlargest(jobs * LARGEST_FIRST_PER_JOB, packages,
+                               key=lambda p: p.size)
+    if reporter is None:
+        reporter = ReporterTap()
+    if limits is None:
+        limits = InspectionLimits()
+    memo_stats = IMAMemoStats()
     reporter.print_header()
-    for rpm_path in rpm_paths:
-        rpm_basename = os.path.basename(rpm_path)
-        with closing(rpm.fd(rpm_path, 'r')) as fd:
-            hdr = ts.hdrFromFdno(fd)
-            pkg = RPMPackage(fd, hdr, rpm_path)
-            pkg_reporter = reporter.init_subtest(rpm_basename)
-            for inspector in inspectors:
-                inspector.inspect(pkg, pkg_reporter)
-            pkg_reporter.print_plan()
-            reporter.end_subtest(pkg_reporter)
+    report_disabled_inspections(cfg, reporter)
+    with closing(iter_inspections(cfg, packages, jobs, cache, limits,
+                                  first)) as inspections:
+        for pkg_info, pkg_reporter, pkg_metrics in inspections:
+            if pkg_reporter is None:
+                # the run is stopped early, report the remaining packages as
+                # skipped so that the test plan stays valid
+                limits.stop()
+                reporter.skipped(os.path.basename(pkg_info.path),
+                                 reason=limits.reason)
+                continue
+            start_time = time.perf_counter()
+            pkg_reporter.replay(reporter)
+            memo_stats.add(pkg_metrics)
+            if metrics is not None:
+                metrics.add(pkg_metrics, time.perf_counter() - start_time)
+            limits.add(pkg_reporter)
+            if limits.failures_exceeded:
+                limits.stop()
+    for removed_path in removed_paths:
+        reporter.skipped(os.path.basename(removed_path),
+                         reason='removed since the baseline')
     reporter.print_plan()
     reporter.print_summary()
+    reporter.print_footer()
+    memo_stats.report()
+    if metrics is not None:
+        metrics.finish()
     return reporter.failed_count == 0
 
 
-def run_repo_inspections(cfg: Config, repo_path: str):
-    repomd_xml_path = os.path.join(repo_path, 'repodata/repomd.xml')
-    repomd = createrepo_c.Repomd()
-    createrepo_c.xml_parse_repomd(repomd_xml_path, repomd)
-    primary_path = None
-    for rec in repomd.records:
-        if rec.type == 'primary':
-            primary_path = os.path.join(repo_path, rec.location_href)
-            break
-    packages = []
-    def pkg_callback(pkg):
-        packages.append(pkg.location_href)
-    createrepo_c.xml_parse_primary(primary_path, pkgcb=pkg_callback,
-                                   do_files=False)
-    return run_rpm_inspections(cfg, (os.path.join(repo_path, p)
-                                     for p in packages))
+def _iter_keeping_largest(packages: Iterable[RPMPackageInfo],
+                          largest: list,
+                          count: int) -> Iterator[RPMPackageInfo]:
+    """
+    Passes RPM packages through, keeping the largest of them.
+
+    Args:
+        packages: RPM packages.
+        largest: Min-heap of (size, -index, package) tuples to keep the
+            largest packages in, earlier packages win ties.
+        count: Number of the largest packages to keep.
+
+    Returns:
+        Iterator over the packages.
+    """
+    for i, pkg_info in enumerate(packages):
+        item = (pkg_info.size, -i, pkg_info)
+        if len(largest) < count:
+            heapq.heappush(largest, item)
+        elif count:
+            heapq.heappushpop(largest, item)
+        yield pkg_info
+
+
+def run_repo_inspections(cfg: Config, repo_path: str, jobs: int = 1,
+                         cache: Optional['ResultCache'] = None,
+                         reporter: Optional[Reporter] = None,
+                         metrics: Optional[MetricsCollector] = None,
+                         baseline: Optional[Dict[str, str]] = None,
+                         state_path: Optional[str] = None,
+                         limits: Optional[InspectionLimits] = None,
+                         shard: Optional['Shard'] = None,
+                         pkg_filter: Optional['PackageFilter'] = None):
+    """
+    Inspects a repository.
+
+    Args:
+        cfg: Configuration object.
+        repo_path: Repository path.
+        jobs: Number of worker processes to use.
+        cache: Inspection results cache.
+        reporter: Reporter to use.
+        metrics: Metrics collector.
+        baseline: Previous repository state (see load_repo_baseline), only
+            new or changed packages are inspected if specified, removed
+            packages are reported as skipped.
+        state_path: Save the repository state to this file if all tests
+            passed, so that it can be used as a baseline for the next run.
+        limits: Limits that stop the run early, the remaining packages are
+            reported as skipped.
+        shard: Inspect only packages of this shard of a multi-node run.
+            The repository metadata is parsed twice: to distribute packages
+            between shards and to inspect them.
+        pkg_filter: Inspect only packages selected by this filter, other
+            packages are neither opened nor reported.
+
+    Returns:
+        True if all tests passed, False otherwise.
+    """
+    # NOTE: createrepo_c is imported only if repository metadata is needed
+    from .repository import iter_repo_packages, save_repo_state
+    if limits is None:
+        limits = InspectionLimits()
+    # the current repository state, it is collected only if needed because
+    # it is the only thing that grows with the repository size
+    state = {} if baseline is not None or state_path else None
+    # locations of packages that are filtered out, so that they aren't
+    # reported as removed since the baseline
+    filtered = set() if baseline is not None else None
+
+    def is_selected(pkg_info: RPMPackageInfo) -> bool:
+        return pkg_filter is None or pkg_filter.matches(pkg_info)
+
+    def is_changed(pkg_info: RPMPackageInfo) -> bool:
+        return baseline is None or \
+            baseline.get(pkg_info.location_href) != pkg_info.key
+
+    def iter_inspected(packages: Iterator[RPMPackageInfo]):
+        for pkg_info in packages:
+            if not is_selected(pkg_info):
+                if filtered is not None:
+                    filtered.add(pkg_info.location_href)
+                continue
+            elif state is not None:
+                # NOTE: filtered out packages aren't saved, so that they are
+                #       inspected by an incremental run with other filters
+                state[pkg_info.location_href] = pkg_info.key
+            if is_changed(pkg_info) and \
+                    (shard_keys is None or pkg_info.key in shard_keys):
+                yield pkg_info
+
+    def iter_removed():
+        # NOTE: it is iterated by run_rpm_inspections after all packages are
+        #       inspected, so the current repository state is complete
+        for href in baseline:
+            if href not in state and href not in filtered and \
+                    (shard is None or shard.owns(href)):
+                yield href
+
+    shard_keys = None
+    if shard is not None and state_path:
+        # a shard doesn't know whether other shards passed
+        raise Exception('the repository state cannot be saved by a shard')
+    # the largest packages to inspect, they are scheduled first so that
+    # a huge package at the end of primary.xml isn't inspected alone when
+    # the rest is done. Finding them takes an extra metadata pass, which is
+    # skipped for remote repositories unless it is needed for sharding
+    # anyway, because the metadata would be downloaded twice
+    largest = []
+    if shard is not None or (jobs > 1 and not is_url(repo_path)):
+        with closing(iter_repo_packages(repo_path)) as packages:
+            candidates = (p for p in packages
+                          if is_selected(p) and is_changed(p))
+            if jobs > 1:
+                count = jobs * LARGEST_FIRST_PER_JOB
+                if shard is not None:
+                    # roughly the same number of them goes to every shard
+                    count *= shard.count
+                candidates = _iter_keeping_largest(candidates, largest,
+                                                   count)
+            if shard is not None:
+                # packages are distributed between shards by their size, so
+                # all of them have to be known before the inspection starts
+                shard_keys = shard.select(candidates)
+            else:
+                collections.deque(candidates, maxlen=0)
+    largest = [pkg_info for _, _, pkg_info in sorted(largest, reverse=True)
+               if shard_keys is None or pkg_info.key in shard_keys]
+    # packages are inspected while the repository metadata is being parsed
+    with closing(iter_repo_packages(repo_path)) as packages:
+        # NOTE: the first package is read before the report header is
+        #       printed, so that missing or broken metadata errors are
+        #       raised before any output
+        first = list(itertools.islice(packages, 1))
+        success = run_rpm_inspections(
+            cfg, iter_inspected(itertools.chain(first, packages)), jobs,
+            cache, reporter, metrics,
+            iter_removed() if baseline is not None else (), limits,
+            largest
+        )
+    # NOTE: the state is saved only on success, otherwise failed (or not
+    #       inspected) packages would be considered unchanged by the next
+    #       incremental run
+    if success and state_path and limits.reason is None:
+        save_repo_state(state_path, state)
+    return success
+
+
+def run_compose_inspections(cfg: Config, paths: Iterable[str], jobs: int = 1,
+                            cache: Optional['ResultCache'] = None,
+                            reporter: Optional[Reporter] = None,
+                            metrics: Optional[MetricsCollector] = None,
+                            limits: Optional[InspectionLimits] = None,
+                            pkg_filter: Optional['PackageFilter'] = None):
+    """
+    Inspects multiple repositories (e.g. a compose) at once.
+
+    Packages are deduplicated by a checksum, so that a package that is
+    included into several repositories is inspected only once, and its
+    results are reported under every repository that contains it.
+
+    Args:
+        cfg: Configuration object.
+        paths: Repository and/or compose root directory paths.
+        jobs: Number of worker processes to use.
+        cache: Inspection results cache.
+        reporter: Reporter to use.
+        metrics: Metrics collector.
+        limits: Limits that stop the run early, the remaining packages are
+            reported as skipped.
+        pkg_filter: Inspect only packages selected by this filter, other
+            packages are neither opened nor reported.
+
+    Returns:
+        True if all tests passed, False otherwise.
+    """
+    from .repository import find_repositories, iter_repo_packages
+    repos = []
+    for path in paths:
+        for repo_path in find_repositories(path):
+            name = os.path.relpath(repo_path, os.path.dirname(path))
+            packages = iter_repo_packages(repo_path)
+            if pkg_filter is not None:
+                packages = filter(pkg_filter.matches, packages)
+            repos.append((name, list(packages)))
+    # the number of references to a package, results are dropped from memory
+    # once they are reported for the last repository that contains it
+    refs = collections.Counter(p.key for _, pkgs in repos for p in pkgs)
+    unique = collections.OrderedDict()
+    for _, packages in repos:
+        for pkg_info in packages:
+            unique.setdefault(pkg_info.key, pkg_info)
+    if reporter is None:
+        reporter = ReporterTap()
+    if limits is None:
+        limits = InspectionLimits()
+    # all packages are known, so the largest ones are scheduled first
+    first = heapq.nlargest(jobs * LARGEST_FIRST_PER_JOB, unique.values(),
+                           key=lambda p: p.size) if jobs > 1 else ()
+    inspections = iter_inspections(cfg, unique.values(), jobs, cache,
+                                   limits, first)
+    results = {}
+    memo_stats = IMAMemoStats()
+    reporter.print_header()
+    report_disabled_inspections(cfg, reporter)
+    for name, packages in repos:
+        repo_reporter = reporter.init_subtest(name)
+        for pkg_info in packages:
+            # NOTE: unique packages are ordered by their first appearance,
+            #       so the required results are always already inspected
+            #       or the next ones to be inspected
+            while pkg_info.key not in results and \
+                    not limits.failures_exceeded:
+                done_info, pkg_results, pkg_metrics = next(inspections)
+                results[done_info.key] = pkg_results
+                if pkg_results is None:
+                    # the time budget is exceeded
+                    limits.stop()
+                    continue
+                memo_stats.add(pkg_metrics)
+                if metrics is not None:
+                    metrics.add(pkg_metrics)
+                limits.add(pkg_results)
+                if limits.failures_exceeded:
+                    limits.stop()
+                    # cancel pending inspections
+                    inspections.close()
+            refs[pkg_info.key] -= 1
+            if results.get(pkg_info.key) is None:
+                repo_reporter.skipped(os.path.basename(pkg_info.path),
+                                      reason=limits.reason)
+                continue
+            elif refs[pkg_info.key]:
+                pkg_results = results[pkg_info.key]
+            else:
+                pkg_results = results.pop(pkg_info.key)
+            pkg_results.description = os.path.basename(pkg_info.path)
+            pkg_results.replay(repo_reporter)
+        repo_reporter.print_plan()
+        reporter.end_subtest(repo_reporter)
+    inspections.close()
+    reporter.print_plan()
+    reporter.print_summary()
+    reporter.print_footer()
+    memo_stats.report()
+    if metrics is not None:
+        metrics.finish()
+    return reporter.failed_count == 0
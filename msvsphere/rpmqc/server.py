@@ -0,0 +1,141 @@
+import json
+import os
+import os.path
+import signal
+import socket
+import socketserver
+import sys
+from typing import List, Tuple
+
+from .client import encode_results
+from .config import Config
+from .rpm_package import RPMPackageInfo
+from .inspectors.registry import select_inspectors
+from .runner import InspectionWorkers
+
+__all__ = ['InspectionServer', 'run_server']
+
+
+class InspectionRequestHandler(socketserver.StreamRequestHandler):
+
+    """
+    Handles inspection server connections.
+
+    The protocol is newline-delimited JSON: a client sends requests like
+    {"paths": ["/absolute/path.rpm", ...]}, the server responds with
+    a {"disabled": [{"title": ..., "reason": ...}, ...]} line that lists
+    inspectors disabled by the server configuration, a line per package in
+    the request order, either
+    {"path": ..., "status": "passed" | "failed", "checks": [...]} (see
+    encode_results) or {"path": ..., "error": ...} if a package inspection
+    has failed, and a final {"summary": {...}} line. A connection can be
+    used for multiple requests.
+    """
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                paths = json.loads(line)['paths']
+                if not isinstance(paths, list) or \
+                        not all(isinstance(p, str) and os.path.isabs(p)
+                                for p in paths):
+                    raise ValueError
+            except (ValueError, KeyError, TypeError):
+                self._send({'error': 'invalid request, a list of absolute '
+                                     'RPM package paths is expected'})
+                return
+            summary = {'total': len(paths), 'passed': 0, 'failed': 0}
+            packages = [RPMPackageInfo(path) for path in paths]
+            try:
+                self._send({'disabled': [
+                    {'title': title, 'reason': reason}
+                    for title, reason in self.server.disabled
+                ]})
+                for pkg_info, result in self.server.workers.inspect(packages):
+                    if isinstance(result, Exception):
+                        summary['failed'] += 1
+                        self._send({'path': pkg_info.path,
+                                    'error': f'{result}'})
+                        continue
+                    results = result[0]
+                    status = 'failed' if results.failed_count else 'passed'
+                    summary[status] += 1
+                    self._send({'path': pkg_info.path, 'status': status,
+                                'checks': encode_results(results)})
+                self._send({'summary': summary})
+            except (BrokenPipeError, ConnectionResetError):
+                # the client has stopped reading results
+                return
+
+    def _send(self, message: dict):
+        self.wfile.write(json.dumps(message).encode('utf-8') + b'\n')
+        self.wfile.flush()
+
+
+class InspectionServer(socketserver.ThreadingMixIn,
+                       socketserver.UnixStreamServer):
+
+    """
+    Unix socket server that inspects RPM packages using long-living
+    inspectors, so that clients don't pay for the configuration loading
+    and inspectors initialization.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, workers: InspectionWorkers,
+                 disabled: List[Tuple[str, str]] = ()):
+        """
+        Args:
+            socket_path: Unix socket path to listen on.
+            workers: Inspection workers shared by all connections.
+            disabled: Titles of inspectors disabled by the configuration
+                and the reasons they are disabled (see select_inspectors).
+        """
+        self.workers = workers
+        self.disabled = list(disabled)
+        super().__init__(socket_path, InspectionRequestHandler)
+
+
+def _remove_stale_socket(socket_path: str):
+    """
+    Removes a socket file left by a server that wasn't stopped properly.
+
+    Args:
+        socket_path: Unix socket path.
+
+    Raises:
+        Exception: If another server is listening on the socket.
+    """
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(socket_path)
+            return
+    raise Exception(f'another server is listening on {socket_path}')
+
+
+def run_server(cfg: Config, socket_path: str, jobs: int = 1):
+    """
+    Runs an inspection server until it is interrupted by SIGINT or SIGTERM.
+
+    Args:
+        cfg: Configuration object.
+        socket_path: Unix socket path to listen on.
+        jobs: Number of worker processes to use.
+    """
+    _remove_stale_socket(socket_path)
+    _, disabled = select_inspectors(cfg)
+    with InspectionWorkers(cfg, jobs) as workers, \
+            InspectionServer(socket_path, workers, disabled) as server:
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        sys.stderr.write(f'rpmqc: listening on {socket_path}\n')
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
@@ -0,0 +1,96 @@
+import heapq
+from typing import Iterable, Set, TYPE_CHECKING
+import zlib
+
+if TYPE_CHECKING:
+    from .rpm_package import RPMPackageInfo
+
+__all__ = ['Shard']
+
+
+class Shard:
+
+    """
+    A part of a repository inspected by a single node of a multi-node run.
+
+    Packages are distributed between shards by their size, so that every
+    shard gets roughly the same amount of data to inspect: the largest
+    packages are assigned first, every package goes to the least loaded
+    shard. Packages of the same size are ordered by their checksum, so the
+    distribution doesn't depend on the primary.xml order and every node
+    computes the same one as long as all nodes use the same repository
+    metadata (and the same baseline, if any).
+    """
+
+    def __init__(self, index: int, count: int):
+        """
+        Args:
+            index: Shard number starting from 1.
+            count: Total number of shards.
+
+        Raises:
+            ValueError: If the shard number is out of range.
+        """
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f'invalid shard {index}/{count}')
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, value: str) -> 'Shard':
+        """
+        Parses a shard specification.
+
+        Args:
+            value: Shard specification in the "I/N" format, e.g. "2/4".
+
+        Returns:
+            Shard.
+
+        Raises:
+            ValueError: If the specification is invalid.
+        """
+        index, sep, count = value.partition('/')
+        if not sep:
+            raise ValueError(f'invalid shard {value}')
+        return cls(int(index), int(count))
+
+    def select(self, packages: Iterable['RPMPackageInfo']) -> Set[str]:
+        """
+        Selects RPM packages that belong to the shard.
+
+        Args:
+            packages: All RPM packages to inspect.
+
+        Returns:
+            Keys (see RPMPackageInfo.key) of the shard packages.
+        """
+        sizes = {pkg_info.key: pkg_info.size for pkg_info in packages}
+        # shard loads in bytes and their zero-based indexes, the least
+        # loaded shard with the lowest index is always on top
+        loads = [(0, i) for i in range(self.count)]
+        keys = set()
+        for key, size in sorted(sizes.items(),
+                                key=lambda item: (-item[1], item[0])):
+            load, i = heapq.heappop(loads)
+            if i == self.index - 1:
+                keys.add(key)
+            heapq.heappush(loads, (load + size, i))
+        return keys
+
+    def owns(self, location: str) -> bool:
+        """
+        Checks if an item that has no size (e.g. a package that was removed
+        since a baseline) belongs to the shard.
+
+        Args:
+            location: Item location, e.g. a package location_href.
+
+        Returns:
+            True if the item belongs to the shard, False otherwise.
+        """
+        return zlib.crc32(location.encode('utf-8')) % self.count == \
+            self.index - 1
+
+    def __str__(self):
+        return f'{self.index}/{self.count}'
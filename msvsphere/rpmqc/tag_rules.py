@@ -0,0 +1,159 @@
+import functools
+import operator
+import re
+from typing import Any, Dict, List, Optional, Union
+
+import rpm
+
+__all__ = ['compile_tag_rules', 'get_tag_id', 'TagRule']
+
+
+# maximum number of mismatched array tag values included into a failure
+# report, e.g. a file names rule could fail for thousands of files
+MAX_REPORTED_VALUES = 10
+
+
+def get_tag_id(tag_name: str) -> Optional[int]:
+    """
+    Resolves an RPM tag name to its ID.
+
+    Args:
+        tag_name: RPM tag name (e.g. "vendor"), case-insensitive.
+
+    Returns:
+        RPM tag ID or None if the tag is unknown.
+    """
+    try:
+        tag_id = rpm.tagnum(tag_name)
+    except (TypeError, ValueError):
+        return None
+    # NOTE: older rpm versions return -1 for unknown tags instead of raising
+    #       an error
+    return tag_id if tag_id is not None and tag_id >= 0 else None
+
+
+def _to_str(value: Any) -> Optional[str]:
+    """
+    Converts an RPM tag value to a string so that it can be compared with
+    configured values.
+
+    Args:
+        value: RPM tag value.
+
+    Returns:
+        String representation of the value or None if the tag isn't set.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    elif isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    return str(value)
+
+
+class TagRule:
+
+    """
+    RPM tag value rule compiled from the configuration.
+
+    The tag ID, the matching function and the test case description are
+    resolved once, so checking a package is a tag lookup and a function call.
+    Array tag values (e.g. requirename) are matched element-wise: either all
+    of them (the default) or any of them must match.
+    """
+
+    def __init__(self, tag_name: str, expected: Union[str, re.Pattern],
+                 mode: Optional[str] = None):
+        """
+        Args:
+            tag_name: RPM tag name (e.g. "vendor" or "requirename").
+            expected: Expected tag value or a regular expression it should
+                match.
+            mode: Array tag values matching mode, either "all" or "any".
+                Every value should match if not specified.
+
+        Raises:
+            ValueError: If the RPM tag is unknown.
+        """
+        self.tag_name = tag_name.lower()
+        self.tag_id = get_tag_id(self.tag_name)
+        if self.tag_id is None:
+            raise ValueError(f'unknown RPM tag "{tag_name}"')
+        self.mode = mode
+        if isinstance(expected, re.Pattern):
+            self._match = expected.match
+            self.expected = f'regex:{expected.pattern}'
+        else:
+            self._match = functools.partial(operator.eq, expected)
+            self.expected = expected
+        if mode == 'all':
+            self.description = \
+                f'every {self.tag_name} RPM tag value is {self.expected}'
+        elif mode == 'any':
+            self.description = \
+                f'some {self.tag_name} RPM tag value is {self.expected}'
+        else:
+            self.description = \
+                f'{self.tag_name} RPM tag value is {self.expected}'
+
+    def check(self, value: Any) -> Optional[Dict[str, Any]]:
+        """
+        Checks an RPM tag value.
+
+        Args:
+            value: RPM tag value from an RPM header or repository metadata.
+
+        Returns:
+            None if the value matches the rule, failure details otherwise.
+        """
+        if isinstance(value, list):
+            values = [_to_str(v) for v in value]
+            mismatched = [v for v in values if not self._matches(v)]
+            if self.mode == 'any':
+                if len(mismatched) < len(values):
+                    return None
+            elif not mismatched:
+                return None
+            details = {
+                'message': f'unexpected {self.tag_name} RPM tag values',
+                'got': mismatched[:MAX_REPORTED_VALUES],
+                'expected': self.expected
+            }
+            if len(mismatched) > MAX_REPORTED_VALUES:
+                details['mismatched_count'] = len(mismatched)
+            return details
+        value = _to_str(value)
+        if self._matches(value):
+            return None
+        return {
+            'message': f'unexpected {self.tag_name} RPM tag value',
+            'got': value,
+            'expected': self.expected
+        }
+
+    def _matches(self, value: Optional[str]) -> bool:
+        return value is not None and bool(self._match(value))
+
+
+def compile_tag_rules(tags_cfg: Dict[str, Any]) -> List[TagRule]:
+    """
+    Compiles RPM tag rules from the configuration.
+
+    Args:
+        tags_cfg: The "package.tags" configuration section: tag names and
+            either expected values (strings or regular expressions) or
+            {"all": value} / {"any": value} dictionaries for array tags.
+
+    Returns:
+        List of compiled rules in the configuration order.
+
+    Raises:
+        ValueError: If an RPM tag is unknown.
+    """
+    rules = []
+    for tag_name, rule in tags_cfg.items():
+        if isinstance(rule, dict):
+            (mode, expected), = rule.items()
+        else:
+            mode, expected = None, rule
+        rules.append(TagRule(tag_name, expected, mode))
+    return rules
@@ -0,0 +1,538 @@
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import os
+import os.path
+import select
+import signal
+import struct
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .cache import ResultCache
+from .config import Config
+from .metrics import IMAMemoStats, MetricsCollector
+from .reporter import Reporter, ReporterTap
+from .repository import load_repo_packages
+from .rpm_package import RPMPackageInfo
+from .runner import (InspectionLimits, InspectionWorkers,
+                     report_disabled_inspections)
+
+__all__ = ['Inotify', 'RepositoryWatcher', 'run_watch_inspections']
+
+
+class Inotify:
+
+    """
+    Minimal Linux inotify API wrapper.
+    """
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    # struct inotify_event without the trailing name
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise Exception('inotify is not supported on this platform')
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p,
+                                    ctypes.c_uint32)
+        self._fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f'inotify_init1: {os.strerror(err)}')
+        # watch descriptors and watched directory paths
+        self._watches: Dict[int, str] = {}
+
+    def add_watch(self, path: str, mask: int) -> int:
+        """
+        Starts watching a directory for events.
+
+        Args:
+            path: Directory path.
+            mask: Events mask.
+
+        Returns:
+            Watch descriptor.
+        """
+        wd = self._add_watch(self._fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f'inotify_add_watch: {os.strerror(err)}',
+                          path)
+        self._watches[wd] = path
+        return wd
+
+    def read_events(self) -> List[Tuple[Optional[str], int]]:
+        """
+        Reads pending events without blocking.
+
+        Returns:
+            List of event paths (the watched directory path joined with
+            the event file name, None for the queue overflow event) and
+            masks.
+        """
+        events = []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return events
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, name_len = self.EVENT_HEADER.unpack_from(data, pos)
+            pos += self.EVENT_HEADER.size
+            name = os.fsdecode(data[pos:pos + name_len].rstrip(b'\0'))
+            pos += name_len
+            if mask & self.IN_IGNORED:
+                # the watched directory is removed
+                self._watches.pop(wd, None)
+                continue
+            dir_path = self._watches.get(wd)
+            if mask & self.IN_Q_OVERFLOW:
+                events.append((None, mask))
+            elif dir_path is not None:
+                events.append((os.path.join(dir_path, name) if name
+                               else dir_path, mask))
+        return events
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+            self._watches.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class RepositoryWatcher:
+
+    """
+    Watches a repository directory tree for new or replaced RPM packages and
+    repository metadata regenerations.
+
+    A package is reported only after it hasn't been changed for the settle
+    time, so that partially written files are never inspected.
+    """
+
+    WATCH_MASK = (Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO |
+                  Inotify.IN_MOVED_FROM | Inotify.IN_CREATE |
+                  Inotify.IN_DELETE | Inotify.IN_MODIFY)
+
+    def __init__(self, repo_path: str, settle_time: float = 2.0):
+        """
+        Args:
+            repo_path: Repository directory path.
+            settle_time: Number of seconds a file must stay unchanged to be
+                considered completely written.
+        """
+        self.repo_path = repo_path
+        self.settle_time = settle_time
+        self.repodata_path = os.path.join(repo_path, 'repodata')
+        self.repomd_path = os.path.join(self.repodata_path, 'repomd.xml')
+        self._inotify = Inotify()
+        # changed files and their settle deadlines and stat signatures
+        self._pending: Dict[str, Tuple[float, Optional[tuple]]] = {}
+        # RPM packages removed since the last wait call
+        self._removed: Set[str] = set()
+        self._watch_tree(self.repo_path)
+
+    def scan(self, path: Optional[str] = None) -> List[str]:
+        """
+        Finds RPM packages in the repository directory tree.
+
+        Args:
+            path: Repository subdirectory path to scan, the whole repository
+                is scanned if not specified.
+
+        Returns:
+            Sorted list of RPM package paths.
+        """
+        paths = []
+        for root, dirs, files in os.walk(path or self.repo_path):
+            dirs[:] = sorted(d for d in dirs if self._is_watched_dir(root, d))
+            paths.extend(os.path.join(root, f) for f in sorted(files)
+                         if self._is_package(f))
+        return paths
+
+    def wait(self, timeout: Optional[float] = None,
+             wakeup_fd: Optional[int] = None
+             ) -> Tuple[List[str], List[str], bool]:
+        """
+        Waits for settled repository changes.
+
+        Args:
+            timeout: Maximum number of seconds to wait, None means forever.
+            wakeup_fd: File descriptor that interrupts the waiting when it
+                becomes readable (e.g. a signal wakeup pipe).
+
+        Returns:
+            Sorted lists of new or replaced RPM package paths and removed
+            RPM package paths, and True if the repository metadata was
+            regenerated. The lists are empty if the timeout expired.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None \
+            else None
+        fds = [self._inotify.fileno()]
+        if wakeup_fd is not None:
+            fds.append(wakeup_fd)
+        while True:
+            now = time.monotonic()
+            ready = self._pop_settled(now)
+            if ready or self._removed:
+                removed = sorted(self._removed)
+                self._removed.clear()
+                repodata_changed = self.repomd_path in ready
+                if repodata_changed:
+                    ready.remove(self.repomd_path)
+                return ready, removed, repodata_changed
+            wakeups = [d for d, _ in self._pending.values()]
+            if deadline is not None:
+                wakeups.append(deadline)
+            delay = max(min(wakeups) - now, 0) if wakeups else None
+            if deadline is not None and now >= deadline:
+                return [], [], False
+            readable = select.select(fds, [], [], delay)[0]
+            if wakeup_fd is not None and wakeup_fd in readable:
+                return [], [], False
+            for path, mask in self._inotify.read_events():
+                self._handle_event(path, mask)
+
+    def close(self):
+        self._inotify.close()
+
+    def _pop_settled(self, now: float) -> List[str]:
+        ready = []
+        for path, (deadline, signature) in list(self._pending.items()):
+            if deadline > now:
+                continue
+            current = self._get_signature(path)
+            if current is None:
+                # the file is gone
+                del self._pending[path]
+            elif current == signature:
+                del self._pending[path]
+                ready.append(path)
+            else:
+                # the file is still being written
+                self._pending[path] = (now + self.settle_time, current)
+        return sorted(ready)
+
+    def _handle_event(self, path: Optional[str], mask: int):
+        if path is None:
+            # some events are lost, rescan the whole tree
+            self._watch_tree(self.repo_path)
+            for pkg_path in self.scan():
+                self._schedule(pkg_path)
+            self._schedule(self.repomd_path)
+            return
+        parent, name = os.path.split(path)
+        added = mask & (Inotify.IN_CREATE | Inotify.IN_MOVED_TO)
+        if mask & Inotify.IN_ISDIR:
+            if not added:
+                return
+            if path == self.repodata_path:
+                # createrepo_c replaces the whole repodata directory
+                self._add_watch(path)
+                self._schedule(self.repomd_path)
+            elif self._is_watched_dir(parent, name):
+                # files of a moved directory don't generate events
+                self._watch_tree(path)
+                for pkg_path in self.scan(path):
+                    self._schedule(pkg_path)
+        elif path == self.repomd_path:
+            if mask & (Inotify.IN_CLOSE_WRITE | Inotify.IN_MOVED_TO):
+                self._schedule(path)
+        elif self._is_package(name) and parent != self.repodata_path:
+            if mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                self._pending.pop(path, None)
+                self._removed.add(path)
+            else:
+                self._removed.discard(path)
+                self._schedule(path)
+
+    def _schedule(self, path: str):
+        self._pending[path] = (time.monotonic() + self.settle_time,
+                               self._get_signature(path))
+
+    def _watch_tree(self, path: str):
+        for root, dirs, _ in os.walk(path):
+            self._add_watch(root)
+            dirs[:] = [d for d in dirs if self._is_watched_dir(root, d)]
+        if os.path.isdir(self.repodata_path):
+            self._add_watch(self.repodata_path)
+
+    def _add_watch(self, path: str):
+        try:
+            self._inotify.add_watch(path, self.WATCH_MASK)
+        except OSError as e:
+            # the directory could be removed in the meantime
+            if e.errno != errno.ENOENT:
+                raise
+
+    def _is_watched_dir(self, parent: str, name: str) -> bool:
+        # repository metadata is watched separately, hidden directories
+        # are usually temporary (e.g. createrepo_c .repodata) as well as
+        # old metadata directories (repodata.old.*)
+        if name.startswith('.'):
+            return False
+        return parent != self.repo_path or not name.startswith('repodata')
+
+    @staticmethod
+    def _is_package(name: str) -> bool:
+        return name.endswith('.rpm') and not name.startswith('.')
+
+    @staticmethod
+    def _get_signature(path: str) -> Optional[tuple]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_size, st.st_mtime_ns, st.st_ino
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _describe_package(repo_path: str, path: str) -> RPMPackageInfo:
+    """
+    Creates an RPM package description for a file that isn't listed in
+    repository metadata yet.
+
+    The file checksum is calculated, so that unchanged packages are never
+    inspected twice and cached results can be used.
+
+    Args:
+        repo_path: Repository directory path.
+        path: RPM package file path.
+
+    Returns:
+        RPM package description.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as fd:
+        while True:
+            chunk = fd.read(1024 * 1024)
+            if not chunk:
+                break
+            hasher.update(chunk)
+            size += len(chunk)
+    return RPMPackageInfo(path, size, hasher.hexdigest(), 'sha256',
+                          location_href=os.path.relpath(path, repo_path))
+
+
+def run_watch_inspections(cfg: Config, repo_path: str, jobs: int = 1,
+                          cache: Optional[ResultCache] = None,
+                          reporter: Optional[Reporter] = None,
+                          metrics: Optional[MetricsCollector] = None,
+                          limits: Optional[InspectionLimits] = None,
+                          settle_time: float = 2.0,
+                          new_only: bool = False) -> bool:
+    """
+    Watches a repository directory and inspects packages as they land in it.
+
+    Inspectors are initialized once, results are streamed to the reporter
+    after every inspected batch. The watching stops on SIGINT or SIGTERM,
+    or when the run limits are exceeded.
+
+    Args:
+        cfg: Configuration object.
+        repo_path: Repository directory path.
+        jobs: Number of worker processes to use.
+        cache: Inspection results cache.
+        reporter: Reporter to use.
+        metrics: Metrics collector.
+        limits: Limits that stop the watching, the remaining packages of
+            an inspected batch are reported as skipped.
+        settle_time: Number of seconds a file must stay unchanged to be
+            inspected.
+        new_only: Do not inspect packages that exist at the start.
+
+    Returns:
+        True if all tests passed, False otherwise.
+    """
+    if reporter is None:
+        reporter = ReporterTap()
+    if limits is None:
+        limits = InspectionLimits()
+    # inspected packages locations and their keys
+    state: Dict[str, str] = {}
+    memo_stats = IMAMemoStats()
+    stopped = False
+
+    def stop(*_):
+        nonlocal stopped
+        stopped = True
+
+    wakeup_r, wakeup_w = os.pipe()
+    os.set_blocking(wakeup_w, False)
+    old_wakeup_fd = signal.set_wakeup_fd(wakeup_w)
+    old_handlers = {signum: signal.signal(signum, stop)
+                    for signum in (signal.SIGINT, signal.SIGTERM)}
+    try:
+        with RepositoryWatcher(repo_path, settle_time) as watcher, \
+                InspectionWorkers(cfg, jobs) as workers:
+            reporter.print_header()
+            report_disabled_inspections(cfg, reporter)
+            reporter.flush()
+            ready = watcher.scan()
+            repodata_changed = os.path.exists(watcher.repomd_path)
+            removed = []
+            while not stopped:
+                batch = []
+                if repodata_changed:
+                    batch.extend(_get_repodata_changes(repo_path, state))
+                listed = {p.path for p in batch}
+                for path in ready:
+                    if path in listed:
+                        continue
+                    try:
+                        pkg_info = _describe_package(repo_path, path)
+                    except FileNotFoundError:
+                        continue
+                    if state.get(pkg_info.location_href) != pkg_info.key:
+                        batch.append(pkg_info)
+                for path in removed:
+                    state.pop(os.path.relpath(path, repo_path), None)
+                if new_only:
+                    # the initial scan only records the current state
+                    for pkg_info in batch:
+                        state[pkg_info.location_href] = pkg_info.key
+                    new_only = False
+                elif batch:
+                    _inspect_batch(workers, batch, state, cache, reporter,
+                                   metrics, memo_stats, limits,
+                                   lambda: stopped)
+                    reporter.flush()
+                if limits.reason is not None:
+                    break
+                timeout = None
+                if limits.deadline is not None:
+                    timeout = max(limits.deadline - time.monotonic(), 0)
+                ready, removed, repodata_changed = watcher.wait(timeout,
+                                                                wakeup_r)
+                if limits.time_exceeded:
+                    limits.stop()
+                    break
+    finally:
+        signal.set_wakeup_fd(old_wakeup_fd)
+        for signum, handler in old_handlers.items():
+            signal.signal(signum, handler)
+        os.close(wakeup_r)
+        os.close(wakeup_w)
+    reporter.print_plan()
+    reporter.print_summary()
+    reporter.print_footer()
+    memo_stats.report()
+    if metrics is not None:
+        metrics.finish()
+    return reporter.failed_count == 0
+
+
+def _get_repodata_changes(repo_path: str,
+                          state: Dict[str, str]) -> List[RPMPackageInfo]:
+    """
+    Finds packages that are listed in the regenerated repository metadata
+    and weren't inspected yet.
+
+    Args:
+        repo_path: Repository directory path.
+        state: Inspected packages locations and their keys.
+
+    Returns:
+        RPM packages to inspect.
+    """
+    try:
+        packages = load_repo_packages(repo_path)
+    except Exception:
+        # the metadata is being regenerated again
+        return []
+    # NOTE: metadata could be outdated, only existing files are inspected
+    return [p for p in packages
+            if state.get(p.location_href) != p.key and
+            os.path.exists(p.path)]
+
+
+def _inspect_batch(workers: InspectionWorkers, batch: List[RPMPackageInfo],
+                   state: Dict[str, str], cache: Optional[ResultCache],
+                   reporter: Reporter, metrics: Optional[MetricsCollector],
+                   memo_stats: IMAMemoStats, limits: InspectionLimits,
+                   is_stopped):
+    """
+    Inspects a batch of changed packages and reports their results.
+
+    Args:
+        workers: Inspection workers.
+        batch: RPM packages to inspect.
+        state: Inspected packages locations and their keys, it is updated
+            with the batch packages.
+        cache: Inspection results cache.
+        reporter: Reporter to use.
+        metrics: Metrics collector.
+        memo_stats: Verified IMA signatures memo statistics to update.
+        limits: Run limits.
+        is_stopped: Callable that returns True if the watching is stopped.
+    """
+    results = {}
+    if cache is not None:
+        for pkg_info in batch:
+            cached = cache.get(pkg_info)
+            if cached is not None:
+                results[pkg_info.path] = cached
+    inspected = workers.inspect([p for p in batch
+                                 if p.path not in results])
+    for pkg_info in batch:
+        name = os.path.basename(pkg_info.path)
+        if limits.reason is not None:
+            reporter.skipped(name, reason=limits.reason)
+            continue
+        pkg_results = results.get(pkg_info.path)
+        pkg_metrics = None
+        if pkg_results is None:
+            if is_stopped():
+                # inspections are cancelled on exit
+                reporter.skipped(name, reason='interrupted')
+                continue
+            _, result = next(inspected)
+            if isinstance(result, Exception):
+                # a broken package must not stop the watching
+                reporter.failed(name, {'message': f'{result}'})
+                state[pkg_info.location_href] = pkg_info.key
+                continue
+            pkg_results, pkg_metrics = result
+            if cache is not None:
+                cache.put(pkg_info, pkg_results)
+        start_time = time.perf_counter()
+        pkg_results.replay(reporter)
+        memo_stats.add(pkg_metrics)
+        if metrics is not None:
+            metrics.add(pkg_metrics, time.perf_counter() - start_time)
+        state[pkg_info.location_href] = pkg_info.key
+        limits.add(pkg_results)
+        if limits.failures_exceeded or limits.time_exceeded:
+            limits.stop()
@@ -30,6 +30,14 @@ setup(
     entry_points={
         'console_scripts': [
             'rpmqc = msvsphere.rpmqc.cli:main'
+        ],
+        'rpmqc.inspectors': [
+            'pgp_signature = msvsphere.rpmqc.inspectors.'
+            'pkg_signature_inspector:PkgSignatureInspector',
+            'ima_signature = msvsphere.rpmqc.inspectors.'
+            'pkg_ima_inspector:PkgIMASignatureInspector',
+            'tags = msvsphere.rpmqc.inspectors.'
+            'pkg_tags_inspector:PkgTagsInspector'
         ]
     },
     install_requires=[
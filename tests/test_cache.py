@@ -0,0 +1,186 @@
+import re
+import types
+
+import pytest
+
+from msvsphere.rpmqc import cache
+from msvsphere.rpmqc.cache import get_config_fingerprint, ResultCache
+from msvsphere.rpmqc.reporter import ReporterBuffer
+
+
+CONFIG_DATA = {
+    'package': {
+        'signatures': {
+            'pgp_key_id': ['55bf2c7f88e216a0'],
+            'ima_mode': 'payload'
+        }
+    },
+    'tags': {
+        'packager': 'MSVSphere'
+    }
+}
+
+
+def make_config(data: dict) -> types.SimpleNamespace:
+    # only the validated configuration data is used by the cache
+    return types.SimpleNamespace(data=data)
+
+
+def with_signatures(**options) -> dict:
+    data = dict(CONFIG_DATA)
+    data['package'] = {
+        'signatures': dict(CONFIG_DATA['package']['signatures'], **options)
+    }
+    return data
+
+
+def make_package(name: str, checksum: str = None) -> types.SimpleNamespace:
+    if checksum is None:
+        checksum = name.encode('utf-8').hex()
+    return types.SimpleNamespace(path=f'/repo/Packages/{name}.rpm',
+                                 checksum_type='sha256', checksum=checksum)
+
+
+def make_results(*checks: str) -> ReporterBuffer:
+    results = ReporterBuffer()
+    for check in checks:
+        results.passed(check)
+    results.failed('packager', {'message': 'unexpected packager'})
+    return results
+
+
+# a strictly increasing clock, so that the entries access order doesn't
+# depend on the system clock resolution
+class Clock:
+
+    def __init__(self):
+        self._now = 0.0
+
+    def time(self) -> float:
+        self._now += 1.0
+        return self._now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'time', clock)
+    return clock
+
+
+def fingerprint(data: dict) -> str:
+    return get_config_fingerprint(make_config(data))
+
+
+def test_fingerprint_stable():
+    assert fingerprint(CONFIG_DATA) == fingerprint(dict(CONFIG_DATA))
+
+
+@pytest.mark.parametrize('options', [
+    {'ima_threads': 8},
+    {'ima_memo_size': 1024},
+    {'ima_memo_path': '/tmp/ima-memo.sqlite'},
+    {'ima_payload_digest': False}
+], ids=['ima-threads', 'ima-memo-size', 'ima-memo-path',
+        'payload-mode-digest'])
+def test_fingerprint_performance_options(options):
+    assert fingerprint(with_signatures(**options)) == \
+        fingerprint(CONFIG_DATA)
+
+
+def test_fingerprint_header_mode_digest():
+    # the payload digest is verified in the header mode only if enabled,
+    # so it affects the results
+    assert fingerprint(with_signatures(ima_mode='header',
+                                       ima_payload_digest=True)) != \
+        fingerprint(with_signatures(ima_mode='header',
+                                    ima_payload_digest=False))
+
+
+@pytest.mark.parametrize('data', [
+    with_signatures(pgp_key_id=['a0d1e3f645df2fc6']),
+    with_signatures(ima_mode='header'),
+    dict(CONFIG_DATA, tags={'packager': 'AlmaLinux'})
+], ids=['pgp-key-id', 'ima-mode', 'tags'])
+def test_fingerprint_changed(data):
+    assert fingerprint(data) != fingerprint(CONFIG_DATA)
+
+
+def test_fingerprint_filters():
+    # filters only select packages to inspect
+    data = dict(CONFIG_DATA, filters={'include': ['*.x86_64.rpm']})
+    assert fingerprint(data) == fingerprint(CONFIG_DATA)
+
+
+def test_fingerprint_regex():
+    data_a = dict(CONFIG_DATA, tags={'packager': re.compile('^A')})
+    data_b = dict(CONFIG_DATA, tags={'packager': re.compile('^B')})
+    assert fingerprint(data_a) == fingerprint(dict(data_a))
+    assert fingerprint(data_a) != fingerprint(data_b)
+
+
+def test_round_trip(tmp_path, clock):
+    pkg_info = make_package('bash-5.1.8-6.el9.x86_64')
+    results = make_results('signature', 'ima')
+    with ResultCache(make_config(CONFIG_DATA),
+                     path=str(tmp_path / 'results.sqlite')) as result_cache:
+        assert result_cache.get(pkg_info) is None
+        result_cache.put(pkg_info, results)
+    with ResultCache(make_config(CONFIG_DATA),
+                     path=str(tmp_path / 'results.sqlite')) as result_cache:
+        cached = result_cache.get(pkg_info)
+    assert cached.description == 'bash-5.1.8-6.el9.x86_64.rpm'
+    assert cached.results == results.results
+    assert (cached.passed_count, cached.failed_count) == (2, 1)
+
+
+def test_config_changed(tmp_path, clock):
+    pkg_info = make_package('bash-5.1.8-6.el9.x86_64')
+    path = str(tmp_path / 'results.sqlite')
+    with ResultCache(make_config(CONFIG_DATA), path=path) as result_cache:
+        result_cache.put(pkg_info, make_results('signature'))
+    data = with_signatures(ima_mode='header')
+    with ResultCache(make_config(data), path=path) as result_cache:
+        assert result_cache.get(pkg_info) is None
+
+
+def test_refresh(tmp_path, clock):
+    pkg_info = make_package('bash-5.1.8-6.el9.x86_64')
+    path = str(tmp_path / 'results.sqlite')
+    with ResultCache(make_config(CONFIG_DATA), path=path) as result_cache:
+        result_cache.put(pkg_info, make_results('signature'))
+    with ResultCache(make_config(CONFIG_DATA), path=path,
+                     refresh=True) as result_cache:
+        assert result_cache.get(pkg_info) is None
+        result_cache.put(pkg_info, make_results('signature', 'ima'))
+    with ResultCache(make_config(CONFIG_DATA), path=path) as result_cache:
+        assert result_cache.get(pkg_info).passed_count == 2
+
+
+def test_no_checksum(tmp_path, clock):
+    pkg_info = make_package('bash-5.1.8-6.el9.x86_64', checksum='')
+    with ResultCache(make_config(CONFIG_DATA),
+                     path=str(tmp_path / 'results.sqlite')) as result_cache:
+        result_cache.put(pkg_info, make_results('signature'))
+        assert result_cache.get(pkg_info) is None
+
+
+def test_eviction(tmp_path, clock):
+    packages = [make_package(f'pkg{i}') for i in range(5)]
+    results = make_results('signature')
+    path = str(tmp_path / 'results.sqlite')
+    with ResultCache(make_config(CONFIG_DATA), path=path) as result_cache:
+        result_cache.put(packages[0], results)
+        entry_size = result_cache._size
+    # the cache fits 4 entries, it is shrunk to 90% of the limit (3 entries)
+    # when the 5th one is added
+    with ResultCache(make_config(CONFIG_DATA), path=path,
+                     max_size=entry_size * 4) as result_cache:
+        for pkg_info in packages[1:4]:
+            result_cache.put(pkg_info, results)
+        # the first package becomes the most recently used one
+        assert result_cache.get(packages[0]) is not None
+        result_cache.put(packages[4], results)
+        cached = [pkg_info for pkg_info in packages
+                  if result_cache.get(pkg_info) is not None]
+    assert cached == [packages[0], packages[3], packages[4]]
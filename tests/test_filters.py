@@ -0,0 +1,145 @@
+import datetime
+import types
+from typing import Optional
+
+import pytest
+
+from msvsphere.rpmqc.filters import PackageFilter, parse_size, parse_time
+
+
+# 2023-06-01 00:00:00 UTC
+BUILD_TIME = 1685577600
+
+PYTHON_SOURCERPM = 'python3.9-3.9.16-1.el9.src.rpm'
+
+
+def make_package(name: str, arch: str = 'x86_64',
+                 sourcerpm: Optional[str] = None, buildtime: int = BUILD_TIME,
+                 size: int = 1024) -> types.SimpleNamespace:
+    # filters use the repository metadata only
+    if sourcerpm is None and arch != 'src':
+        sourcerpm = f'{name}-1.0-1.el9.src.rpm'
+    tags = {'name': name, 'sourcerpm': sourcerpm, 'buildtime': buildtime}
+    return types.SimpleNamespace(tags=tags, arch=arch, size=size)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (BUILD_TIME, BUILD_TIME),
+    (str(BUILD_TIME), BUILD_TIME),
+    ('2023-06-01', BUILD_TIME),
+    (' 2023-06-01 ', BUILD_TIME),
+    ('2023-06-01 01:02:03', BUILD_TIME + 3723),
+    ('2023-06-01T01:02:03', BUILD_TIME + 3723),
+    (datetime.date(2023, 6, 1), BUILD_TIME),
+    (datetime.datetime(2023, 6, 1, 1, 2, 3), BUILD_TIME + 3723),
+    (datetime.datetime(2023, 6, 1, 3, tzinfo=datetime.timezone(
+        datetime.timedelta(hours=3))), BUILD_TIME)
+], ids=['timestamp', 'timestamp-str', 'date', 'spaces', 'date-time',
+        'iso-date-time', 'date-object', 'datetime-object', 'time-zone'])
+def test_parse_time(value, expected):
+    assert parse_time(value) == expected
+
+
+@pytest.mark.parametrize('value', [True, '2023-13-01', 'yesterday', 1.5],
+                         ids=['bool', 'invalid-date', 'text', 'float'])
+def test_parse_time_invalid(value):
+    with pytest.raises(ValueError):
+        parse_time(value)
+
+
+@pytest.mark.parametrize('value, expected', [
+    (0, 0),
+    (1000, 1000),
+    ('1000', 1000),
+    ('512K', 512 * 1024),
+    ('512k', 512 * 1024),
+    ('1.5M', 1536 * 1024),
+    ('2GiB', 2 << 30),
+    ('1 TB', 1 << 40),
+    ('10B', 10)
+], ids=['zero', 'int', 'str', 'kilobytes', 'lowercase', 'fraction',
+        'gibibytes', 'space', 'bytes'])
+def test_parse_size(value, expected):
+    assert parse_size(value) == expected
+
+
+@pytest.mark.parametrize('value', [-1, True, '', '1P', '1.5.1M', 'K'],
+                         ids=['negative', 'bool', 'empty', 'unknown-unit',
+                              'invalid-number', 'no-number'])
+def test_parse_size_invalid(value):
+    with pytest.raises(ValueError):
+        parse_size(value)
+
+
+def test_from_config_empty():
+    assert PackageFilter.from_config({}) is None
+    assert PackageFilter.from_config({}, include=None) is None
+
+
+def test_from_config_overrides():
+    pkg_filter = PackageFilter.from_config(
+        {'min_size': 100, 'max_size': 1000}, max_size=2000, min_size=None
+    )
+    assert (pkg_filter.min_size, pkg_filter.max_size) == (100, 2000)
+
+
+@pytest.mark.parametrize('options, selected', [
+    ({'include': ['python3-*']},
+     {'python3-libs', 'python3-devel', 'python3-debuginfo'}),
+    ({'include': ['python3-*', 'bash']},
+     {'python3-libs', 'python3-devel', 'python3-debuginfo', 'bash'}),
+    ({'exclude': ['*-devel', '*-debuginfo']},
+     {'python3-libs', 'bash', 'kernel'}),
+    ({'include': ['python3-*'], 'exclude': ['*-devel']},
+     {'python3-libs', 'python3-debuginfo'}),
+    ({'arch': ['noarch']}, {'python3-devel'}),
+    ({'exclude_arch': ['x86_64', 'noarch']},
+     {'python3-debuginfo', 'kernel'}),
+    ({'sourcerpm': ['python3*']},
+     {'python3-libs', 'python3-devel', 'python3-debuginfo'}),
+    ({'exclude_sourcerpm': ['python3*']}, {'bash', 'kernel'})
+], ids=['include', 'include-many', 'exclude', 'include-exclude', 'arch',
+        'exclude-arch', 'sourcerpm', 'exclude-sourcerpm'])
+def test_matches(options, selected):
+    packages = [
+        make_package('python3-libs', sourcerpm=PYTHON_SOURCERPM),
+        make_package('python3-devel', arch='noarch',
+                     sourcerpm=PYTHON_SOURCERPM),
+        make_package('python3-debuginfo', arch='aarch64',
+                     sourcerpm=PYTHON_SOURCERPM),
+        make_package('bash'),
+        make_package('kernel', arch='src')
+    ]
+    pkg_filter = PackageFilter(**options)
+    assert {pkg_info.tags['name'] for pkg_info in packages
+            if pkg_filter.matches(pkg_info)} == selected
+
+
+def test_matches_source_package():
+    # a source package is matched by its own name
+    pkg_filter = PackageFilter(sourcerpm=['kernel'])
+    assert pkg_filter.matches(make_package('kernel', arch='src'))
+    assert not pkg_filter.matches(make_package('bash', arch='src'))
+
+
+@pytest.mark.parametrize('options, expected', [
+    ({'built_after': BUILD_TIME}, True),
+    ({'built_after': BUILD_TIME + 1}, False),
+    ({'built_before': BUILD_TIME + 1}, True),
+    ({'built_before': BUILD_TIME}, False),
+    ({'built_after': BUILD_TIME - 1, 'built_before': BUILD_TIME + 1}, True)
+], ids=['after-inclusive', 'after', 'before', 'before-exclusive', 'range'])
+def test_matches_build_time(options, expected):
+    pkg_filter = PackageFilter(**options)
+    assert pkg_filter.matches(make_package('bash')) is expected
+
+
+@pytest.mark.parametrize('options, expected', [
+    ({'min_size': 1024}, True),
+    ({'min_size': 1025}, False),
+    ({'max_size': 1024}, True),
+    ({'max_size': 1023}, False)
+], ids=['min-inclusive', 'min', 'max-inclusive', 'max'])
+def test_matches_size(options, expected):
+    pkg_filter = PackageFilter(**options)
+    assert pkg_filter.matches(make_package('bash', size=1024)) is expected
@@ -0,0 +1,130 @@
+import gzip
+import io
+
+import pytest
+
+from msvsphere.rpmqc.merge import merge_tap_reports
+
+
+# TAP reports of a repository inspected in 2 shards, both of them report
+# the same disabled inspector before the inspected packages
+SHARD_1 = '''TAP version 14
+ok 1 - IMA signature inspection # SKIP no IMA certificate configured
+# Subtest: bash-5.1.8-6.el9.x86_64.rpm
+    ok 1 - vendor RPM tag value is MSVSphere
+    1..1
+ok 2 - bash-5.1.8-6.el9.x86_64.rpm
+# Subtest: zlib-1.2.11-40.el9.x86_64.rpm
+    not ok 1 - vendor RPM tag value is MSVSphere
+      ---
+      expected: MSVSphere
+      got: AlmaLinux
+      ...
+    1..1
+not ok 3 - zlib-1.2.11-40.el9.x86_64.rpm
+1..3
+# Passed 1 of 3 tests
+# Skipped 1 of 3 tests
+# Failed 1 of 3 tests
+'''
+
+SHARD_2 = '''TAP version 14
+ok 1 - IMA signature inspection # SKIP no IMA certificate configured
+ok 2 - glibc-2.34-60.el9.x86_64.rpm # SKIP package is filtered out
+# Subtest: sed-4.8-9.el9.x86_64.rpm
+    ok 1 - vendor RPM tag value is MSVSphere
+    1..1
+ok 3 - sed-4.8-9.el9.x86_64.rpm
+1..3
+# Passed 1 of 3 tests
+# Skipped 2 of 3 tests
+'''
+
+MERGED = '''TAP version 14
+ok 1 - IMA signature inspection # SKIP no IMA certificate configured
+# Subtest: bash-5.1.8-6.el9.x86_64.rpm
+    ok 1 - vendor RPM tag value is MSVSphere
+    1..1
+ok 2 - bash-5.1.8-6.el9.x86_64.rpm
+# Subtest: zlib-1.2.11-40.el9.x86_64.rpm
+    not ok 1 - vendor RPM tag value is MSVSphere
+      ---
+      expected: MSVSphere
+      got: AlmaLinux
+      ...
+    1..1
+not ok 3 - zlib-1.2.11-40.el9.x86_64.rpm
+ok 4 - glibc-2.34-60.el9.x86_64.rpm # SKIP package is filtered out
+# Subtest: sed-4.8-9.el9.x86_64.rpm
+    ok 1 - vendor RPM tag value is MSVSphere
+    1..1
+ok 5 - sed-4.8-9.el9.x86_64.rpm
+1..5
+# Passed 2 of 5 tests
+# Skipped 2 of 5 tests
+# Failed 1 of 5 tests
+'''
+
+
+def write_report(path, content: str) -> str:
+    if str(path).endswith('.gz'):
+        with gzip.open(path, 'wt', encoding='utf-8') as fd:
+            fd.write(content)
+    else:
+        path.write_text(content, encoding='utf-8')
+    return str(path)
+
+
+def merge(*paths: str):
+    output = io.StringIO()
+    success = merge_tap_reports(paths, output)
+    return success, output.getvalue()
+
+
+def test_merge(tmp_path):
+    paths = (write_report(tmp_path / 'shard-1.tap', SHARD_1),
+             write_report(tmp_path / 'shard-2.tap.gz', SHARD_2))
+    assert merge(*paths) == (False, MERGED)
+
+
+def test_merge_passed(tmp_path):
+    path = write_report(tmp_path / 'shard-2.tap', SHARD_2)
+    success, merged = merge(path)
+    assert success
+    assert merged == SHARD_2
+
+
+def test_merge_single_shard(tmp_path):
+    # merging a single report doesn't change it
+    path = write_report(tmp_path / 'shard-1.tap', SHARD_1)
+    assert merge(path) == (False, SHARD_1)
+
+
+def test_skipped_test_not_preamble(tmp_path):
+    # skipped tests that follow the inspected packages are always merged
+    report = SHARD_1.replace(
+        '1..3\n# Passed 1 of 3 tests\n# Skipped 1 of 3 tests\n'
+        '# Failed 1 of 3 tests\n',
+        'ok 4 - IMA signature inspection # SKIP no IMA certificate '
+        'configured\n1..4\n'
+    )
+    paths = (write_report(tmp_path / 'shard-1.tap', report),
+             write_report(tmp_path / 'shard-2.tap', report))
+    success, merged = merge(*paths)
+    assert not success
+    assert merged.count('IMA signature inspection') == 3
+    assert merged.endswith('1..7\n# Passed 2 of 7 tests\n'
+                           '# Skipped 3 of 7 tests\n'
+                           '# Failed 2 of 7 tests\n')
+
+
+@pytest.mark.parametrize('content, error', [
+    (SHARD_1.replace('1..3\n', ''), 'the test plan is not found'),
+    (SHARD_1.replace('1..3\n', '1..4\n'), '4 tests planned but 3 found'),
+    (SHARD_1.replace('1..3\n', 'Bail out! disk is full\n'),
+     'the run was aborted')
+], ids=['no-plan', 'missing-tests', 'bail-out'])
+def test_merge_invalid(tmp_path, content, error):
+    path = write_report(tmp_path / 'shard-1.tap', content)
+    with pytest.raises(Exception, match=error):
+        merge(path)
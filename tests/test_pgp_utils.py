@@ -0,0 +1,162 @@
+import pytest
+
+from msvsphere.rpmqc.pgp_utils import parse_pgp_signature
+
+
+# OpenPGP signature packets of the same message made by GnuPG 2.2 using
+# a 2048-bit RSA key 55BF2C7F88E216A0 and an Ed25519 key A0D1E3F645DF2FC6,
+# all of them are verified by "gpg --verify". The v3 and the unhashed issuer
+# signatures are made with the same RSA key in the formats GnuPG doesn't
+# produce anymore, both are old format packets with a two-octet length.
+
+# version 4, SHA256, the issuer fingerprint subpacket is in the hashed area
+# and the issuer subpacket is in the unhashed one
+RSA_SHA256_V4 = bytes.fromhex(
+    '89014404000108002e16210440935d0ee3968639b546f72f55bf2c7f88e216a00502'
+    '6ad2b476101c727361406578616d706c652e636f6d000a091055bf2c7f88e216a0a9'
+    '570800ba6db6c9eb4aaf782cf1a1fd83f5e1bcf5506088e41ed260d55a680ea1f05b'
+    '89a353eaa0100d55c31a38bd16c787ed229c95d9366d89f2d464eb9dae63c53ad2ff'
+    '9ac1e833cbaaa48e76eb32877702620682d877dc747aa55d2208c6c702db4e6d467e'
+    '1f48d94221b335a83898f5f94f364c29d3ff60c7c75612fe7322ff3ab5dfb5e0f38b'
+    '476e79469afb0c0aadaadd18d048a631c5198d9ec33eadba9855df2e984bfcaf333f'
+    'b98ee92efb92cbc3149de17fd1bb697118a99a29d25b9fee3ce48f02f5b8e3d0f0e7'
+    'dec08120dbf919e4d3aaac2e95e5988222c30a2f06aaa5518f76184f63c28451bd8a'
+    '76eef0d1c2dac9276b0d666e28f0212eaef245318b'
+)
+
+# version 3, SHA256
+RSA_SHA256_V3 = bytes.fromhex(
+    '8901150305006ad2b47655bf2c7f88e216a00108504607ff6cbf9fbb52f6b098b39c'
+    'babab27ec61cec2fcaeb651ba19d55e148e1d07e042dfe099ae73e43ee6c2833c5bc'
+    'ad535da5b55b9abaa6fbfbd139f70b962d22c87b090cad274cfa5b8984f88de35e6f'
+    '84feffbdd7ef5f8b8caeddd791cbeab3f8f9e48b2ea980e605f53884bc84bb203d2a'
+    '764f4d02e8e51d200f0e486b3d1f861d342505d49187e15b2b72bb816a061a983a40'
+    '4f4d958b2a84f82fb602f8327d1ce57c281fd3dcfdea6a0687ee6684a96e036028fd'
+    '10d08395510b107133ab12cad252582e9603f58aad958b79f5da3e0e0d8529dffe17'
+    'd8aa9e21903b147038ba64789b1295a58cc44035a229eb545cda67657f9521307eac'
+    '2f7ca61a2ec1e765'
+)
+
+# version 4, SHA256, only the creation time is hashed, the issuer subpacket
+# is in the unhashed area (the format older GnuPG versions produce)
+RSA_SHA256_V4_UNHASHED_ISSUER = bytes.fromhex(
+    '89011c04000108000605026ad2b476000a091055bf2c7f88e216a0e66307fe287763'
+    'a9c35db63480a5cd09dfed35a5ea91b263d5caa2d75433b398a4a8b31e0d026d36a5'
+    '28fd21a1c4091a18768f3ba330eaabf3984a2f61f791c8f779cdcdbd289e6a839019'
+    '37ef7e5dbca33c55037cde98834d8005bd9d3bacc453dc6f61198241eaa831d0c3fc'
+    'e20b90625d25c1758a0d69272f10546394f724c8761ea32b630597130cdfd875cc9c'
+    '2161bb13500e9d865aa3c5a3c7c869a526b00c9eb160cf096549c374641aac70450c'
+    '4c8f47648797a2115f0f72ae8f0bfcd86700388bd830ee60b6c57c7071a75fd01ae4'
+    '70ece7d26e8fac8db82da2a4fab01c61104ffee4f00e594e52a5f0b60fd4f88f312d'
+    '49b75782f6a11f00f0db6e4d9be4be'
+)
+
+# version 4, SHA256, an old format packet with a one-octet length
+EDDSA_SHA256_V4 = bytes.fromhex(
+    '888504001608002d1621040ad675ea134c893b3db202e9a0d1e3f645df2fc605026a'
+    'd2b4760f1c6564406578616d706c652e636f6d000a0910a0d1e3f645df2fc63f4e00'
+    'ff7e1add92817d97f63498f7f205890231cf8a81297aba24f146139b56c9f83e9c01'
+    '00e53f56e4f11356957a8670fad5166ae6e0228d6f402afb534e7685b1193fe508'
+)
+
+RSA_KEY_ID = '55bf2c7f88e216a0'
+
+EDDSA_KEY_ID = 'a0d1e3f645df2fc6'
+
+
+def get_body(packet: bytes) -> bytes:
+    # all the signatures above are old format packets with a one-octet or
+    # a two-octet length
+    return packet[2:] if packet[0] & 0x03 == 0 else packet[3:]
+
+
+def old_format(body: bytes, length_type: int) -> bytes:
+    ctb = bytes([0x88 | length_type])
+    if length_type == 3:
+        # indeterminate length
+        return ctb + body
+    return ctb + len(body).to_bytes(1 << length_type, 'big') + body
+
+
+def new_format(body: bytes, five_octet: bool = False) -> bytes:
+    length = len(body)
+    if five_octet:
+        header = b'\xff' + length.to_bytes(4, 'big')
+    elif length < 192:
+        header = bytes([length])
+    else:
+        length -= 192
+        header = bytes([(length >> 8) + 192, length & 0xff])
+    return b'\xc2' + header + body
+
+
+def strip_unhashed_subpackets(packet: bytes) -> bytes:
+    body = get_body(packet)
+    hashed_end = 6 + int.from_bytes(body[4:6], 'big')
+    unhashed_length = int.from_bytes(body[hashed_end:hashed_end + 2], 'big')
+    return old_format(body[:hashed_end] + b'\x00\x00' +
+                      body[hashed_end + 2 + unhashed_length:], 1)
+
+
+@pytest.mark.parametrize('packet, expected', [
+    (RSA_SHA256_V4, ('RSA/SHA256', RSA_KEY_ID)),
+    (RSA_SHA256_V3, ('RSA/SHA256', RSA_KEY_ID)),
+    (RSA_SHA256_V4_UNHASHED_ISSUER, ('RSA/SHA256', RSA_KEY_ID)),
+    (EDDSA_SHA256_V4, ('EdDSA/SHA256', EDDSA_KEY_ID))
+], ids=['rsa-v4', 'rsa-v3', 'rsa-v4-unhashed-issuer', 'eddsa-v4'])
+def test_parse_signature(packet, expected):
+    assert parse_pgp_signature(packet) == expected
+
+
+@pytest.mark.parametrize('packet, length_type', [
+    (EDDSA_SHA256_V4, 0),
+    (RSA_SHA256_V4, 1),
+    (RSA_SHA256_V4, 2),
+    (RSA_SHA256_V4, 3)
+], ids=['one-octet', 'two-octet', 'four-octet', 'indeterminate'])
+def test_old_format_length(packet, length_type):
+    assert parse_pgp_signature(old_format(get_body(packet), length_type)) \
+        == parse_pgp_signature(packet)
+
+
+@pytest.mark.parametrize('packet, five_octet', [
+    (EDDSA_SHA256_V4, False),
+    (RSA_SHA256_V4, False),
+    (RSA_SHA256_V3, True)
+], ids=['one-octet', 'two-octet', 'five-octet'])
+def test_new_format_length(packet, five_octet):
+    assert parse_pgp_signature(new_format(get_body(packet), five_octet)) \
+        == parse_pgp_signature(packet)
+
+
+def test_new_format_partial_length():
+    # partial body lengths are never used for signatures
+    body = get_body(RSA_SHA256_V4)
+    assert parse_pgp_signature(b'\xc2\xe9' + body) is None
+
+
+def test_issuer_fingerprint():
+    # the key ID is taken from the hashed issuer fingerprint subpacket if
+    # there is no issuer subpacket
+    packet = strip_unhashed_subpackets(RSA_SHA256_V4)
+    assert parse_pgp_signature(packet) == ('RSA/SHA256', RSA_KEY_ID)
+
+
+def test_no_issuer():
+    packet = strip_unhashed_subpackets(RSA_SHA256_V4_UNHASHED_ISSUER)
+    assert parse_pgp_signature(packet) is None
+
+
+def test_unsupported_version():
+    body = get_body(RSA_SHA256_V4_UNHASHED_ISSUER)
+    assert parse_pgp_signature(old_format(b'\x06' + body[1:], 1)) is None
+
+
+def test_truncated_signature():
+    assert parse_pgp_signature(RSA_SHA256_V4[:8]) is None
+
+
+def test_not_signature_packet():
+    # a public key packet
+    packet = b'\x99' + RSA_SHA256_V4[1:]
+    assert parse_pgp_signature(packet) is None
@@ -0,0 +1,187 @@
+import gzip
+import io
+import json
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+from msvsphere.rpmqc.reporter import (open_report_input, open_report_output,
+                                      ReporterBuffer, ReporterJsonLines,
+                                      ReporterJUnit, ReporterTap)
+
+
+FAILURE = {'message': 'unexpected package signature',
+           'expected': '55bf2c7f88e216a0', 'got': 'a0d1e3f645df2fc6'}
+
+
+def make_results(description: str, failed: bool = False) -> ReporterBuffer:
+    results = ReporterBuffer(description)
+    if failed:
+        results.failed('PGP signature', FAILURE)
+    else:
+        results.passed('PGP signature')
+    results.skipped('IMA signatures', reason='package has no files')
+    results.passed('vendor RPM tag')
+    return results
+
+
+def report_repo(reporter_class) -> str:
+    # reports results the same way as the inspect-repo command: a disabled
+    # inspector, inspected packages and a package skipped by a filter
+    output = io.StringIO()
+    reporter = reporter_class(output=output)
+    reporter.print_header()
+    reporter.skipped('IMA signature inspection',
+                     reason='no IMA certificate configured')
+    make_results('bash.rpm').replay(reporter)
+    make_results('zlib.rpm', failed=True).replay(reporter)
+    reporter.skipped('glibc.rpm', reason='package is filtered out')
+    reporter.print_plan()
+    reporter.print_summary()
+    reporter.print_footer()
+    return output.getvalue()
+
+
+def report_compose(reporter_class) -> str:
+    # reports results the same way as the inspect-compose command, packages
+    # are reported under every repository that contains them
+    output = io.StringIO()
+    reporter = reporter_class(output=output)
+    reporter.print_header()
+    for repo_name, packages in (('BaseOS', ('bash.rpm', 'zlib.rpm')),
+                                ('AppStream', ('bash.rpm',))):
+        repo_reporter = reporter.init_subtest(repo_name)
+        for name in packages:
+            make_results(name, failed=name == 'zlib.rpm').replay(
+                repo_reporter
+            )
+        repo_reporter.skipped('glibc.rpm', reason='package is filtered out')
+        repo_reporter.print_plan()
+        reporter.end_subtest(repo_reporter)
+    reporter.print_plan()
+    reporter.print_summary()
+    reporter.print_footer()
+    return output.getvalue()
+
+
+def get_suites(report: str) -> dict:
+    root = ElementTree.fromstring(report)
+    assert root.tag == 'testsuites'
+    suites = {}
+    for suite in root:
+        cases = list(suite)
+        failures = sum(case.find('failure') is not None for case in cases)
+        skipped = sum(case.find('skipped') is not None for case in cases)
+        # suite totals must match the test cases it contains
+        assert (int(suite.get('tests')), int(suite.get('failures')),
+                int(suite.get('skipped')), suite.get('errors')) == \
+            (len(cases), failures, skipped, '0')
+        suites[suite.get('name')] = [case.get('name') for case in cases]
+    return suites
+
+
+def test_jsonl():
+    lines = [json.loads(line) for line in
+             report_repo(ReporterJsonLines).splitlines()]
+    assert lines[0] == {'name': 'IMA signature inspection',
+                        'status': 'skipped',
+                        'reason': 'no IMA certificate configured'}
+    assert lines[1] == {'name': 'bash.rpm', 'status': 'passed', 'checks': [
+        {'name': 'PGP signature', 'status': 'passed'},
+        {'name': 'IMA signatures', 'status': 'skipped',
+         'reason': 'package has no files'},
+        {'name': 'vendor RPM tag', 'status': 'passed'}
+    ]}
+    assert lines[2]['status'] == 'failed'
+    assert lines[2]['checks'][0] == {'name': 'PGP signature',
+                                     'status': 'failed', 'details': FAILURE}
+    assert lines[3] == {'name': 'glibc.rpm', 'status': 'skipped',
+                        'reason': 'package is filtered out'}
+    assert lines[4] == {'summary': {'total': 4, 'passed': 1, 'skipped': 2,
+                                    'failed': 1}}
+    assert len(lines) == 5
+
+
+def test_jsonl_compose():
+    lines = [json.loads(line) for line in
+             report_compose(ReporterJsonLines).splitlines()]
+    assert [(line['name'], line['status']) for line in lines[:2]] == \
+        [('BaseOS', 'failed'), ('AppStream', 'passed')]
+    assert [(check['name'], check['status'])
+            for check in lines[0]['checks']] == \
+        [('bash.rpm', 'passed'), ('zlib.rpm', 'failed'),
+         ('glibc.rpm', 'skipped')]
+    assert lines[0]['checks'][1]['checks'][0]['details'] == FAILURE
+    assert lines[2] == {'summary': {'total': 2, 'passed': 1, 'skipped': 0,
+                                    'failed': 1}}
+
+
+def test_junit():
+    suites = get_suites(report_repo(ReporterJUnit))
+    assert suites == {
+        'IMA signature inspection': ['IMA signature inspection'],
+        'bash.rpm': ['PGP signature', 'IMA signatures', 'vendor RPM tag'],
+        'zlib.rpm': ['PGP signature', 'IMA signatures', 'vendor RPM tag'],
+        'glibc.rpm': ['glibc.rpm']
+    }
+
+
+def test_junit_failure():
+    root = ElementTree.fromstring(report_repo(ReporterJUnit))
+    failure = root.find("testsuite[@name='zlib.rpm']/testcase/failure")
+    assert failure.get('message') == FAILURE['message']
+    assert json.loads(failure.text) == FAILURE
+
+
+def test_junit_compose():
+    # JUnit doesn't support nested suites, so packages are reported as
+    # suites prefixed with a repository name, skipped packages included
+    suites = get_suites(report_compose(ReporterJUnit))
+    checks = ['PGP signature', 'IMA signatures', 'vendor RPM tag']
+    assert suites == {
+        'BaseOS/bash.rpm': checks,
+        'BaseOS/zlib.rpm': checks,
+        'BaseOS/glibc.rpm': ['glibc.rpm'],
+        'AppStream/bash.rpm': checks,
+        'AppStream/glibc.rpm': ['glibc.rpm']
+    }
+
+
+def test_junit_escaping():
+    output = io.StringIO()
+    reporter = ReporterJUnit(output=output)
+    reporter.print_header()
+    reporter.failed('"<tag>" & value', {'message': 'expected <a> & "b"'})
+    reporter.print_footer()
+    root = ElementTree.fromstring(output.getvalue())
+    case = root.find('testsuite/testcase')
+    assert case.get('name') == '"<tag>" & value'
+    assert case.find('failure').get('message') == 'expected <a> & "b"'
+
+
+def test_buffer_json():
+    results = make_results('zlib.rpm', failed=True)
+    restored = ReporterBuffer.from_json(results.to_json(), 'zlib.rpm')
+    assert restored.results == results.results
+    assert (restored.passed_count, restored.failed_count,
+            restored.skipped_count) == (1, 1, 1)
+    # restored results are reported the same way as the original ones
+    tap_output = io.StringIO()
+    restored.replay(ReporterTap(output=tap_output))
+    original_output = io.StringIO()
+    results.replay(ReporterTap(output=original_output))
+    assert tap_output.getvalue() == original_output.getvalue()
+
+
+@pytest.mark.parametrize('file_name', ['report.jsonl', 'report.jsonl.gz'],
+                         ids=['plain', 'gzip'])
+def test_report_output(tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    with open_report_output(path) as output:
+        expected = report_repo(ReporterJsonLines)
+        output.write(expected)
+    if file_name.endswith('.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as fd:
+            assert fd.read() == expected
+    with open_report_input(path) as fd:
+        assert fd.read() == expected
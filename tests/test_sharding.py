@@ -0,0 +1,83 @@
+import random
+import types
+
+import pytest
+
+from msvsphere.rpmqc.sharding import Shard
+
+
+# package keys and sizes, the expected assignment to 2 shards: 10 -> 1,
+# 7 -> 2, 5 -> 2 (the least loaded one), 4 -> 1, 3 -> 2
+PACKAGE_SIZES = {'a': 10, 'b': 7, 'c': 5, 'd': 4, 'e': 3}
+
+
+def make_packages(sizes: dict) -> list:
+    return [types.SimpleNamespace(key=key, size=size)
+            for key, size in sizes.items()]
+
+
+def select_all(packages: list, count: int) -> list:
+    return [Shard(index, count).select(packages)
+            for index in range(1, count + 1)]
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1/1', (1, 1)),
+    ('2/4', (2, 4)),
+    ('4/4', (4, 4))
+], ids=['single', 'middle', 'last'])
+def test_parse(value, expected):
+    shard = Shard.parse(value)
+    assert (shard.index, shard.count) == expected
+    assert str(shard) == value
+
+
+@pytest.mark.parametrize('value', ['2', '0/4', '5/4', '1/0', 'a/4', '1/'],
+                         ids=['no-count', 'zero-index', 'index-too-large',
+                              'zero-count', 'not-number', 'empty-count'])
+def test_parse_invalid(value):
+    with pytest.raises(ValueError):
+        Shard.parse(value)
+
+
+def test_select():
+    packages = make_packages(PACKAGE_SIZES)
+    assert select_all(packages, 2) == [{'a', 'd'}, {'b', 'c', 'e'}]
+
+
+def test_select_equal_sizes():
+    # packages of the same size are ordered by their keys
+    packages = make_packages({'d': 1, 'c': 1, 'b': 1, 'a': 1})
+    assert select_all(packages, 2) == [{'a', 'c'}, {'b', 'd'}]
+
+
+def test_select_order_independent():
+    rng = random.Random(42)
+    sizes = {f'pkg{i}': rng.randrange(1, 1024) for i in range(100)}
+    packages = make_packages(sizes)
+    expected = select_all(packages, 3)
+    rng.shuffle(packages)
+    assert select_all(packages, 3) == expected
+
+
+@pytest.mark.parametrize('count', [1, 3, 8])
+def test_select_partition(count):
+    rng = random.Random(count)
+    sizes = {f'pkg{i}': rng.randrange(1, 1024) for i in range(100)}
+    shards = select_all(make_packages(sizes), count)
+    # every package belongs to exactly one shard
+    assert sum(len(keys) for keys in shards) == len(sizes)
+    assert set().union(*shards) == set(sizes)
+    # the greedy assignment keeps shard loads within the largest package
+    # size from each other
+    loads = [sum(sizes[key] for key in keys) for keys in shards]
+    assert max(loads) - min(loads) <= max(sizes.values())
+
+
+def test_owns():
+    locations = [f'Packages/pkg{i}-1.0-1.noarch.rpm' for i in range(100)]
+    for location in locations:
+        owners = [index for index in range(1, 5)
+                  if Shard(index, 4).owns(location)]
+        assert len(owners) == 1
+    assert all(Shard(1, 1).owns(location) for location in locations)
@@ -0,0 +1,51 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+# modules that are slow to import and must not be loaded by commands that
+# don't inspect packages
+HEAVY_MODULES = ('createrepo_c', 'cryptography', 'http.client',
+                 'importlib.metadata', 'rpm', 'schema', 'sqlite3', 'yaml')
+
+# runs the rpmqc CLI and prints loaded modules and the exit code as JSON
+RPMQC_MAIN = '''
+import json
+import sys
+from msvsphere.rpmqc.cli import main
+sys.argv = ['rpmqc'] + sys.argv[1:]
+try:
+    main()
+    exit_code = 0
+except SystemExit as e:
+    exit_code = e.code
+print(json.dumps({'exit_code': exit_code, 'modules': sorted(sys.modules)}))
+'''
+
+REPO_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_rpmqc(*args: str) -> dict:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        filter(None, [REPO_PATH, env.get('PYTHONPATH')])
+    )
+    proc = subprocess.run([sys.executable, '-c', RPMQC_MAIN] + list(args),
+                          stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                          env=env, check=True, universal_newlines=True)
+    return json.loads(proc.stdout.splitlines()[-1])
+
+
+@pytest.mark.parametrize('args, exit_code', [
+    (['--version'], 0),
+    (['inspect-rpm'], 4),
+    (['inspect-repo', '--jobs', '0', 'repo'], 4),
+    (['inspect-rpm', '--help'], 0)
+], ids=['version', 'usage-error', 'invalid-argument', 'help'])
+def test_no_heavy_imports(args, exit_code):
+    result = run_rpmqc(*args)
+    assert result['exit_code'] == exit_code
+    assert sorted(set(HEAVY_MODULES) & set(result['modules'])) == []
@@ -0,0 +1,146 @@
+import re
+
+import pytest
+
+rpm = pytest.importorskip('rpm')
+
+from msvsphere.rpmqc.config import Config, ConfigError  # noqa: E402
+from msvsphere.rpmqc.tag_rules import (  # noqa: E402
+    compile_tag_rules, get_tag_id, MAX_REPORTED_VALUES, TagRule
+)
+
+
+CONFIG = '''package:
+  tags:
+    vendor: MSVSphere
+    buildhost: !regex ^builder\\d+$
+    requirename:
+      all: !regex ^(?!python2)
+'''
+
+
+@pytest.mark.parametrize('tag_name, expected', [
+    ('vendor', rpm.RPMTAG_VENDOR),
+    ('Vendor', rpm.RPMTAG_VENDOR),
+    ('requirename', rpm.RPMTAG_REQUIRENAME)
+], ids=['lowercase', 'mixed-case', 'array'])
+def test_get_tag_id(tag_name, expected):
+    assert get_tag_id(tag_name) == expected
+
+
+@pytest.mark.parametrize('tag_name', ['no-such-tag', ''],
+                         ids=['unknown', 'empty'])
+def test_get_tag_id_unknown(tag_name):
+    assert get_tag_id(tag_name) is None
+
+
+def test_unknown_tag():
+    with pytest.raises(ValueError, match='unknown RPM tag "nosuchtag"'):
+        TagRule('nosuchtag', 'value')
+
+
+def test_compile():
+    rules = compile_tag_rules({
+        'Vendor': 'MSVSphere',
+        'buildhost': re.compile(r'^builder\d+$'),
+        'requirename': {'all': re.compile(r'^(?!python2)')},
+        'filenames': {'any': '/usr/bin/bash'}
+    })
+    # rules are compiled in the configuration order
+    assert [(rule.tag_name, rule.tag_id, rule.mode) for rule in rules] == [
+        ('vendor', rpm.RPMTAG_VENDOR, None),
+        ('buildhost', rpm.RPMTAG_BUILDHOST, None),
+        ('requirename', rpm.RPMTAG_REQUIRENAME, 'all'),
+        ('filenames', rpm.RPMTAG_FILENAMES, 'any')
+    ]
+    assert [rule.description for rule in rules] == [
+        'vendor RPM tag value is MSVSphere',
+        r'buildhost RPM tag value is regex:^builder\d+$',
+        'every requirename RPM tag value is regex:^(?!python2)',
+        'some filenames RPM tag value is /usr/bin/bash'
+    ]
+
+
+def test_compile_unknown_tag():
+    with pytest.raises(ValueError):
+        compile_tag_rules({'vendor': 'MSVSphere', 'nosuchtag': 'value'})
+
+
+def test_config(tmp_path):
+    cfg_path = tmp_path / 'rpmqc.yml'
+    cfg_path.write_text(CONFIG)
+    rules = compile_tag_rules(Config(str(cfg_path)).data['package']['tags'])
+    assert [rule.description for rule in rules] == [
+        'vendor RPM tag value is MSVSphere',
+        r'buildhost RPM tag value is regex:^builder\d+$',
+        'every requirename RPM tag value is regex:^(?!python2)'
+    ]
+
+
+def test_config_unknown_tag(tmp_path):
+    # unknown tags are reported when the configuration is loaded
+    cfg_path = tmp_path / 'rpmqc.yml'
+    cfg_path.write_text(CONFIG.replace('vendor:', 'vendr:'))
+    with pytest.raises(ConfigError, match='unknown RPM tag "vendr"'):
+        Config(str(cfg_path))
+
+
+@pytest.mark.parametrize('value', ['MSVSphere', b'MSVSphere'],
+                         ids=['str', 'bytes'])
+def test_check_value(value):
+    assert TagRule('vendor', 'MSVSphere').check(value) is None
+
+
+@pytest.mark.parametrize('value, got', [
+    ('AlmaLinux', 'AlmaLinux'),
+    (None, None),
+    (b'\xff', '�')
+], ids=['mismatch', 'not-set', 'invalid-utf8'])
+def test_check_value_failed(value, got):
+    assert TagRule('vendor', 'MSVSphere').check(value) == {
+        'message': 'unexpected vendor RPM tag value',
+        'got': got,
+        'expected': 'MSVSphere'
+    }
+
+
+def test_check_regex():
+    rule = TagRule('buildhost', re.compile(r'builder\d+'))
+    assert rule.check('builder01.example.com') is None
+    # the expression is matched at the beginning of the value
+    assert rule.check('x-builder01.example.com')['expected'] == \
+        r'regex:builder\d+'
+
+
+def test_check_non_string_value():
+    # e.g. integer tags like epoch
+    assert TagRule('epoch', '1').check(1) is None
+
+
+@pytest.mark.parametrize('mode, values, got', [
+    (None, ['glibc', 'bash'], None),
+    (None, ['glibc', 'python2'], ['python2']),
+    ('all', ['glibc', 'python2', 'python2-libs'], ['python2', 'python2-libs']),
+    ('any', ['python2', 'glibc'], None),
+    ('any', ['python2', 'python2-libs'], ['python2', 'python2-libs']),
+    ('any', [], [])
+], ids=['default-passed', 'default-failed', 'all-failed', 'any-passed',
+        'any-failed', 'any-empty'])
+def test_check_array(mode, values, got):
+    rule = TagRule('requirename', re.compile(r'^(?!python2)'), mode)
+    details = rule.check(values)
+    if got is None:
+        assert details is None
+    else:
+        assert details['message'] == \
+            'unexpected requirename RPM tag values'
+        assert details['got'] == got
+
+
+def test_check_array_truncated():
+    values = [f'python2-module{i}' for i in range(MAX_REPORTED_VALUES * 2)]
+    details = TagRule('requirename', re.compile(r'^(?!python2)')).check(
+        values
+    )
+    assert details['got'] == values[:MAX_REPORTED_VALUES]
+    assert details['mismatched_count'] == len(values)